@@ -0,0 +1,28 @@
+"""notes created_at/id index for keyset pagination
+
+Revision ID: 6401f3d2b711
+Revises: b5761c33f5e5
+Create Date: 2026-10-17 10:12:04.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6401f3d2b711'
+down_revision: Union[str, Sequence[str], None] = 'b5761c33f5e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_notes_created_at_id', 'notes', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notes_created_at_id', table_name='notes')
@@ -0,0 +1,28 @@
+"""version column on notes for optimistic concurrency
+
+Revision ID: a7c3e5f91b28
+Revises: f2b8d4e6a913
+Create Date: 2026-10-17 21:14:36.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e5f91b28'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d4e6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notes', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('notes', 'version')
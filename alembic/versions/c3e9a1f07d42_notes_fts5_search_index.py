@@ -0,0 +1,43 @@
+"""notes FTS5 search index
+
+Revision ID: c3e9a1f07d42
+Revises: 6401f3d2b711
+Create Date: 2026-10-17 11:03:27.904115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e9a1f07d42'
+down_revision: Union[str, Sequence[str], None] = '6401f3d2b711'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts "
+        "USING fts5(title, content, tags, tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        """
+        INSERT INTO notes_fts (rowid, title, content, tags)
+        SELECT n.id,
+               n.title,
+               coalesce(n.content, ''),
+               coalesce((SELECT group_concat(t.name, ' ')
+                         FROM note_tags nt JOIN tags t ON t.id = nt.tag_id
+                         WHERE nt.note_id = n.id), '')
+        FROM notes n
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE IF EXISTS notes_fts")
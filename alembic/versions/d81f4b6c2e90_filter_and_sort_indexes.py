@@ -0,0 +1,38 @@
+"""filter and sort indexes for note listings
+
+Revision ID: d81f4b6c2e90
+Revises: c3e9a1f07d42
+Create Date: 2026-10-17 11:48:52.311907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4b6c2e90'
+down_revision: Union[str, Sequence[str], None] = 'c3e9a1f07d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_notes_status_created_at_id', 'notes', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_notes_priority_created_at_id', 'notes', ['priority', 'created_at', 'id'], unique=False)
+    op.create_index('ix_notes_category_id_created_at_id', 'notes', ['category_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_notes_is_important_created_at_id', 'notes', ['is_important', 'created_at', 'id'], unique=False)
+    op.create_index('ix_notes_reminder_date', 'notes', ['reminder_date'], unique=False)
+    op.create_index('ix_note_tags_tag_id_note_id', 'note_tags', ['tag_id', 'note_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_note_tags_tag_id_note_id', table_name='note_tags')
+    op.drop_index('ix_notes_reminder_date', table_name='notes')
+    op.drop_index('ix_notes_is_important_created_at_id', table_name='notes')
+    op.drop_index('ix_notes_category_id_created_at_id', table_name='notes')
+    op.drop_index('ix_notes_priority_created_at_id', table_name='notes')
+    op.drop_index('ix_notes_status_created_at_id', table_name='notes')
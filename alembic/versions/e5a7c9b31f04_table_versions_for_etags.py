@@ -0,0 +1,49 @@
+"""table_versions change counters for collection ETags
+
+Revision ID: e5a7c9b31f04
+Revises: d81f4b6c2e90
+Create Date: 2026-10-17 13:12:40.518377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c9b31f04'
+down_revision: Union[str, Sequence[str], None] = 'd81f4b6c2e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = {"notes": "notes", "note_tags": "notes", "tags": "tags", "categories": "categories"}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'table_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('changed_at', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.execute(
+        "INSERT INTO table_versions (name, version) VALUES ('categories', 0), ('notes', 0), ('tags', 0)"
+    )
+    for table, name in VERSIONED_TABLES.items():
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_{operation.lower()}_version AFTER {operation} ON {table} "
+                f"BEGIN UPDATE table_versions SET version = version + 1, "
+                f"changed_at = (julianday('now') - 2440587.5) * 86400.0 WHERE name = '{name}'; END"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in VERSIONED_TABLES:
+        for operation in ("insert", "update", "delete"):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_{operation}_version")
+    op.drop_table('table_versions')
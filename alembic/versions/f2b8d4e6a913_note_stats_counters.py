@@ -0,0 +1,69 @@
+"""note_stats counters for the stats endpoint
+
+Revision ID: f2b8d4e6a913
+Revises: e5a7c9b31f04
+Create Date: 2026-10-17 18:02:11.204517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d4e6a913'
+down_revision: Union[str, Sequence[str], None] = 'e5a7c9b31f04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UPSERT = (
+    "INSERT INTO note_stats (dimension, value, count) VALUES {rows} "
+    "ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count"
+)
+
+
+def note_rows(row: str, delta: int) -> str:
+    return (
+        f"('total', 'all', {delta}), ('status', {row}.status, {delta}), ('priority', {row}.priority, {delta}), "
+        f"('category', coalesce({row}.category_id, 'none'), {delta}), ('important', {row}.is_important, {delta})"
+    )
+
+
+TRIGGERS = {
+    "notes_insert_stats": f"AFTER INSERT ON notes BEGIN {UPSERT.format(rows=note_rows('NEW', 1))}; END",
+    "notes_delete_stats": f"AFTER DELETE ON notes BEGIN {UPSERT.format(rows=note_rows('OLD', -1))}; END",
+    "notes_update_stats": "AFTER UPDATE OF status, priority, category_id, is_important ON notes BEGIN "
+    f"{UPSERT.format(rows=note_rows('OLD', -1) + ', ' + note_rows('NEW', 1))}; END",
+    "note_tags_insert_stats": "AFTER INSERT ON note_tags BEGIN " + UPSERT.format(rows="('tag', NEW.tag_id, 1)") + "; END",
+    "note_tags_delete_stats": "AFTER DELETE ON note_tags BEGIN " + UPSERT.format(rows="('tag', OLD.tag_id, -1)") + "; END",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'note_stats',
+        sa.Column('dimension', sa.String(length=20), nullable=False),
+        sa.Column('value', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('dimension', 'value'),
+    )
+    for name, body in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    op.execute(
+        "INSERT INTO note_stats (dimension, value, count) "
+        "SELECT 'total', 'all', count(*) FROM notes "
+        "UNION ALL SELECT 'status', status, count(*) FROM notes GROUP BY status "
+        "UNION ALL SELECT 'priority', priority, count(*) FROM notes GROUP BY priority "
+        "UNION ALL SELECT 'category', coalesce(category_id, 'none'), count(*) FROM notes GROUP BY category_id "
+        "UNION ALL SELECT 'important', is_important, count(*) FROM notes GROUP BY is_important "
+        "UNION ALL SELECT 'tag', tag_id, count(*) FROM note_tags GROUP BY tag_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_table('note_stats')
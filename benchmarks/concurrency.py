@@ -0,0 +1,130 @@
+"""Throughput of the sync vs async API stacks under many concurrent clients.
+
+    python -m benchmarks.concurrency --concurrency 256 --duration 15
+
+Seeds a throwaway SQLite file, then for each NOTES_DB_MODE starts uvicorn on
+it and drives GET /api/notes/ and GET /api/notes/{id} from `concurrency`
+simultaneous connections, printing requests/s and latency percentiles.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src import crud, schemas
+from src.database import Base
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(db_path: Path, notes: int) -> None:
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        payload = [schemas.NoteCreate(title=f"Note {i}", content="lorem ipsum " * 20) for i in range(notes)]
+        for start in range(0, len(payload), 1000):
+            crud.create_notes_bulk(db, payload[start:start + 1000])
+    engine.dispose()
+
+
+async def _drive(base_url: str, concurrency: int, duration: float, note_ids: int) -> tuple[list, int]:
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker(seed_: int):
+            nonlocal errors
+            rng = random.Random(seed_)
+            while time.perf_counter() < deadline:
+                if rng.random() < 0.5:
+                    url = "/api/notes/?limit=20"
+                else:
+                    url = f"/api/notes/{rng.randint(1, note_ids)}"
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                except httpx.TransportError:
+                    errors += 1
+                    continue
+                if response.is_success:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors
+
+
+def run_mode(mode: str, db_path: Path, args) -> dict:
+    port = _free_port()
+    env = dict(os.environ, NOTES_DB_MODE=mode, NOTES_DATABASE_PATH=str(db_path))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base_url}/", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        latencies, errors = asyncio.run(_drive(base_url, args.concurrency, args.duration, args.notes))
+    finally:
+        server.terminate()
+        server.wait()
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [float("nan")] * 99
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / args.duration,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--notes", type=int, default=10_000)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        seed(db_path, args.notes)
+        for mode in args.modes:
+            result = run_mode(mode, db_path, args)
+            print(
+                f"{result['mode']:>5}: {result['rps']:8.1f} req/s  "
+                f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                f"p99 {result['p99_ms']:7.1f} ms  ({result['requests']} ok, "
+                f"{result['errors']} errors, {args.concurrency} connections)"
+            )
+
+
+if __name__ == "__main__":
+    main()
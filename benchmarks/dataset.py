@@ -0,0 +1,124 @@
+"""Deterministic synthetic notes database for benchmarks.
+
+    python -m benchmarks.dataset bench.db --notes 100000 --tags 500 --seed 1
+
+The same arguments always produce the same rows: notes spread over a year
+before a fixed anchor date, a Zipf-distributed number of uses per tag (a few
+tags on most notes, a long tail on almost none), categories, priorities,
+statuses and reminder dates around the anchor. Text is drawn from a small
+vocabulary so full-text searches have predictable hits.
+"""
+import argparse
+import itertools
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from src import models, search
+from src.database import Base, apply_sqlite_profile
+
+ANCHOR = datetime(2025, 1, 1)
+
+WORDS = (
+    "project meeting budget review draft report client invoice deadline release "
+    "backend frontend database query index cache latency sprint backlog roadmap "
+    "design sketch travel ticket hotel recipe grocery garden book article lecture "
+    "exam thesis workout doctor birthday gift family weekend idea bug fix deploy"
+).split()
+
+
+@dataclass(frozen=True)
+class Spec:
+    notes: int
+    tags: int = 200
+    categories: int = 12
+    max_tags_per_note: int = 5
+    zipf_s: float = 1.1
+    reminder_ratio: float = 0.3
+    seed: int = 0
+
+
+def zipf_weights(n: int, s: float) -> list:
+    """Cumulative weights of ranks 1..n under Zipf's law with exponent s."""
+    return list(itertools.accumulate(1 / rank ** s for rank in range(1, n + 1)))
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=words))
+
+
+def note_rows(spec: Spec):
+    """Yield (note row, tag ids) in id order; tag id 1 is the most popular."""
+    rng = random.Random(spec.seed)
+    cum_weights = zipf_weights(spec.tags, spec.zipf_s)
+    tag_ids = range(1, spec.tags + 1)
+    statuses = list(models.NoteStatus)
+    priorities = list(models.NotePriority)
+    year = 365 * 24 * 3600
+
+    for note_id in range(1, spec.notes + 1):
+        # Ascending created_at keeps rowid and listing order aligned, as in real use.
+        created_at = ANCHOR - timedelta(seconds=year * (1 - note_id / spec.notes))
+        reminder = None
+        if rng.random() < spec.reminder_ratio:
+            reminder = ANCHOR + timedelta(minutes=rng.randint(-90 * 24 * 60, 90 * 24 * 60))
+        count = rng.randint(0, min(spec.max_tags_per_note, spec.tags))
+        tags = set(rng.choices(tag_ids, cum_weights=cum_weights, k=count)) if count else set()
+        row = {
+            "id": note_id,
+            "title": _text(rng, rng.randint(2, 6)).capitalize(),
+            "content": _text(rng, rng.randint(10, 120)),
+            "is_important": rng.random() < 0.1,
+            "status": rng.choice(statuses),
+            "priority": rng.choice(priorities),
+            "reminder_date": reminder,
+            "created_at": created_at,
+            "updated_at": created_at,
+            "category_id": rng.randint(1, spec.categories) if rng.random() < 0.8 else None,
+        }
+        yield row, sorted(tags)
+
+
+def generate(db: Session, spec: Spec, batch_size: int = 5000) -> None:
+    """Fill an empty database according to `spec`."""
+    db.execute(insert(models.Category), [{"id": i, "name": f"category-{i}"} for i in range(1, spec.categories + 1)])
+    db.execute(insert(models.Tag), [{"id": i, "name": f"tag-{i}"} for i in range(1, spec.tags + 1)])
+
+    rows = note_rows(spec)
+    while batch := list(itertools.islice(rows, batch_size)):
+        db.execute(insert(models.Note), [row for row, _ in batch])
+        links = [{"note_id": row["id"], "tag_id": tag_id} for row, tags in batch for tag_id in tags]
+        if links:
+            db.execute(insert(models.note_tags), links)
+        search.index_notes(db, [row["id"] for row, _ in batch])
+        db.commit()
+
+
+def build(path: Path, spec: Spec) -> None:
+    engine = apply_sqlite_profile(create_engine(f"sqlite:///{path}"))
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        generate(db, spec)
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--notes", type=int, default=10_000)
+    parser.add_argument("--tags", type=int, default=Spec.tags)
+    parser.add_argument("--categories", type=int, default=Spec.categories)
+    parser.add_argument("--seed", type=int, default=Spec.seed)
+    args = parser.parse_args()
+
+    if args.path.exists():
+        parser.error(f"{args.path} already exists")
+    build(args.path, Spec(notes=args.notes, tags=args.tags, categories=args.categories, seed=args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Dashboard counts: note_stats counters vs one count query per bucket.
+
+    python -m benchmarks.stats --sizes 1000 10000 100000
+
+"counters" is crud.get_note_stats, which reads one row per bucket from
+note_stats. "count_queries" is what the dashboard did before: a
+count_notes_filtered call (the `total` of GET /api/notes/) for every status,
+priority, category and tag plus the important flag. The first should stay
+flat as the corpus grows, the second grows with it.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks import dataset
+from src import crud, models
+from src.database import apply_sqlite_profile
+
+
+def count_queries(db: Session, spec: dataset.Spec) -> dict:
+    counts = {"total": crud.count_notes_filtered(db), "important": crud.count_notes_filtered(db, important=True)}
+    for status in models.NoteStatus:
+        counts[f"status={status.value}"] = crud.count_notes_filtered(db, status=status)
+    for priority in models.NotePriority:
+        counts[f"priority={priority.value}"] = crud.count_notes_filtered(db, priority=priority)
+    for category_id in range(1, spec.categories + 1):
+        counts[f"category={category_id}"] = crud.count_notes_filtered(db, category_id=category_id)
+    for tag_id in range(1, spec.tags + 1):
+        counts[f"tag={tag_id}"] = crud.count_notes_filtered(db, tag_id=tag_id)
+    return counts
+
+
+def measure(engine, run, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        with Session(engine) as db:
+            started = time.perf_counter()
+            run(db)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--tags", type=int, default=dataset.Spec.tags)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'notes':>8} {'counters ms':>12} {'count_queries ms':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            spec = dataset.Spec(notes=size, tags=args.tags)
+            path = Path(tmp) / f"stats-{size}.db"
+            dataset.build(path, spec)
+            engine = apply_sqlite_profile(create_engine(f"sqlite:///{path}"), read_only=True)
+
+            with Session(engine) as db:
+                stats = crud.get_note_stats(db)
+                if stats.total != crud.count_notes_filtered(db):
+                    sys.exit(f"note_stats out of date at {size} notes")
+            counters = measure(engine, crud.get_note_stats, args.repeat)
+            queries = measure(engine, lambda db: count_queries(db, spec), max(1, args.repeat // 10))
+            print(f"{size:>8} {counters:>12.2f} {queries:>17.2f}")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
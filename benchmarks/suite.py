@@ -0,0 +1,380 @@
+"""Timed scenarios for every API and HTML route at several dataset sizes.
+
+    python -m benchmarks.suite --sizes 1000 10000 100000 --output baseline.json
+    python -m benchmarks.suite --sizes 1000 10000 100000 --compare baseline.json
+
+For each size a database is generated with benchmarks.dataset (same seed,
+same rows), the app is driven in-process through its full ASGI stack, and
+each scenario reports latency percentiles, ops/s and rows/s. Results are
+written as JSON; --compare loads a previous run and exits non-zero when a
+scenario got slower than the threshold allows.
+
+Not covered: /metrics, which only reports on the other routes, and the
+NOTES_DB_MODE=async routes, whose sessions come from get_async_db rather
+than the engines set up here.
+"""
+import os
+
+# The reminder scheduler and tag index would read the app's own database, not the generated one.
+os.environ.setdefault("NOTES_REMINDER_SCHEDULER", "0")
+os.environ.setdefault("NOTES_TAG_INDEX", "0")
+
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks import dataset
+from src import crud
+from src.database import READ_METHODS, apply_sqlite_profile, get_db, get_writer_sessionmaker
+from src.main import app
+from src.routers import frontend
+from src.tag_index import tag_index
+
+
+@dataclass
+class Context:
+    size: int
+    rng: random.Random
+    client: TestClient
+    created: list  # ids of notes created by the write scenarios
+
+    def note_id(self) -> int:
+        return self.rng.randint(1, self.size)
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    request: Callable[[Context], dict]  # url plus TestClient.request keyword arguments
+    rows: Optional[Callable] = None  # rows served by one response
+    share: float = 1.0  # fraction of --repeat to run
+    created: Optional[Callable] = None  # ids of the notes one response created, for later writes
+
+
+BULK = 50  # notes per bulk, import and by-filter request
+
+
+def _list(query: str = "") -> Callable[[Context], dict]:
+    return lambda ctx: {"url": f"/api/notes/?limit=50{query}"}
+
+
+def _items(response) -> int:
+    return len(response.json()["items"])
+
+
+def _cards(response) -> int:
+    return response.text.count('<article class="card">')
+
+
+def _lines(response) -> int:
+    return response.content.count(b"\n")
+
+
+def _note_body(ctx: Context) -> dict:
+    return {
+        "title": f"Bench note {ctx.rng.random():.6f}",
+        "content": dataset._text(ctx.rng, 40),
+        "priority": ctx.rng.choice(["low", "medium", "high"]),
+        "tag_ids": sorted(ctx.rng.sample(range(1, 21), 3)),
+        "category_id": ctx.rng.randint(1, 12),
+    }
+
+
+def _note_form(ctx: Context) -> dict:
+    return {
+        "title": f"Bench form {ctx.rng.random():.6f}",
+        "content": dataset._text(ctx.rng, 40),
+        "category_name": "category-1",
+        "tags": "tag-1, tag-2, tag-3",
+        "priority": "high",
+    }
+
+
+def _second_page(ctx: Context) -> dict:
+    cursor = ctx.client.get("/api/notes/?limit=50&total=none").json()["next_cursor"]
+    return {"url": "/api/notes/", "params": {"limit": 50, "cursor": cursor, "total": "none"}}
+
+
+def _create(ctx: Context) -> dict:
+    return {"url": "/api/notes/", "json": _note_body(ctx)}
+
+
+def _import_body(ctx: Context, category: Optional[str] = None) -> bytes:
+    lines = (
+        json.dumps({
+            "title": f"Bench import {ctx.rng.random():.6f}",
+            "content": dataset._text(ctx.rng, 40),
+            "tags": [f"tag-{t}" for t in sorted(ctx.rng.sample(range(1, 21), 3))],
+            "category": category or "category-1",
+        })
+        for _ in range(BULK)
+    )
+    return "\n".join(lines).encode()
+
+
+def _seeded_filter(ctx: Context) -> dict:
+    """Import BULK notes into a fresh category (untimed) and return a filter matching just them."""
+    name = f"bench-{ctx.rng.random():.6f}"
+    category_id = ctx.client.post("/api/categories/", json={"name": name}).json()["id"]
+    ctx.client.post("/api/notes/import", content=_import_body(ctx, name))
+    return {"category_id": category_id}
+
+
+def _bulk_ids(response) -> list:
+    return [item["id"] for item in response.json()["results"]]
+
+
+def _succeeded(response) -> int:
+    return response.json()["succeeded"]
+
+
+def _affected(response) -> int:
+    return response.json()["affected"]
+
+
+SCENARIOS = [
+    Scenario("api.list", "GET", _list(), _items),
+    Scenario("api.list.total_none", "GET", _list("&total=none"), _items),
+    Scenario("api.list.cursor", "GET", _second_page, _items),
+    Scenario("api.list.status", "GET", _list("&status=done"), _items),
+    Scenario("api.list.priority", "GET", _list("&priority=high"), _items),
+    Scenario("api.list.important", "GET", _list("&important=true"), _items),
+    Scenario("api.list.category", "GET", _list("&category_id=1"), _items),
+    Scenario("api.list.tag_popular", "GET", _list("&tag_id=1"), _items),
+    Scenario("api.list.tag_rare", "GET", _list("&tag_id=150"), _items),
+    Scenario("api.list.tags_all", "GET", _list("&tags_all=1&tags_all=150"), _items),
+    Scenario("api.list.tags_any", "GET", _list("".join(f"&tags_any={t}" for t in range(100, 106))), _items),
+    Scenario("api.list.tags_none", "GET", _list("&tags_all=3&tags_none=1"), _items),
+    Scenario("api.list.before", "GET", _list("&before=2024-11-01T00:00:00"), _items),
+    Scenario("api.list.fields_excerpt", "GET", _list("&fields=title,tag_ids&excerpt=120"), _items),
+    Scenario("api.search", "GET", _list("&search=budget"), _items),
+    Scenario("api.search.relevance", "GET", _list("&search=project+review&sort=relevance"), _items),
+    Scenario("api.stats", "GET", lambda ctx: {"url": "/api/notes/stats"}, lambda r: 1),
+    Scenario("api.get", "GET", lambda ctx: {"url": f"/api/notes/{ctx.note_id()}"}, lambda r: 1),
+    Scenario("api.tags", "GET", lambda ctx: {"url": "/api/tags/"}, _items),
+    Scenario("api.tags.page", "GET", lambda ctx: {"url": "/api/tags/", "params": {"cursor": crud.encode_name_cursor("tag-5")}}, _items),
+    Scenario("api.categories", "GET", lambda ctx: {"url": "/api/categories/"}, _items),
+    Scenario("api.reminders.due", "GET", lambda ctx: {
+        "url": "/api/reminders/due", "params": {"until": dataset.ANCHOR.isoformat()},
+    }, _items),
+    Scenario("api.reminders.agenda", "GET", lambda ctx: {
+        "url": "/api/reminders/agenda", "params": {"start": dataset.ANCHOR.date().isoformat()},
+    }, lambda r: sum(day["count"] for day in r.json()["days"])),
+    Scenario("api.export", "GET", lambda ctx: {"url": "/api/notes/export"}, _lines, share=0.05),
+    Scenario("api.tags.create", "POST", lambda ctx: {
+        "url": "/api/tags/", "json": {"name": f"bench-{ctx.rng.random():.6f}"},
+    }, lambda r: 1),
+    Scenario("api.categories.create", "POST", lambda ctx: {
+        "url": "/api/categories/", "json": {"name": f"bench-{ctx.rng.random():.6f}"},
+    }, lambda r: 1),
+    Scenario("api.create", "POST", _create, lambda r: 1, created=lambda r: [r.json()["id"]]),
+    Scenario("api.update", "PUT", lambda ctx: {
+        "url": f"/api/notes/{ctx.rng.choice(ctx.created)}", "json": _note_body(ctx),
+    }, lambda r: 1),
+    # The bulk deletes take back exactly the notes the bulk creates added (same share, last in first out).
+    Scenario("api.bulk.create", "POST", lambda ctx: {
+        "url": "/api/notes/bulk", "json": [_note_body(ctx) for _ in range(BULK)],
+    }, _succeeded, share=0.2, created=_bulk_ids),
+    Scenario("api.bulk.update", "PUT", lambda ctx: {
+        "url": "/api/notes/bulk", "json": [{"id": i, **_note_body(ctx)} for i in ctx.rng.sample(ctx.created, BULK)],
+    }, _succeeded, share=0.2),
+    Scenario("api.bulk.delete", "DELETE", lambda ctx: {
+        "url": "/api/notes/bulk", "json": [ctx.created.pop() for _ in range(BULK)],
+    }, _succeeded, share=0.2),
+    Scenario("api.import", "POST", lambda ctx: {
+        "url": "/api/notes/import", "content": _import_body(ctx),
+    }, lambda r: r.json()["imported"], share=0.2),
+    Scenario("api.status_by_filter", "POST", lambda ctx: {
+        "url": "/api/notes/status-by-filter", "json": {**_seeded_filter(ctx), "new_status": "done"},
+    }, _affected, share=0.2),
+    Scenario("api.delete_by_filter.dry_run", "POST", lambda ctx: {
+        "url": "/api/notes/delete-by-filter", "json": {"status": "done", "dry_run": True},
+    }, lambda r: 1),
+    Scenario("api.delete_by_filter", "POST", lambda ctx: {
+        "url": "/api/notes/delete-by-filter", "json": _seeded_filter(ctx),
+    }, _affected, share=0.2),
+    Scenario("api.delete", "DELETE", lambda ctx: {"url": f"/api/notes/{ctx.created.pop()}"}, lambda r: 1, share=0.5),
+    Scenario("html.list", "GET", lambda ctx: {"url": "/notes"}, _cards),
+    Scenario("html.list.search", "GET", lambda ctx: {"url": "/notes?search=budget"}, _cards),
+    Scenario("html.fragment", "GET", lambda ctx: {
+        "url": "/notes/fragment", "params": {"cursor": ctx.client.get("/api/notes/?limit=24&total=none").json()["next_cursor"]},
+    }, _cards),
+    Scenario("html.view", "GET", lambda ctx: {"url": f"/notes/{ctx.note_id()}"}, lambda r: 1),
+    Scenario("html.edit_form", "GET", lambda ctx: {"url": f"/notes/{ctx.note_id()}/edit"}, lambda r: 1),
+    Scenario("html.create_form", "GET", lambda ctx: {"url": "/notes/create"}),
+    Scenario("html.create", "POST", lambda ctx: {"url": "/notes/create", "data": _note_form(ctx)}, lambda r: 1),
+    Scenario("html.edit", "POST", lambda ctx: {
+        "url": f"/notes/{ctx.rng.choice(ctx.created)}/edit", "data": _note_form(ctx),
+    }, lambda r: 1),
+    Scenario("html.delete", "POST", lambda ctx: {"url": f"/notes/{ctx.created.pop()}/delete"}, lambda r: 1, share=0.5),
+]
+
+
+def _summary(size: int, scenario: Scenario, latencies: list, rows: int) -> dict:
+    elapsed = sum(latencies)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "size": size,
+        "scenario": scenario.name,
+        "runs": len(latencies),
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "mean_ms": elapsed / len(latencies) * 1000,
+        "ops_s": len(latencies) / elapsed,
+        "rows_s": rows / elapsed if scenario.rows else None,
+    }
+
+
+def run_scenario(ctx: Context, scenario: Scenario, repeat: int, warmup: int) -> dict:
+    # Writes are not warmed up: every call changes the data set.
+    for _ in range(warmup if scenario.method in READ_METHODS else 0):
+        kwargs = scenario.request(ctx)
+        ctx.client.request(scenario.method, **kwargs)
+
+    latencies, rows = [], 0
+    for _ in range(max(1, int(repeat * scenario.share))):
+        kwargs = scenario.request(ctx)
+        started = time.perf_counter()
+        response = ctx.client.request(scenario.method, **kwargs)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{scenario.name}: {response.status_code} {response.text[:200]}")
+        if scenario.created:
+            ctx.created.extend(scenario.created(response))
+        if scenario.rows:
+            rows += scenario.rows(response)
+    return _summary(ctx.size, scenario, latencies, rows)
+
+
+def run_size(size: int, args, tmp: Path) -> list:
+    db_path = tmp / f"bench-{size}.db"
+    dataset.build(db_path, dataset.Spec(notes=size, seed=args.seed))
+
+    url = f"sqlite:///{db_path}"
+    connect_args = {"check_same_thread": False}
+    writer = apply_sqlite_profile(
+        create_engine(url, connect_args=connect_args, pool_size=1, max_overflow=0), begin_immediate=True
+    )
+    reader = apply_sqlite_profile(create_engine(url, connect_args=connect_args), read_only=True)
+    write_session = sessionmaker(bind=writer, autoflush=False, expire_on_commit=False)
+    read_session = sessionmaker(bind=reader, autoflush=False)
+
+    def _get_db(request: Request):
+        db = (read_session if request.method in READ_METHODS else write_session)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_writer_sessionmaker] = lambda: write_session
+    # Cached entries are keyed by table version, which restarts with every database.
+    frontend._categories_cache.clear()
+    crud.listing_cache.clear()
+    tag_index.invalidate()
+    tag_index.start(read_session)
+    deadline = time.monotonic() + 60
+    while not tag_index.warm and time.monotonic() < deadline:
+        time.sleep(0.01)
+    results = []
+    try:
+        with TestClient(app, follow_redirects=False) as client:
+            ctx = Context(size=size, rng=random.Random(args.seed), client=client, created=[])
+            for scenario in SCENARIOS:
+                if args.only and not any(scenario.name.startswith(prefix) for prefix in args.only):
+                    continue
+                results.append(run_scenario(ctx, scenario, args.repeat, args.warmup))
+                print(_format(results[-1]), file=sys.stderr)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_writer_sessionmaker, None)
+        writer.dispose()
+        reader.dispose()
+    return results
+
+
+def _format(result: dict) -> str:
+    rows = f"{result['rows_s']:12.0f} rows/s" if result["rows_s"] is not None else ""
+    return (
+        f"{result['size']:>8} {result['scenario']:<26} p50 {result['p50_ms']:8.2f} ms  "
+        f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  {result['ops_s']:9.1f} ops/s {rows}"
+    )
+
+
+def compare(baseline: dict, current: dict, metric: str, threshold: float, min_delta_ms: float) -> list:
+    """Scenarios whose `metric` grew by more than `threshold` (relative) and `min_delta_ms`."""
+    previous = {(r["size"], r["scenario"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["size"], result["scenario"]))
+        if before is None:
+            continue
+        old, new = before[metric], result[metric]
+        if new > old * (1 + threshold) and new - old > min_delta_ms:
+            regressions.append({"size": result["size"], "scenario": result["scenario"], "before": old, "after": new})
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=200, help="timed calls per scenario")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=dataset.Spec.seed)
+    parser.add_argument("--only", nargs="+", help="run scenarios whose name starts with one of these")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline JSON from an earlier --output")
+    parser.add_argument("--metric", default="p50_ms", choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms"])
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    current = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            current["results"].extend(run_size(size, args, Path(tmp)))
+
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+    if args.compare:
+        regressions = compare(
+            json.loads(args.compare.read_text()), current, args.metric, args.threshold, args.min_delta_ms
+        )
+        for r in regressions:
+            print(
+                f"REGRESSION {r['size']:>8} {r['scenario']:<26} {args.metric} "
+                f"{r['before']:.2f} -> {r['after']:.2f} ms ({r['after'] / r['before'] - 1:+.0%})"
+            )
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions above {args.threshold:.0%} in {args.metric}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Fingerprinted, precompressed static assets and response compression.
+
+At startup every file under the static directory is read once, named after a
+hash of its content and compressed (gzip, plus brotli when the optional
+`brotli` package is installed). Templates link to the hashed URL through
+asset_url(); those URLs never change meaning, so they are served from memory
+with a year-long immutable Cache-Control. Plain /static/<name> URLs keep
+working through StaticFiles.
+"""
+from pathlib import Path
+from typing import NamedTuple
+import gzip
+import hashlib
+import mimetypes
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from . import config
+
+try:
+    import brotli
+except ImportError:  # optional: gzip variants only
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Content types worth compressing on the fly; everything else (images, .gz
+# exports, ...) is passed through untouched.
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+class Asset(NamedTuple):
+    url_path: str  # path under /static including the content hash
+    media_type: str
+    etag: str
+    bodies: dict  # content-coding ("identity", "gzip", "br") -> bytes
+
+
+def fingerprint(path: str, digest: str) -> str:
+    stem, dot, suffix = path.rpartition(".")
+    return f"{stem}.{digest}.{suffix}" if dot else f"{path}.{digest}"
+
+
+def build_asset(path: str, content: bytes) -> Asset:
+    bodies = {"identity": content}
+    variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(content)
+    for encoding, body in variants.items():
+        if len(body) < len(content):
+            bodies[encoding] = body
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return Asset(fingerprint(path, digest), media_type, f'"{digest}"', bodies)
+
+
+class StaticAssets:
+    """ASGI app for /static: hashed names from memory, anything else from disk."""
+
+    def __init__(self, directory: str):
+        root = Path(directory)
+        self.assets = {}
+        for file in sorted(root.rglob("*")):
+            if file.is_file():
+                path = file.relative_to(root).as_posix()
+                self.assets[path] = build_asset(path, file.read_bytes())
+        self.by_url_path = {asset.url_path: asset for asset in self.assets.values()}
+        self.files = StaticFiles(directory=directory)
+
+    def url(self, path: str) -> str:
+        asset = self.assets.get(path)
+        return f"/static/{asset.url_path if asset else path}"
+
+    def response(self, asset: Asset, headers: Headers) -> Response:
+        accepted = headers.get("accept-encoding", "")
+        encoding = next((e for e in ("br", "gzip") if e in asset.bodies and e in accepted), "identity")
+        response_headers = {"Cache-Control": IMMUTABLE, "ETag": asset.etag, "Vary": "Accept-Encoding"}
+        if headers.get("if-none-match") == asset.etag:
+            return Response(status_code=304, headers=response_headers)
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+        return Response(asset.bodies[encoding], media_type=asset.media_type, headers=response_headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope["path"][len(scope.get("root_path", "")):].lstrip("/")
+        asset = self.by_url_path.get(path)
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            await self.files(scope, receive, send)
+            return
+        await self.response(asset, Headers(scope=scope))(scope, receive, send)
+
+
+class _CompressibleGZipResponder(GZipResponder):
+    async def send_with_compression(self, message) -> None:
+        await super().send_with_compression(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            self.content_type_is_excluded |= not content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware restricted to COMPRESSIBLE_TYPES.
+
+    Starlette compresses every content type it is not told to skip, which would
+    gzip already-compressed exports a second time.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("accept-encoding", ""):
+            responder = _CompressibleGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+static_assets = StaticAssets(config.STATIC_DIR)
+
+
+def asset_url(path: str) -> str:
+    """URL of a static file, fingerprinted when it was present at startup."""
+    return static_assets.url(path)
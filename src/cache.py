@@ -0,0 +1,50 @@
+"""Small in-process caches for data that is read far more often than it changes."""
+from collections import OrderedDict
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class VersionedCache:
+    """One value per key, recomputed whenever the key's version changes.
+
+    Versions come from the table_versions counters (crud.get_table_versions),
+    so writes from any process or code path invalidate the entry, and a hit
+    costs one primary-key lookup instead of the full query. With `maxsize`
+    the least recently used keys are dropped beyond that many entries.
+    Safe to share between threadpool workers.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: Hashable, version: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return default
+            if self.maxsize is not None:
+                self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            if self.maxsize is not None:
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+    def get(self, key: Hashable, version: Hashable, compute: Callable[[], Any]) -> Any:
+        value = self.lookup(key, version, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,88 @@
+"""ETag / Last-Modified validators and conditional request handling.
+
+Single notes are validated by their updated_at, collections by the
+table_versions counters (see models.TableVersion), so both can be answered
+with a 304 from one indexed lookup, before the payload query runs.
+"""
+from datetime import datetime, UTC
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+import hashlib
+
+from fastapi import HTTPException, Request, Response
+
+# table_versions rows each collection's payload depends on.
+NOTES_VERSIONS = ["notes", "tags", "categories"]
+# Tag and category listings carry note counts, so note writes change them too.
+TAGS_VERSIONS = ["tags", "notes"]
+CATEGORIES_VERSIONS = ["categories", "notes"]
+
+
+def note_validators(note_id: int, modified: datetime) -> tuple[str, datetime]:
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=UTC)
+    return f'"n{note_id}-{int(modified.timestamp() * 1_000_000):x}"', modified
+
+
+def collection_validators(versions: dict, variant: str = "") -> tuple[str, Optional[datetime]]:
+    """Validators for a listing that depends on `versions` ({name: (version, changed_at)}).
+
+    `variant` distinguishes representations of the same data, e.g. the query string.
+    """
+    state = repr((sorted(versions.items()), variant)).encode()
+    etag = f'"{hashlib.blake2b(state, digest_size=12).hexdigest()}"'
+    changed = [changed_at for _, changed_at in versions.values() if changed_at is not None]
+    return etag, datetime.fromtimestamp(max(changed), UTC) if changed else None
+
+
+def _etag_list(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def _is_fresh(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as required for If-None-Match.
+        tags = [tag.removeprefix("W/") for tag in _etag_list(if_none_match)]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=UTC)
+        # HTTP dates have one-second resolution.
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    # no-cache: clients may store the response but must revalidate before reuse.
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(UTC), usegmt=True)
+    return headers
+
+
+def conditional_get(
+    request: Request, response: Response, etag: str, last_modified: Optional[datetime] = None
+) -> Optional[Response]:
+    """Attach validators to `response`; return a 304 to send instead if the client is current."""
+    headers = validator_headers(etag, last_modified)
+    if _is_fresh(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def check_if_match(request: Request, etag: str) -> None:
+    """Reject a write whose If-Match does not name the current representation."""
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        return
+    tags = _etag_list(if_match)
+    if "*" not in tags and etag not in tags:
+        raise HTTPException(status_code=412, detail="Note has been modified")
@@ -1,5 +1,79 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATABASE_URL = f"sqlite:///{BASE_DIR / 'notes.db'}"
-APP_NAME = "FastNotes API"
\ No newline at end of file
+DATABASE_PATH = Path(os.getenv("NOTES_DATABASE_PATH", BASE_DIR / "notes.db"))
+DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+APP_NAME = "FastNotes API"
+
+# Applied to every SQLite connection on connect (see database.apply_sqlite_profile).
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("NOTES_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("NOTES_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "foreign_keys": "ON",
+    "busy_timeout": int(os.getenv("NOTES_SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    # Negative cache_size is in KiB.
+    "cache_size": -int(os.getenv("NOTES_SQLITE_CACHE_KIB", 64 * 1024)),
+    "mmap_size": int(os.getenv("NOTES_SQLITE_MMAP_BYTES", 256 * 1024 * 1024)),
+}
+# Read-only connections kept open between requests (bursts above this open
+# temporary extra connections).
+READ_POOL_SIZE = int(os.getenv("NOTES_READ_POOL_SIZE", 40))
+
+# "sync" serves the API from the threadpool with a blocking Session;
+# "async" mounts routers.notes_async on top, backed by AsyncSession.
+DB_MODE = os.getenv("NOTES_DB_MODE", "sync")
+
+# total=estimate on GET /api/notes/ stops counting after this many matches.
+TOTAL_ESTIMATE_CAP = 10_000
+
+# Maximum number of items accepted by the /api/notes/bulk endpoints.
+BULK_MAX_ITEMS = 1000
+
+# Rows per streaming-cursor batch in GET /api/notes/export.
+EXPORT_BATCH_SIZE = 1000
+
+# Lines per transaction for NDJSON imports (POST /api/notes/import, src.importer),
+# and how many per-line errors an import report lists.
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000
+
+# Notes per transaction for POST /api/notes/delete-by-filter and
+# /status-by-filter; the write lock is released between batches.
+FILTER_BATCH_SIZE = 1000
+
+# In-memory tag index behind tags_all/tags_any/tags_none (src/tag_index.py):
+# built at startup unless disabled; tag filters matching more notes than
+# TAG_INDEX_MAX_IDS are left to SQL.
+TAG_INDEX = os.getenv("NOTES_TAG_INDEX", "1") == "1"
+TAG_INDEX_MAX_IDS = 2000
+
+# Pages of GET /api/tags/ and /api/categories/ kept in memory (see crud.listing_cache).
+LISTING_CACHE_SIZE = 256
+
+# Cards per page on the HTML notes list; later pages load on scroll.
+HTML_PAGE_SIZE = 24
+
+# Served at /static; see src/assets.py.
+STATIC_DIR = "src/static"
+
+# Responses smaller than this many bytes are sent uncompressed.
+GZIP_MINIMUM_SIZE = 1000
+GZIP_LEVEL = 6
+
+# Statements slower than this are logged with their parameters and route to
+# the "src.instrumentation.slow" logger, and to this file when it is set.
+SLOW_QUERY_MS = float(os.getenv("NOTES_SLOW_QUERY_MS", 100))
+SLOW_QUERY_LOG = os.getenv("NOTES_SLOW_QUERY_LOG")
+
+# In-process reminder scheduler (src/reminders.py): started with the app unless
+# disabled, it holds this many upcoming reminders in memory and reloads them
+# from the database at least this often.
+REMINDER_SCHEDULER = os.getenv("NOTES_REMINDER_SCHEDULER", "1") == "1"
+REMINDER_WINDOW = 1000
+REMINDER_RESYNC_SECONDS = 300
+
+# Longest range GET /api/reminders/agenda serves, and reminders listed per day.
+AGENDA_MAX_DAYS = 62
+AGENDA_PER_DAY = 20
@@ -1,11 +1,21 @@
-from sqlalchemy.orm import Session
-from datetime import datetime, UTC
+from sqlalchemy.orm import Session, defer, joinedload, selectinload, with_expression
+from sqlalchemy import (
+    String, cast, delete, false, func, insert, literal, literal_column, select, text, tuple_, union_all, update,
+)
+from datetime import date, datetime, time, timedelta, UTC
 from typing import List, Optional
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from fastapi import HTTPException
+import base64
+import json
 import logging
+import orjson
 
-from . import models, schemas
+from . import config, models, schemas, search as fts
+from .cache import VersionedCache
+from .reminders import scheduler
+from .tag_index import bitmap_ids, tag_index
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +27,6 @@ def create_category(db: Session, category: schemas.CategoryCreate) -> models.Cat
     db_cat = models.Category(name=category.name)
     db.add(db_cat)
     db.commit()
-    db.refresh(db_cat)
     return db_cat
 
 
@@ -33,7 +42,6 @@ def create_tag(db: Session, tag: schemas.TagCreate) -> models.Tag:
     db_tag = models.Tag(name=tag.name)
     db.add(db_tag)
     db.commit()
-    db.refresh(db_tag)
     return db_tag
 
 
@@ -41,8 +49,45 @@ def get_tags(db: Session) -> List[models.Tag]:
     return db.query(models.Tag).all()
 
 
-def create_note(db: Session, note_in: schemas.NoteCreate) -> models.Note:
+def _ensure_names(db: Session, model, names: List[str]) -> dict:
+    """Map each name to its row id, inserting the missing ones without committing.
+
+    ON CONFLICT DO NOTHING makes a concurrent insert of the same name harmless;
+    the re-read picks up whichever row won.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    ids = dict(db.execute(select(model.name, model.id).where(model.name.in_(names))).all())
+    missing = [name for name in names if name not in ids]
+    if missing:
+        db.execute(
+            sqlite_insert(model).on_conflict_do_nothing(index_elements=[model.name]),
+            [{"name": name} for name in missing],
+        )
+        ids.update(db.execute(select(model.name, model.id).where(model.name.in_(missing))).all())
+    return ids
+
+
+def ensure_tags(db: Session, names: List[str]) -> List[int]:
+    ids = _ensure_names(db, models.Tag, names)
+    return [ids[name] for name in dict.fromkeys(names)]
+
+
+def ensure_category(db: Session, name: Optional[str]) -> Optional[int]:
+    if not name:
+        return None
+    return _ensure_names(db, models.Category, [name])[name]
+
+
+def create_note(db: Session, note_in: schemas.NoteCreate) -> schemas.Note:
+    """Insert a note and return it as stored.
+
+    The note is read back before the commit, inside the write transaction, so
+    no second transaction is opened on the writer to build the response.
+    """
     try:
+        tag_index.begin(db)
         db_note = models.Note(
             title=note_in.title,
             content=note_in.content,
@@ -60,9 +105,14 @@ def create_note(db: Session, note_in: schemas.NoteCreate) -> models.Note:
             db_note.tags = tags
 
         db.add(db_note)
+        db.flush()
+        fts.index_notes(db, [db_note.id])
+        tag_index.record(db, added=[(db_note.id, tag_id) for tag_id in note_in.tag_ids or []])
+        note = schemas.Note.model_validate(get_note(db, db_note.id))
         db.commit()
-        db.refresh(db_note)
-        return db_note
+        if note.reminder_date is not None:
+            scheduler.reschedule([(note.id, note.reminder_date)])
+        return note
     except IntegrityError as e:
         db.rollback()
         logger.error(f"Integrity error: {e}")
@@ -74,42 +124,521 @@ def create_note(db: Session, note_in: schemas.NoteCreate) -> models.Note:
 
 
 def get_note(db: Session, note_id: int) -> Optional[models.Note]:
-    return db.query(models.Note).filter(models.Note.id == note_id).first()
+    return (
+        db.query(models.Note)
+        .options(joinedload(models.Note.category), selectinload(models.Note.tags))
+        .filter(models.Note.id == note_id)
+        .populate_existing()
+        .first()
+    )
+
+
+def note_revision_statement(note_id: int):
+    n = models.Note
+    return select(func.coalesce(n.updated_at, n.created_at).label("modified"), n.version).where(n.id == note_id)
+
+
+def get_note_revision(db: Session, note_id: int):
+    """(modified, version) of a note, or None if it does not exist."""
+    return db.execute(note_revision_statement(note_id)).first()
+
+
+def table_versions_statement(names: List[str]):
+    tv = models.TableVersion
+    return select(tv.name, tv.version, tv.changed_at).where(tv.name.in_(names))
+
+
+def get_table_versions(db: Session, names: List[str]) -> dict:
+    return {name: (version, changed_at) for name, version, changed_at in db.execute(table_versions_statement(names))}
+
+
+# (model, note_stats dimension) behind each name-sorted listing.
+NAME_LISTINGS = {"tags": (models.Tag, "tag"), "categories": (models.Category, "category")}
+
+# Pages of GET /api/tags/ and /api/categories/, each stored with the
+# table_versions it was read at. Every tag, category and note write bumps
+# those counters (see models.VERSIONED_TABLES), whatever the code path.
+listing_cache = VersionedCache(maxsize=config.LISTING_CACHE_SIZE)
+
+
+def encode_name_cursor(name: str) -> str:
+    return base64.urlsafe_b64encode(name.encode()).decode().rstrip("=")
+
+
+def decode_name_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode()
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def names_page_statement(listing: str, limit: int, after: Optional[str] = None):
+    """id, name and note_count of `listing` rows after `after`, by name.
+
+    Walks the unique index on name and reads each count from note_stats by
+    primary key, so a page costs `limit` seeks whatever the table size. The
+    row total rides along as a scalar subquery, as in notes_page_statement.
+    """
+    model, dimension = NAME_LISTINGS[listing]
+    stat = models.NoteStat
+    q = (
+        select(
+            model.id,
+            model.name,
+            func.coalesce(stat.count, 0).label("note_count"),
+            names_total_statement(listing).scalar_subquery().label("total"),
+        )
+        .outerjoin(stat, (stat.dimension == dimension) & (stat.value == cast(model.id, String)))
+        .order_by(model.name)
+        .limit(limit)
+    )
+    if after is not None:
+        q = q.where(model.name > after)
+    return q
+
+
+def names_total_statement(listing: str):
+    return select(func.count()).select_from(NAME_LISTINGS[listing][0])
+
+
+def names_page(rows, total: int, limit: int) -> dict:
+    """Shape rows fetched with limit + 1 as schemas.PaginatedTags/PaginatedCategories."""
+    items = [{"id": id, "name": name, "note_count": count} for id, name, count, _ in rows[:limit]]
+    next_cursor = encode_name_cursor(items[-1]["name"]) if len(rows) > limit else None
+    return {"items": items, "total": total, "limit": limit, "next_cursor": next_cursor}
+
+
+def listing_cache_key(listing: str, limit: int, cursor: Optional[str]) -> tuple:
+    return listing, limit, decode_name_cursor(cursor) if cursor else None
+
+
+def versions_key(versions: dict) -> tuple:
+    return tuple(sorted(versions.items()))
+
+
+def get_names_page(db: Session, listing: str, versions: dict, limit: int = 100, cursor: Optional[str] = None) -> dict:
+    """One page of tags or categories with note counts, read through listing_cache.
+
+    `versions` are the listing's table_versions, as already read for the ETag.
+    """
+    key = listing_cache_key(listing, limit, cursor)
+
+    def compute() -> dict:
+        rows = db.execute(names_page_statement(listing, limit + 1, key[2])).all()
+        # Past the last row the total has no row to ride on.
+        total = rows[0].total if rows else db.execute(names_total_statement(listing)).scalar_one()
+        return names_page(rows, total, limit)
+
+    return listing_cache.get(key, versions_key(versions), compute)
 
 
 def delete_note(db: Session, note_id: int) -> Optional[models.Note]:
     db_note = get_note(db, note_id)
     if db_note:
+        tag_index.begin(db)
+        tag_index.record(db, removed=[(note_id, tag.id) for tag in db_note.tags])
         db.delete(db_note)
+        fts.unindex_notes(db, [note_id])
         db.commit()
+        scheduler.cancel([note_id])
     return db_note
 
 
-def update_note(db: Session, note_id: int, note_data: schemas.NoteUpdate) -> Optional[models.Note]:
-    db_note = get_note(db, note_id)
-    if not db_note:
-        return None
+# Related data for the row an UPDATE ... RETURNING hands back. Spelled out in
+# SQL because SQLAlchemy renders RETURNING columns unqualified, and a bare
+# "id" inside these subqueries would bind to the inner table.
+_RETURNING_CATEGORY_NAME = literal_column(
+    "(SELECT categories.name FROM categories WHERE categories.id = notes.category_id)"
+).label("category_name")
+_RETURNING_TAGS_JSON = literal_column(
+    "(SELECT json_group_array(json_object('id', tags.id, 'name', tags.name)) "
+    "FROM note_tags JOIN tags ON tags.id = note_tags.tag_id WHERE note_tags.note_id = notes.id)"
+).label("tags_json")
 
-    for field, value in note_data.model_dump(exclude_unset=True).items():
-        if field == "tag_ids":
-            if value is None:
-                db_note.tags = []
-            else:
-                tags = db.query(models.Tag).filter(models.Tag.id.in_(value)).all()
-                db_note.tags = tags
+
+def update_note(
+    db: Session, note_id: int, note_data: schemas.NoteUpdate, expected_version: Optional[int] = None
+) -> Optional[schemas.Note]:
+    """Apply the fields set in `note_data` and return the note as stored.
+
+    The note comes back from the UPDATE's RETURNING clause, and a tag_ids
+    change deletes and inserts only the note_tags rows that differ. Given a
+    version (note_data.version, else `expected_version`) the UPDATE is a
+    compare-and-swap: if the note has moved on nothing is written and it
+    raises 409. Both versions given and different is a 400. Returns None if
+    the note does not exist.
+    """
+    changes = note_data.model_dump(exclude_unset=True, exclude={"version"})
+    if None not in (note_data.version, expected_version) and note_data.version != expected_version:
+        # e.g. an If-Match for one revision and a body version for another
+        raise HTTPException(400, "Version does not match the expected version")
+    expected = note_data.version if note_data.version is not None else expected_version
+    retag = "tag_ids" in changes
+    tag_ids = list(dict.fromkeys(changes.pop("tag_ids", None) or []))
+    tags = []
+    if tag_ids:
+        tags = db.execute(
+            select(models.Tag.id, models.Tag.name).where(models.Tag.id.in_(tag_ids)).order_by(models.Tag.id)
+        ).all()
+        if len(tags) != len(tag_ids):
+            raise HTTPException(400, "Some tag IDs not found")
+
+    try:
+        tag_index.begin(db)
+        n = models.Note
+        stmt = update(n).where(n.id == note_id).values(**changes, updated_at=datetime.now(UTC))
+        if expected is not None:
+            stmt = stmt.where(n.version == expected)
+        columns = [getattr(n, name) for name in NOTE_FIELDS if name in _PLAIN_FIELDS] + [_RETURNING_CATEGORY_NAME]
+        if not retag:
+            columns.append(_RETURNING_TAGS_JSON)
+        row = db.execute(stmt.returning(*columns), execution_options={"synchronize_session": False}).first()
+        if row is None:  # nothing written
+            if expected is not None and get_note_revision(db, note_id) is not None:
+                raise HTTPException(409, "Note has been modified")
+            return None
+
+        if retag:
+            nt = models.note_tags
+            removed = db.scalars(
+                delete(nt).where(nt.c.note_id == note_id, nt.c.tag_id.not_in(tag_ids)).returning(nt.c.tag_id)
+            ).all()
+            added = []
+            if tag_ids:
+                added = db.scalars(
+                    sqlite_insert(nt)
+                    .values([{"note_id": note_id, "tag_id": tag_id} for tag_id in tag_ids])
+                    .on_conflict_do_nothing()
+                    .returning(nt.c.tag_id)
+                ).all()
+            tag_index.record(
+                db, added=[(note_id, tag_id) for tag_id in added], removed=[(note_id, tag_id) for tag_id in removed]
+            )
+        if retag or changes.keys() & {"title", "content"}:
+            fts.index_notes(db, [note_id])
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        logger.error(f"Integrity error: {e}")
+        raise HTTPException(400, "Database constraint violation")
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error: {e}")
+        raise HTTPException(500, "Database error")
+    if "reminder_date" in changes:
+        scheduler.reschedule([(note_id, row.reminder_date)])
+
+    wanted = note_fields(None, None)
+    if retag:
+        wanted -= {"tags", "tag_ids"}
+    note = lean_notes_from_page_rows([row], False, wanted)[0]
+    if retag:
+        note["tags"] = [{"id": tag_id, "name": name} for tag_id, name in tags]
+        note["tag_ids"] = [tag_id for tag_id, _ in tags]
+    return schemas.Note.model_validate(note)
+
+
+def _record_retag(db: Session, note_id: int, old_ids: set, new_ids: set) -> None:
+    tag_index.record(
+        db,
+        added=[(note_id, tag_id) for tag_id in new_ids - old_ids],
+        removed=[(note_id, tag_id) for tag_id in old_ids - new_ids],
+    )
+
+
+def _bulk_result(results: List[schemas.BulkItemResult]) -> schemas.BulkResult:
+    succeeded = sum(1 for r in results if r.ok)
+    return schemas.BulkResult(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+def _existing_ids(db: Session, column, ids) -> set:
+    ids = set(ids)
+    if not ids:
+        return set()
+    return set(db.scalars(select(column).where(column.in_(ids))))
+
+
+def _commit_bulk(db: Session) -> None:
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        logger.error(f"Integrity error: {e}")
+        raise HTTPException(400, "Database constraint violation")
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error: {e}")
+        raise HTTPException(500, "Database error")
+
+
+def create_notes_bulk(db: Session, notes_in: List[schemas.NoteCreate]) -> schemas.BulkResult:
+    tag_index.begin(db)
+    known_tags = _existing_ids(db, models.Tag.id, (t for n in notes_in for t in n.tag_ids or []))
+    known_categories = _existing_ids(
+        db, models.Category.id, (n.category_id for n in notes_in if n.category_id is not None)
+    )
+
+    results = []
+    accepted = []
+    for index, note_in in enumerate(notes_in):
+        missing_tags = set(note_in.tag_ids or []) - known_tags
+        if missing_tags:
+            results.append(schemas.BulkItemResult(
+                index=index, ok=False, error=f"Tag IDs not found: {sorted(missing_tags)}"
+            ))
+        elif note_in.category_id is not None and note_in.category_id not in known_categories:
+            results.append(schemas.BulkItemResult(index=index, ok=False, error="Category not found"))
         else:
-            setattr(db_note, field, value)
+            results.append(schemas.BulkItemResult(index=index, ok=True))
+            accepted.append((index, note_in))
 
-    db_note.updated_at = datetime.now(UTC)
-    db.commit()
-    db.refresh(db_note)
-    return db_note
+    if accepted:
+        rows = [note_in.model_dump(exclude={"tag_ids"}) for _, note_in in accepted]
+        # SQLite hands out rowids as max(rowid) + 1 in VALUES order, so sorting
+        # the RETURNING ids lines them up with the input rows; asking SQLAlchemy
+        # for sort_by_parameter_order would degrade to one INSERT per row here.
+        note_ids = sorted(db.scalars(insert(models.Note).returning(models.Note.id), rows))
 
+        links = [
+            {"note_id": note_id, "tag_id": tag_id}
+            for note_id, (_, note_in) in zip(note_ids, accepted)
+            for tag_id in note_in.tag_ids or []
+        ]
+        if links:
+            db.execute(insert(models.note_tags), links)
+        tag_index.record(db, added=[(link["note_id"], link["tag_id"]) for link in links])
+        fts.index_notes(db, note_ids)
+        _commit_bulk(db)
 
-def get_notes_filtered(
+        for note_id, (index, _) in zip(note_ids, accepted):
+            results[index].id = note_id
+        scheduler.reschedule(
+            (note_id, note_in.reminder_date)
+            for note_id, (_, note_in) in zip(note_ids, accepted)
+            if note_in.reminder_date is not None
+        )
+
+    return _bulk_result(results)
+
+
+def insert_imported_notes(db: Session, items: List[schemas.NoteImport]) -> List[int]:
+    """Insert validated import rows, creating missing tags and categories. Does not commit."""
+    tag_index.begin(db)
+    category_ids = _ensure_names(db, models.Category, [item.category for item in items if item.category])
+    tag_ids = _ensure_names(db, models.Tag, [name for item in items for name in item.tags])
+
+    now = datetime.now(UTC)
+    rows = [
+        {
+            **item.model_dump(exclude={"category", "tags", "created_at", "updated_at"}),
+            "category_id": category_ids.get(item.category),
+            "created_at": item.created_at or now,
+            "updated_at": item.updated_at or item.created_at or now,
+        }
+        for item in items
+    ]
+    # Same rowid ordering argument as in create_notes_bulk.
+    note_ids = sorted(db.scalars(insert(models.Note).returning(models.Note.id), rows))
+
+    links = [
+        {"note_id": note_id, "tag_id": tag_ids[name]}
+        for note_id, item in zip(note_ids, items)
+        for name in item.tags
+    ]
+    if links:
+        db.execute(insert(models.note_tags), links)
+    tag_index.record(db, added=[(link["note_id"], link["tag_id"]) for link in links])
+    fts.index_notes(db, note_ids)
+    return note_ids
+
+
+# Update fields a client may send as null that the notes table does not allow.
+_NOT_NULL_FIELDS = {column.name for column in models.Note.__table__.columns if not column.nullable} - {"id", "version"}
+
+
+def update_notes_bulk(db: Session, updates: List[schemas.NoteBulkUpdate]) -> schemas.BulkResult:
+    tag_index.begin(db)
+    notes = {
+        n.id: n
+        for n in db.query(models.Note)
+        .options(selectinload(models.Note.tags))
+        .filter(models.Note.id.in_({u.id for u in updates}))
+    }
+    wanted_tags = {t for u in updates for t in u.tag_ids or []}
+    tags = {t.id: t for t in db.query(models.Tag).filter(models.Tag.id.in_(wanted_tags))} if wanted_tags else {}
+    known_categories = _existing_ids(
+        db, models.Category.id, (u.category_id for u in updates if u.category_id is not None)
+    )
+
+    results = []
+    rescheduled = []
+    now = datetime.now(UTC)
+    for index, update in enumerate(updates):
+        db_note = notes.get(update.id)
+        if db_note is None:
+            results.append(schemas.BulkItemResult(index=index, id=update.id, ok=False, error="Note not found"))
+            continue
+        missing_tags = set(update.tag_ids or []) - tags.keys()
+        if missing_tags:
+            results.append(schemas.BulkItemResult(
+                index=index, id=update.id, ok=False, error=f"Tag IDs not found: {sorted(missing_tags)}"
+            ))
+            continue
+        nulls = sorted(f for f in update.model_fields_set & _NOT_NULL_FIELDS if getattr(update, f) is None)
+        if nulls:
+            results.append(schemas.BulkItemResult(
+                index=index, id=update.id, ok=False, error=f"Fields cannot be null: {nulls}"
+            ))
+            continue
+        if update.category_id is not None and update.category_id not in known_categories:
+            results.append(schemas.BulkItemResult(index=index, id=update.id, ok=False, error="Category not found"))
+            continue
+        # The writer's transaction holds SQLite's write lock, so the version
+        # read above cannot change before the flush.
+        if update.version is not None and update.version != db_note.version:
+            results.append(schemas.BulkItemResult(index=index, id=update.id, ok=False, error="Note has been modified"))
+            continue
+
+        changes = update.model_dump(exclude_unset=True, exclude={"id", "version"})
+        for field, value in changes.items():
+            if field == "tag_ids":
+                old_ids = {tag.id for tag in db_note.tags}
+                db_note.tags = [tags[t] for t in value or []]
+                _record_retag(db, update.id, old_ids, {tag.id for tag in db_note.tags})
+            else:
+                setattr(db_note, field, value)
+        if "reminder_date" in changes:
+            rescheduled.append((update.id, changes["reminder_date"]))
+        db_note.updated_at = now
+        results.append(schemas.BulkItemResult(index=index, id=update.id, ok=True))
+
+    updated_ids = {r.id for r in results if r.ok}
+    if updated_ids:
+        db.flush()
+        fts.index_notes(db, updated_ids)
+        _commit_bulk(db)
+        scheduler.reschedule(rescheduled)
+
+    return _bulk_result(results)
+
+
+def delete_notes_bulk(db: Session, note_ids: List[int]) -> schemas.BulkResult:
+    tag_index.begin(db)
+    existing = _existing_ids(db, models.Note.id, note_ids)
+    if existing:
+        _delete_notes(db, existing)
+        _commit_bulk(db)
+        scheduler.cancel(existing)
+
+    return _bulk_result([
+        schemas.BulkItemResult(
+            index=index,
+            id=note_id,
+            ok=note_id in existing,
+            error=None if note_id in existing else "Note not found",
+        )
+        for index, note_id in enumerate(note_ids)
+    ])
+
+
+def _delete_notes(db: Session, note_ids) -> None:
+    """Delete notes with their note_tags and search rows, without committing."""
+    nt = models.note_tags
+    unlinked = db.execute(delete(nt).where(nt.c.note_id.in_(note_ids)).returning(nt.c.note_id, nt.c.tag_id))
+    tag_index.record(db, removed=[tuple(link) for link in unlinked])
+    db.execute(delete(models.Note).where(models.Note.id.in_(note_ids)))
+    fts.unindex_notes(db, note_ids)
+
+
+def _require_filter(filters: dict) -> None:
+    if all(value is None or value == [] for value in filters.values()):
+        raise HTTPException(400, "At least one filter is required")
+
+
+def _id_batches(db: Session, stmt):
+    """Run `stmt` (a LIMITed select of note ids) until it comes back empty.
+
+    The caller must make each batch stop matching before asking for the next
+    (by deleting the notes, or setting the column `stmt` excludes on), so no
+    cursor is needed and every batch takes whichever index suits the filters.
+    """
+    while True:
+        ids = db.scalars(stmt).all()
+        if not ids:
+            return
+        yield ids
+
+
+def delete_notes_by_filter(
+    db: Session, dry_run: bool = False, batch_size: int = config.FILTER_BATCH_SIZE, **filters
+) -> schemas.FilterOperationResult:
+    """Delete every note matching `filters`, batch_size notes per transaction.
+
+    Committing each batch releases SQLite's write lock in between, so other
+    writers are not held up for the whole purge. With dry_run only counts.
+    """
+    _require_filter(filters)
+    filters = resolve_tag_filters(db, filters)
+    if dry_run:
+        return schemas.FilterOperationResult(affected=count_notes_filtered(db, **filters), dry_run=True)
+
+    deleted = 0
+    for ids in _id_batches(db, filter_notes(select(models.Note.id), **filters).limit(batch_size)):
+        tag_index.begin(db)
+        _delete_notes(db, ids)
+        _commit_bulk(db)
+        scheduler.cancel(ids)
+        deleted += len(ids)
+    return schemas.FilterOperationResult(affected=deleted, dry_run=False)
+
+
+def set_status_by_filter(
     db: Session,
-    skip: int = 0,
-    limit: int = 100,
+    new_status: models.NoteStatus,
+    dry_run: bool = False,
+    batch_size: int = config.FILTER_BATCH_SIZE,
+    **filters,
+) -> schemas.FilterOperationResult:
+    """Set the status of every note matching `filters`, batched as delete_notes_by_filter.
+
+    Notes already at `new_status` are left alone (and not counted).
+    """
+    _require_filter(filters)
+    filters = resolve_tag_filters(db, filters)
+    n = models.Note
+    matching = filter_notes(select(n.id), **filters).where(n.status != new_status)
+    if dry_run:
+        affected = db.execute(select(func.count()).select_from(matching.subquery())).scalar_one()
+        return schemas.FilterOperationResult(affected=affected, dry_run=True)
+
+    changed = 0
+    for ids in _id_batches(db, matching.limit(batch_size)):
+        tag_index.begin(db)
+        db.execute(
+            update(n).where(n.id.in_(ids)).values(status=new_status, updated_at=datetime.now(UTC)),
+            execution_options={"synchronize_session": False},
+        )
+        _commit_bulk(db)
+        changed += len(ids)
+    return schemas.FilterOperationResult(affected=changed, dry_run=False)
+
+
+def encode_cursor(created_at: datetime, note_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), note_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, note_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(note_id)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def filter_notes(
+    q,
     category_id: Optional[int] = None,
     tag_id: Optional[int] = None,
     status: Optional[models.NoteStatus] = None,
@@ -117,14 +646,34 @@ def get_notes_filtered(
     before: Optional[datetime] = None,
     search: Optional[str] = None,
     priority: Optional[models.NotePriority] = None,
-) -> List[models.Note]:
-    q = db.query(models.Note)
+    tags_all: Optional[List[int]] = None,
+    tags_any: Optional[List[int]] = None,
+    tags_none: Optional[List[int]] = None,
+    note_ids: Optional[List[int]] = None,
+):
+    """Apply the listing filters to a Query or select() rooted at Note.
 
+    Every notes listing, count and bulk operation goes through here so they
+    all agree on what a filter means. note_ids is what resolve_tag_filters
+    puts in place of the tag sets when the tag index answered them.
+    """
     if category_id is not None:
         q = q.filter(models.Note.category_id == category_id)
 
     if tag_id is not None:
-        q = q.join(models.Note.tags).filter(models.Tag.id == tag_id)
+        q = q.join(models.note_tags, models.note_tags.c.note_id == models.Note.id).filter(
+            models.note_tags.c.tag_id == tag_id
+        )
+
+    nt = models.note_tags
+    for tag in tags_all or ():
+        q = q.filter(models.Note.id.in_(select(nt.c.note_id).where(nt.c.tag_id == tag)))
+    if tags_any:
+        q = q.filter(models.Note.id.in_(select(nt.c.note_id).where(nt.c.tag_id.in_(tags_any))))
+    if tags_none:
+        q = q.filter(models.Note.id.not_in(select(nt.c.note_id).where(nt.c.tag_id.in_(tags_none))))
+    if note_ids is not None:
+        q = q.filter(models.Note.id.in_(note_ids))
 
     if status is not None:
         q = q.filter(models.Note.status == status)
@@ -132,48 +681,460 @@ def get_notes_filtered(
     if priority is not None:
         q = q.filter(models.Note.priority == priority)
 
-    if important is True:
-        q = q.filter(models.Note.is_important == True)
+    if important is not None:
+        q = q.filter(models.Note.is_important == important)
 
     if before is not None:
-        q = q.filter(models.Note.reminder_date <= before)
+        # Reminders are sparse; without the hint SQLite walks the whole
+        # created_at index instead of range-scanning ix_notes_reminder_date.
+        q = q.filter(func.likelihood(models.Note.reminder_date <= before, literal_column("0.05")))
 
     if search:
-        search_escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
-        like = f"%{search_escaped}%"
-        q = q.outerjoin(models.Note.tags).filter(
-            (models.Note.title.ilike(like, escape='\\')) |
-            (models.Note.content.ilike(like, escape='\\')) |
-            (models.Tag.name.ilike(like, escape='\\'))
-        ).distinct()
+        match = fts.match_query(search)
+        if match is None:
+            q = q.filter(false())
+        else:
+            q = q.join(fts.notes_fts, fts.notes_fts.c.rowid == models.Note.id).filter(fts.match(match))
+
+    return q
+
+
+def resolve_tag_filters(db: Session, filters: dict) -> dict:
+    """Answer tags_all/tags_any/tags_none from the tag index when it is current.
+
+    Returns `filters` with the tag sets swapped for the matching note_ids, or
+    unchanged (filtered in SQL) when the index is cold or stale, or matches
+    more than config.TAG_INDEX_MAX_IDS notes: a dense result is found quickly
+    by walking the listing index anyway, and a huge IN list is not. A single
+    tag or a plain tags_any union stays in SQL too, where note_tags already
+    yields just the matching rows; the index pays off when sets intersect.
+    """
+    tag_sets = {name: filters.get(name) for name in ("tags_all", "tags_any", "tags_none")}
+    terms = len(tag_sets["tags_all"] or ()) + bool(tag_sets["tags_any"]) + len(tag_sets["tags_none"] or ())
+    if terms < 2:
+        return filters
+    bitmap = tag_index.lookup(db, **tag_sets)
+    if bitmap is None or len(bitmap) > config.TAG_INDEX_MAX_IDS:
+        return filters
+    resolved = {name: value for name, value in filters.items() if name not in tag_sets}
+    resolved["note_ids"] = bitmap_ids(bitmap)
+    return resolved
+
+
+def count_statement(total: str, **filters):
+    inner = filter_notes(select(models.Note.id), **filters)
+    if total == "estimate":
+        inner = inner.limit(config.TOTAL_ESTIMATE_CAP)
+    return select(func.count()).select_from(inner.subquery())
+
+
+def count_notes_filtered(db: Session, total: str = "exact", **filters) -> Optional[int]:
+    if total == "none":
+        return None
+    filters = resolve_tag_filters(db, filters)
+    return db.execute(count_statement(total, **filters)).scalar_one()
+
+
+def notes_page_statement(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "created",
+    total: str = "exact",
+    lean: bool = False,
+    fields: Optional[set] = None,
+    excerpt: Optional[int] = None,
+    **filters,
+):
+    """Build the select() behind get_notes_page (shared with crud_async).
+
+    Rows are (Note, [total], [snippet]), or with lean=True the columns behind
+    the requested `fields` (see lean_note_columns) followed by the same extras.
+    The total rides along as an uncorrelated scalar subquery so items and count
+    share one round trip. `excerpt` adds the first N characters of content,
+    cut in SQL; the ORM variant then defers loading content itself.
+    """
+    if lean:
+        wanted = note_fields(fields, excerpt)
+        base = select(*lean_note_columns(wanted, excerpt))
+        if "category" in wanted:
+            base = base.outerjoin(models.Category, models.Category.id == models.Note.category_id)
+    else:
+        base = select(models.Note).options(
+            joinedload(models.Note.category),
+            selectinload(models.Note.tags),
+        )
+        if excerpt is not None:
+            base = base.options(defer(models.Note.content), with_expression(models.Note.excerpt, _excerpt(excerpt)))
+    stmt = filter_notes(base, **filters)
+    searching = bool(filters.get("search"))
+
+    if searching and sort == "relevance":
+        if cursor:
+            raise HTTPException(400, "Cursor pagination is not supported with sort=relevance")
+        stmt = stmt.order_by(fts.rank(), models.Note.id.desc()).offset(skip)
+    else:
+        stmt = stmt.order_by(models.Note.created_at.desc(), models.Note.id.desc())
+        if cursor:
+            created_at, note_id = decode_cursor(cursor)
+            stmt = stmt.filter(tuple_(models.Note.created_at, models.Note.id) < (created_at, note_id))
+        else:
+            stmt = stmt.offset(skip)
+
+    if total != "none":
+        stmt = stmt.add_columns(count_statement(total, **filters).scalar_subquery().correlate(None).label("total"))
+    if searching:
+        stmt = stmt.add_columns(fts.snippet().label("snippet"))
+    return stmt.limit(limit)
+
+
+def _tags_json():
+    """Per-note JSON array of {"id", "name"} tag objects, as a correlated subquery."""
+    return (
+        select(func.json_group_array(func.json_object("id", models.Tag.id, "name", models.Tag.name)))
+        .select_from(models.note_tags.join(models.Tag, models.Tag.id == models.note_tags.c.tag_id))
+        .where(models.note_tags.c.note_id == models.Note.id)
+        .scalar_subquery()
+    )
+
+
+def _excerpt(length: int):
+    return func.substr(models.Note.content, 1, length)
+
+
+# Output keys of a lean note, in schemas.Note order, plus the optional excerpt.
+NOTE_FIELDS = (
+    "title", "content", "is_important", "status", "priority", "reminder_date", "category_id",
+    "tag_ids", "id", "created_at", "updated_at", "version", "category", "tags", "snippet", "excerpt",
+)
+_PLAIN_FIELDS = {"title", "content", "is_important", "status", "priority", "reminder_date", "category_id",
+                 "id", "created_at", "updated_at", "version"}
+
+
+def parse_note_fields(fields: Optional[str]) -> Optional[set]:
+    """Parse a comma-separated fields= parameter; None means every field."""
+    if fields is None:
+        return None
+    wanted = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = wanted - set(NOTE_FIELDS)
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+    return wanted
+
+
+def note_fields(fields: Optional[set], excerpt: Optional[int]) -> set:
+    """Keys a lean note will carry.
+
+    id and created_at are always present, since they make up the page cursor;
+    excerpt replaces content unless content is asked for explicitly.
+    """
+    if fields is None:
+        wanted = set(NOTE_FIELDS) - {"excerpt"}
+        if excerpt is not None:
+            wanted.discard("content")
+    else:
+        wanted = set(fields) | {"id", "created_at"}
+    if excerpt is not None:
+        wanted.add("excerpt")
+    else:
+        wanted.discard("excerpt")
+    return wanted
+
 
-    return q.order_by(models.Note.created_at.desc()).offset(skip).limit(limit).all()
+def lean_note_columns(wanted: set, excerpt: Optional[int] = None) -> list:
+    names = [name for name in NOTE_FIELDS if name in _PLAIN_FIELDS & wanted]
+    if "category" in wanted:
+        names.append("category_id")
+    columns = [getattr(models.Note, name) for name in dict.fromkeys(names)]
+    if "category" in wanted:
+        columns.append(models.Category.name.label("category_name"))
+    if wanted & {"tags", "tag_ids"}:
+        columns.append(_tags_json().label("tags_json"))
+    if "excerpt" in wanted:
+        columns.append(_excerpt(excerpt).label("excerpt"))
+    return columns
 
-def count_notes_filtered(
+
+def notes_from_page_rows(rows, searching: bool) -> List[models.Note]:
+    if searching:
+        for row in rows:
+            row[0].snippet = row[-1]
+    return [row[0] for row in rows]
+
+
+def lean_notes_from_page_rows(rows, searching: bool, wanted: Optional[set] = None) -> List[dict]:
+    """Turn lean page rows into dicts shaped like schemas.Note, ready for the JSON encoder."""
+    keys = [name for name in NOTE_FIELDS if name in (wanted or note_fields(None, None))]
+    notes = []
+    for row in rows:
+        m = row._mapping
+        tags = orjson.loads(m["tags_json"]) if "tags_json" in m else None
+        note = {}
+        for key in keys:
+            if key in _PLAIN_FIELDS or key == "excerpt":
+                note[key] = m[key]
+            elif key == "category":
+                note[key] = None if m["category_id"] is None else {"name": m["category_name"], "id": m["category_id"]}
+            elif key == "tags":
+                note[key] = tags
+            elif key == "tag_ids":
+                note[key] = [tag["id"] for tag in tags]
+            elif key == "snippet":
+                note[key] = m["snippet"] if searching else None
+        notes.append(note)
+    return notes
+
+
+def get_notes_page(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "created",
+    total: str = "exact",
+    lean: bool = False,
+    fields: Optional[set] = None,
+    excerpt: Optional[int] = None,
+    **filters,
+) -> tuple[list, Optional[int]]:
+    """Fetch one page of notes and, unless total="none", the filtered total.
+
+    Notes are ORM objects, or with lean=True plain dicts restricted to `fields`
+    (see lean_notes_from_page_rows).
+    """
+    filters = resolve_tag_filters(db, filters)
+    stmt = notes_page_statement(
+        skip=skip, limit=limit, cursor=cursor, sort=sort, total=total, lean=lean,
+        fields=fields, excerpt=excerpt, **filters,
+    )
+    rows = db.execute(stmt).all()
+    searching = bool(filters.get("search"))
+    if lean:
+        notes = lean_notes_from_page_rows(rows, searching, note_fields(fields, excerpt))
+    else:
+        notes = notes_from_page_rows(rows, searching)
+
+    if total == "none":
+        count = None
+    elif rows:
+        count = rows[0].total
+    elif not cursor and skip == 0:
+        count = 0
+    else:
+        count = count_notes_filtered(db, total, **filters)
+    return notes, count
+
+
+EXPORT_COLUMNS = [
+    "id", "title", "content", "is_important", "status", "priority",
+    "reminder_date", "created_at", "updated_at", "category", "tags",
+]
+
+
+def iter_notes_export(db: Session, batch_size: int = 1000, **filters):
+    """Yield every note matching `filters` as plain dicts, `batch_size` rows at a time.
+
+    Rows come off a streaming cursor as Core tuples rather than ORM objects, and
+    tag names are fetched once per batch, so memory stays flat however many
+    notes match.
+    """
+    filters = resolve_tag_filters(db, filters)
+    n = models.Note
+    stmt = filter_notes(
+        select(
+            n.id, n.title, n.content, n.is_important, n.status, n.priority,
+            n.reminder_date, n.created_at, n.updated_at, models.Category.name.label("category"),
+        ).outerjoin(models.Category, models.Category.id == n.category_id),
+        **filters,
+    ).order_by(n.id)
+
+    for batch in db.execute(stmt.execution_options(yield_per=batch_size)).partitions():
+        ids = [row.id for row in batch]
+        tags = {note_id: [] for note_id in ids}
+        for note_id, name in db.execute(
+            select(models.note_tags.c.note_id, models.Tag.name)
+            .join(models.Tag, models.Tag.id == models.note_tags.c.tag_id)
+            .where(models.note_tags.c.note_id.in_(ids))
+            .order_by(models.note_tags.c.note_id, models.Tag.name)
+        ):
+            tags[note_id].append(name)
+        yield [{**row._asdict(), "tags": tags[row.id]} for row in batch]
+
+
+def get_notes_filtered(
     db: Session,
-    category_id: int = None,
-    tag_id: int = None,
-    status: models.NoteStatus = None,
-    important: bool = None,
-    before: datetime = None,
-    search: str = None,
-    priority: models.NotePriority = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    category_id: Optional[int] = None,
+    tag_id: Optional[int] = None,
+    status: Optional[models.NoteStatus] = None,
+    important: Optional[bool] = None,
+    before: Optional[datetime] = None,
+    search: Optional[str] = None,
+    priority: Optional[models.NotePriority] = None,
+    sort: str = "created",
+    excerpt: Optional[int] = None,
+) -> List[models.Note]:
+    notes, _ = get_notes_page(
+        db,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        total="none",
+        excerpt=excerpt,
+        category_id=category_id,
+        tag_id=tag_id,
+        status=status,
+        important=important,
+        before=before,
+        search=search,
+        priority=priority,
+    )
+    return notes
+
+
+def _reminder_columns():
+    n = models.Note
+    return (n.id.label("note_id"), n.title, n.reminder_date, n.status, n.is_important)
+
+
+def reminders_statement(
+    until: datetime,
+    since: Optional[datetime] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_done: bool = False,
 ):
-    query = db.query(models.Note)
-
-    if category_id:
-        query = query.filter(models.Note.category_id == category_id)
-    if tag_id:
-        query = query.join(models.Note.tags).filter(models.Tag.id == tag_id)
-    if status:
-        query = query.filter(models.Note.status == status)
-    if priority:
-        query = query.filter(models.Note.priority == priority)
-    if important is not None:
-        query = query.filter(models.Note.important == important)
-    if before:
-        query = query.filter(models.Note.created_at < before)
-    if search:
-        query = query.filter(models.Note.title.ilike(f"%{search}%"))
+    """Reminders in [since, until] in time order, walked along ix_notes_reminder_date."""
+    n = models.Note
+    stmt = select(*_reminder_columns()).where(n.reminder_date <= until)
+    stmt = stmt.where(n.reminder_date >= since) if since is not None else stmt.where(n.reminder_date.is_not(None))
+    if cursor:
+        when, note_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(n.reminder_date, n.id) > tuple_(when, note_id))
+    if not include_done:
+        stmt = stmt.where(n.status != models.NoteStatus.done)
+    return stmt.order_by(n.reminder_date, n.id).limit(limit)
+
+
+def get_reminders(db: Session, until: datetime, limit: int = 50, **kwargs) -> schemas.DueReminders:
+    rows = db.execute(reminders_statement(until, limit=limit + 1, **kwargs)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].reminder_date, rows[-1].note_id)
+    return schemas.DueReminders(items=[row._asdict() for row in rows], next_cursor=next_cursor)
+
+
+def _day_bounds(start: date, days: int) -> List[tuple]:
+    first = datetime.combine(start, time.min)
+    return [(start + timedelta(days=i), first + timedelta(days=i), first + timedelta(days=i + 1)) for i in range(days)]
+
+
+def agenda_counts_statement(start: date, days: int):
+    """Reminders per day, one index range count per day.
+
+    Bucketing with date(reminder_date) would evaluate it on every reminder in
+    the range; day-aligned ranges let each count walk ix_notes_reminder_date.
+    """
+    n = models.Note
+    return union_all(*(
+        select(literal(day.isoformat()).label("day"), func.count().label("day_count"))
+        .where(n.reminder_date >= lower, n.reminder_date < upper)
+        for day, lower, upper in _day_bounds(start, days)
+    ))
+
+
+def agenda_items_statement(start: date, days: int, per_day: int):
+    """Each day's first `per_day` reminders: a LIMITed index seek per day."""
+    n = models.Note
+    parts = []
+    for day, lower, upper in _day_bounds(start, days):
+        first = (
+            select(literal(day.isoformat()).label("day"), *_reminder_columns())
+            .where(n.reminder_date >= lower, n.reminder_date < upper)
+            .order_by(n.reminder_date, n.id)
+            .limit(per_day)
+            .subquery()
+        )
+        parts.append(select(first))
+    return union_all(*parts)
+
+
+def get_agenda(db: Session, start: date, days: int, per_day: int) -> schemas.Agenda:
+    buckets = {
+        row.day: schemas.AgendaDay(date=date.fromisoformat(row.day), count=row.day_count)
+        for row in db.execute(agenda_counts_statement(start, days))
+    }
+    if per_day:
+        for row in db.execute(agenda_items_statement(start, days, per_day)):
+            buckets[row.day].reminders.append(schemas.Reminder(
+                note_id=row.note_id,
+                title=row.title,
+                reminder_date=row.reminder_date,
+                status=row.status,
+                is_important=row.is_important,
+            ))
+    return schemas.Agenda(start=start, days=list(buckets.values()))
+
+
+def note_stats_statement():
+    s = models.NoteStat
+    return (
+        select(s.dimension, s.value, s.count, func.coalesce(models.Category.name, models.Tag.name).label("name"))
+        .outerjoin(models.Category, (s.dimension == "category") & (models.Category.id == s.value))
+        .outerjoin(models.Tag, (s.dimension == "tag") & (models.Tag.id == s.value))
+        .where(s.count != 0)
+    )
+
+
+def get_note_stats(db: Session) -> schemas.NoteStats:
+    """Counts by status, priority, importance, category and tag, read from note_stats.
+
+    Costs one row per distinct category/tag/enum value, independent of how many
+    notes there are.
+    """
+    stats = schemas.NoteStats(
+        total=0,
+        by_status={status: 0 for status in schemas.NoteStatus},
+        by_priority={priority: 0 for priority in schemas.NotePriority},
+        important=0,
+        by_category=[],
+        by_tag=[],
+    )
+    for dimension, value, count, name in db.execute(note_stats_statement()):
+        if dimension == "total":
+            stats.total = count
+        elif dimension == "status":
+            stats.by_status[schemas.NoteStatus(value)] = count
+        elif dimension == "priority":
+            stats.by_priority[schemas.NotePriority(value)] = count
+        elif dimension == "important":
+            if value == "1":
+                stats.important = count
+        elif dimension == "category":
+            stats.by_category.append(schemas.StatBucket(id=None if value == "none" else int(value), name=name, count=count))
+        elif dimension == "tag":
+            stats.by_tag.append(schemas.StatBucket(id=int(value), name=name, count=count))
+    stats.by_category.sort(key=lambda b: -b.count)
+    stats.by_tag.sort(key=lambda b: -b.count)
+    return stats
+
+
+def note_stats_drift(db: Session) -> List[tuple]:
+    """(dimension, value, stored, actual) for every counter that disagrees with the notes."""
+    actual = {(d, str(v)): c for d, v, c in db.execute(text(models.NOTE_STATS_FROM_NOTES))}
+    stored = {(s.dimension, s.value): s.count for s in db.query(models.NoteStat)}
+    return sorted(
+        (dimension, value, stored.get((dimension, value), 0), actual.get((dimension, value), 0))
+        for dimension, value in actual.keys() | stored.keys()
+        if stored.get((dimension, value), 0) != actual.get((dimension, value), 0)
+    )
+
 
-    return query.count()
\ No newline at end of file
+def rebuild_note_stats(db: Session) -> None:
+    """Recompute note_stats from the notes. Does not commit."""
+    db.execute(delete(models.NoteStat))
+    db.execute(text(f"INSERT INTO note_stats (dimension, value, count) {models.NOTE_STATS_FROM_NOTES}"))
@@ -0,0 +1,184 @@
+"""AsyncSession counterparts of the hot paths in crud.py.
+
+Statements are shared with crud.py wherever possible; relationships are
+always eager-loaded because lazy loads are not allowed on AsyncSession.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import select
+from typing import List, Optional
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from fastapi import HTTPException
+import logging
+
+from . import crud, models, schemas, search as fts
+from .reminders import scheduler
+from .tag_index import tag_index
+
+logger = logging.getLogger(__name__)
+
+
+async def get_category_by_name(db: AsyncSession, name: str) -> Optional[models.Category]:
+    return await db.scalar(select(models.Category).where(models.Category.name == name))
+
+
+async def create_category(db: AsyncSession, category: schemas.CategoryCreate) -> models.Category:
+    db_cat = models.Category(name=category.name)
+    db.add(db_cat)
+    await db.commit()
+    return db_cat
+
+
+async def get_categories(db: AsyncSession) -> List[models.Category]:
+    return (await db.scalars(select(models.Category))).all()
+
+
+async def get_tag_by_name(db: AsyncSession, name: str) -> Optional[models.Tag]:
+    return await db.scalar(select(models.Tag).where(models.Tag.name == name))
+
+
+async def create_tag(db: AsyncSession, tag: schemas.TagCreate) -> models.Tag:
+    db_tag = models.Tag(name=tag.name)
+    db.add(db_tag)
+    await db.commit()
+    return db_tag
+
+
+async def get_tags(db: AsyncSession) -> List[models.Tag]:
+    return (await db.scalars(select(models.Tag))).all()
+
+
+async def get_note(db: AsyncSession, note_id: int) -> Optional[models.Note]:
+    return await db.scalar(
+        select(models.Note)
+        .options(joinedload(models.Note.category), selectinload(models.Note.tags))
+        .where(models.Note.id == note_id)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def get_note_revision(db: AsyncSession, note_id: int):
+    return (await db.execute(crud.note_revision_statement(note_id))).first()
+
+
+async def get_table_versions(db: AsyncSession, names: List[str]) -> dict:
+    rows = await db.execute(crud.table_versions_statement(names))
+    return {name: (version, changed_at) for name, version, changed_at in rows}
+
+
+async def get_names_page(
+    db: AsyncSession, listing: str, versions: dict, limit: int = 100, cursor: Optional[str] = None
+) -> dict:
+    key = crud.listing_cache_key(listing, limit, cursor)
+    version = crud.versions_key(versions)
+    page = crud.listing_cache.lookup(key, version)
+    if page is None:
+        rows = (await db.execute(crud.names_page_statement(listing, limit + 1, key[2]))).all()
+        total = rows[0].total if rows else (await db.execute(crud.names_total_statement(listing))).scalar_one()
+        page = crud.names_page(rows, total, limit)
+        crud.listing_cache.put(key, version, page)
+    return page
+
+
+async def _get_tags_by_ids(db: AsyncSession, tag_ids: List[int]) -> List[models.Tag]:
+    return (await db.scalars(select(models.Tag).where(models.Tag.id.in_(tag_ids)))).all()
+
+
+async def create_note(db: AsyncSession, note_in: schemas.NoteCreate) -> schemas.Note:
+    """Insert a note and return it as stored, read back before the commit as in crud.create_note."""
+    try:
+        await db.run_sync(tag_index.begin)
+        db_note = models.Note(
+            title=note_in.title,
+            content=note_in.content,
+            is_important=note_in.is_important,
+            status=note_in.status,
+            priority=note_in.priority,
+            reminder_date=note_in.reminder_date,
+            category_id=note_in.category_id,
+        )
+
+        if note_in.tag_ids:
+            tags = await _get_tags_by_ids(db, note_in.tag_ids)
+            if len(tags) != len(note_in.tag_ids):
+                raise HTTPException(400, "Some tag IDs not found")
+            db_note.tags = tags
+
+        db.add(db_note)
+        await db.flush()
+        await db.run_sync(fts.index_notes, [db_note.id])
+        tag_index.record(db, added=[(db_note.id, tag_id) for tag_id in note_in.tag_ids or []])
+        note = schemas.Note.model_validate(await get_note(db, db_note.id))
+        await db.commit()
+        if note.reminder_date is not None:
+            scheduler.reschedule([(note.id, note.reminder_date)])
+        return note
+    except IntegrityError as e:
+        await db.rollback()
+        logger.error(f"Integrity error: {e}")
+        raise HTTPException(400, "Database constraint violation")
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f"Database error: {e}")
+        raise HTTPException(500, "Database error")
+
+
+async def delete_note(db: AsyncSession, note_id: int) -> Optional[models.Note]:
+    db_note = await get_note(db, note_id)
+    if db_note:
+        await db.run_sync(tag_index.begin)
+        tag_index.record(db, removed=[(note_id, tag.id) for tag in db_note.tags])
+        await db.delete(db_note)
+        await db.run_sync(fts.unindex_notes, [note_id])
+        await db.commit()
+        scheduler.cancel([note_id])
+    return db_note
+
+
+async def update_note(
+    db: AsyncSession, note_id: int, note_data: schemas.NoteUpdate, expected_version: Optional[int] = None
+) -> Optional[schemas.Note]:
+    # A handful of statements that each depend on the last: run the sync version in one hop.
+    return await db.run_sync(crud.update_note, note_id, note_data, expected_version)
+
+
+async def count_notes_filtered(db: AsyncSession, total: str = "exact", **filters) -> Optional[int]:
+    if total == "none":
+        return None
+    filters = await db.run_sync(crud.resolve_tag_filters, filters)
+    return (await db.execute(crud.count_statement(total, **filters))).scalar_one()
+
+
+async def get_notes_page(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "created",
+    total: str = "exact",
+    lean: bool = False,
+    fields: Optional[set] = None,
+    excerpt: Optional[int] = None,
+    **filters,
+) -> tuple[list, Optional[int]]:
+    filters = await db.run_sync(crud.resolve_tag_filters, filters)
+    stmt = crud.notes_page_statement(
+        skip=skip, limit=limit, cursor=cursor, sort=sort, total=total, lean=lean,
+        fields=fields, excerpt=excerpt, **filters,
+    )
+    rows = (await db.execute(stmt)).all()
+    searching = bool(filters.get("search"))
+    if lean:
+        notes = crud.lean_notes_from_page_rows(rows, searching, crud.note_fields(fields, excerpt))
+    else:
+        notes = crud.notes_from_page_rows(rows, searching)
+
+    if total == "none":
+        count = None
+    elif rows:
+        count = rows[0].total
+    elif not cursor and skip == 0:
+        count = 0
+    else:
+        count = await count_notes_filtered(db, total, **filters)
+    return notes, count
@@ -1,16 +1,111 @@
-from sqlalchemy import create_engine
+import anyio
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
-from .config import DATABASE_URL
+from .config import DATABASE_URL, READ_POOL_SIZE, SQLITE_PRAGMAS
+from .instrumentation import instrument
+from .metrics import TimedQueuePool, register_engine
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Pragmas that would fail (or are pointless) on a query_only connection.
+_WRITER_ONLY_PRAGMAS = {"journal_mode"}
+
+
+def apply_sqlite_profile(engine, pragmas=None, read_only=False, begin_immediate=False):
+    """Set the configured pragmas on every new connection of `engine`.
+
+    read_only connections get query_only=ON. begin_immediate makes every
+    transaction take SQLite's write lock up front, so concurrent writers
+    queue on busy_timeout instead of failing with "database is locked"
+    when a read transaction later tries to upgrade.
+    """
+    pragmas = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+    if read_only:
+        pragmas = {k: v for k, v in pragmas.items() if k not in _WRITER_ONLY_PRAGMAS}
+        pragmas["query_only"] = "ON"
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+        if begin_immediate:
+            # Take transaction control away from the driver; see _begin below.
+            dbapi_connection.isolation_level = None
+
+    if begin_immediate:
+        @event.listens_for(engine, "begin")
+        def _begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+# One connection for all writes: SQLite serialises writers anyway, and doing
+# it in the pool keeps them from fighting over the file lock.
+WRITER_CONNECTIONS = 1
+engine = apply_sqlite_profile(create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=TimedQueuePool,
+    pool_size=WRITER_CONNECTIONS,
+    max_overflow=0,
+), begin_immediate=True)
+# Readers never wait on the pool: a bounded pool can deadlock against the
+# threadpool, since a request keeps its connection until its response has
+# been serialised on another worker thread.
+read_engine = apply_sqlite_profile(create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=TimedQueuePool,
+    pool_size=READ_POOL_SIZE,
+    max_overflow=-1,
+), read_only=True)
+instrument(engine)
+instrument(read_engine)
+register_engine("writer", engine)
+register_engine("reader", read_engine)
+
+# Writes return what they committed; reloading it would open a second
+# BEGIN IMMEDIATE transaction just to serialise the response.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+READ_METHODS = {"GET", "HEAD"}
+
+
+# Writing requests queue for the writer here, on the event loop. Waiting in the
+# pool instead would park a threadpool worker per request, and once they are
+# all parked the request holding the connection has no thread left to finish
+# on, so everyone times out.
+writer_slots = anyio.Semaphore(WRITER_CONNECTIONS)
+
+
+async def writer_slot(request: Request):
+    if request.method in READ_METHODS:
+        yield
+        return
+    async with writer_slots:
+        yield
+
+
+def get_writer_sessionmaker():
+    """The writer sessionmaker, for routes that open a session per unit of work.
+
+    Such routes take writer_slots around each session themselves; see
+    importer.import_stream.
+    """
+    return SessionLocal
+
+
+def get_db(request: Request, _slot: None = Depends(writer_slot)):
+    """Yield a session on the read pool for GET/HEAD, on the writer otherwise."""
+    factory = ReadSessionLocal if request.method in READ_METHODS else SessionLocal
+    db = factory()
     try:
         yield db
     finally:
         db.close()
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+Base.metadata.create_all(bind=engine)
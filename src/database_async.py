@@ -0,0 +1,27 @@
+from fastapi import Request
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from .config import ASYNC_DATABASE_URL, READ_POOL_SIZE
+from .database import READ_METHODS, WRITER_CONNECTIONS, apply_sqlite_profile
+from .instrumentation import instrument
+from .metrics import register_engine
+
+# The same split as database.py: writes share one BEGIN IMMEDIATE connection,
+# reads get query_only connections. Waiting for the writer is an await here,
+# so unlike the sync stack it ties up no thread.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=WRITER_CONNECTIONS, max_overflow=0)
+async_read_engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=READ_POOL_SIZE, max_overflow=-1)
+apply_sqlite_profile(async_engine.sync_engine, begin_immediate=True)
+apply_sqlite_profile(async_read_engine.sync_engine, read_only=True)
+instrument(async_engine.sync_engine)
+instrument(async_read_engine.sync_engine)
+register_engine("async", async_engine.sync_engine)
+register_engine("async_reader", async_read_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db(request: Request):
+    """Yield a session on the read engine for GET/HEAD, on the writer otherwise."""
+    factory = AsyncReadSessionLocal if request.method in READ_METHODS else AsyncSessionLocal
+    async with factory() as db:
+        yield db
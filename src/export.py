@@ -0,0 +1,57 @@
+"""Serializers for the streaming notes export (see crud.iter_notes_export)."""
+from datetime import datetime
+from enum import Enum
+from typing import Iterable, Iterator, List
+import csv
+import io
+import json
+import zlib
+
+from .crud import EXPORT_COLUMNS
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def ndjson_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(
+            json.dumps({key: _plain(row[key]) for key in EXPORT_COLUMNS}, ensure_ascii=False) + "\n"
+            for row in batch
+        ).encode()
+
+
+def csv_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        for row in batch:
+            writer.writerow(
+                ",".join(row[key]) if key == "tags" else _plain(row[key])
+                for key in EXPORT_COLUMNS
+            )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+SERIALIZERS = {"ndjson": ndjson_chunks, "csv": csv_chunks}
@@ -0,0 +1,167 @@
+"""Bulk NDJSON import, shared by POST /api/notes/import and the command line.
+
+    python -m src.importer notes.ndjson [--batch-size 1000]
+
+Lines are parsed incrementally and validated one batch at a time; each batch
+resolves its tag and category names in bulk and is inserted in its own
+transaction, so a bad line or a failed batch is reported without aborting the
+rest of the load.
+"""
+from contextlib import nullcontext
+from typing import AsyncContextManager, AsyncIterable, Callable, ContextManager, Iterable, Iterator, List, Optional
+import argparse
+import logging
+import sys
+
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import config, crud, schemas
+from .reminders import scheduler
+
+logger = logging.getLogger(__name__)
+
+Progress = Callable[[schemas.ImportResult, int], None]
+
+
+def _fail(result: schemas.ImportResult, line: int, error: str) -> None:
+    result.failed += 1
+    if len(result.errors) < config.IMPORT_MAX_ERRORS:
+        result.errors.append(schemas.ImportLineError(line=line, error=error))
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'line'}: {e['msg']}" for e in error.errors()
+    )
+
+
+def import_batch(db: Session, batch: List[tuple[int, bytes]], result: schemas.ImportResult) -> None:
+    """Validate and insert one batch of (line number, raw line) in a single transaction."""
+    items, lines = [], []
+    for line, raw in batch:
+        try:
+            items.append(schemas.NoteImport.model_validate_json(raw))
+            lines.append(line)
+        except ValidationError as e:
+            _fail(result, line, _describe(e))
+
+    if not items:
+        return
+    try:
+        note_ids = crud.insert_imported_notes(db, items)
+        db.commit()
+        result.imported += len(items)
+        scheduler.reschedule(
+            (note_id, item.reminder_date) for note_id, item in zip(note_ids, items) if item.reminder_date is not None
+        )
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Import batch ending at line {batch[-1][0]} failed: {e}")
+        for line in lines:
+            _fail(result, line, "Database error")
+
+
+def _numbered(lines: Iterable[bytes]) -> Iterator[tuple[int, bytes]]:
+    for number, line in enumerate(lines, start=1):
+        if line.strip():
+            yield number, line
+
+
+async def asplit_lines(chunks: AsyncIterable[bytes]):
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+def import_lines(
+    db: Session,
+    lines: Iterable[bytes],
+    batch_size: int = config.IMPORT_BATCH_SIZE,
+    progress: Optional[Progress] = None,
+) -> schemas.ImportResult:
+    result = schemas.ImportResult()
+    batch = []
+    for numbered in _numbered(lines):
+        batch.append(numbered)
+        if len(batch) >= batch_size:
+            import_batch(db, batch, result)
+            if progress:
+                progress(result, batch[-1][0])
+            batch = []
+    if batch:
+        import_batch(db, batch, result)
+        if progress:
+            progress(result, batch[-1][0])
+    return result
+
+
+async def import_stream(
+    chunks: AsyncIterable[bytes],
+    session_factory: Callable[[], ContextManager[Session]],
+    batch_size: int = config.IMPORT_BATCH_SIZE,
+    writer_slot: AsyncContextManager = nullcontext(),
+) -> schemas.ImportResult:
+    """Import an NDJSON request body as it arrives; database work runs in the threadpool.
+
+    The body is read and split without touching the database. Each batch then
+    waits for `writer_slot` and runs in its own session, so a slow upload
+    holds the writer only while a batch is being written.
+    """
+    result = schemas.ImportResult()
+
+    def write(batch):
+        with session_factory() as db:
+            import_batch(db, batch, result)
+
+    async def flush(batch):
+        async with writer_slot:
+            await run_in_threadpool(write, batch)
+
+    batch = []
+    number = 0
+    async for line in asplit_lines(chunks):
+        number += 1
+        if not line.strip():
+            continue
+        batch.append((number, line))
+        if len(batch) >= batch_size:
+            await flush(batch)
+            logger.info(f"Import: {result.imported} imported, {result.failed} failed by line {number}")
+            batch = []
+    if batch:
+        await flush(batch)
+    return result
+
+
+def _print_progress(result: schemas.ImportResult, line: int) -> None:
+    print(f"line {line}: {result.imported} imported, {result.failed} failed", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import notes from an NDJSON file ('-' for stdin).")
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=config.IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+
+    source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    with source, SessionLocal() as db:
+        result = import_lines(db, source, batch_size=args.batch_size, progress=_print_progress)
+
+    for error in result.errors:
+        print(f"line {error.line}: {error.error}", file=sys.stderr)
+    print(f"{result.imported} imported, {result.failed} failed")
+    sys.exit(1 if result.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
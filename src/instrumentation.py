@@ -0,0 +1,142 @@
+"""Per-request SQL accounting: query count and database time.
+
+instrument() hooks an engine's cursor events; SQLTimingMiddleware opens a
+RequestStats for each HTTP request, reports it in a Server-Timing header and
+a log line, and statements slower than config.SLOW_QUERY_MS go to the
+"src.instrumentation.slow" logger with their parameters and route.
+Sync endpoints run in the threadpool with a copy of the request's context,
+so the same RequestStats is seen from there.
+"""
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+import logging
+import time
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import config
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(f"{__name__}.slow")
+
+if config.SLOW_QUERY_LOG:
+    slow_logger.addHandler(logging.FileHandler(config.SLOW_QUERY_LOG))
+    slow_logger.setLevel(logging.WARNING)
+
+# Longest parameter repr written to the slow-query log (executemany batches can be huge).
+_MAX_PARAMS_CHARS = 1000
+
+
+@dataclass
+class RequestStats:
+    scope: dict
+    queries: int = 0
+    db_seconds: float = 0.0
+
+    @property
+    def route(self) -> str:
+        """Path template of the matched route, or the raw path before routing / for mounts."""
+        route = self.scope.get("route")
+        return getattr(route, "path", self.scope["path"])
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f"app;dur={(total_seconds - self.db_seconds) * 1000:.1f}, "
+            f"total;dur={total_seconds * 1000:.1f}"
+        )
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("sql_request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def _log_slow(elapsed: float, statement: str, parameters, stats: Optional[RequestStats]) -> None:
+    route = f"{stats.scope['method']} {stats.route}" if stats else "-"
+    params = repr(parameters)
+    if len(params) > _MAX_PARAMS_CHARS:
+        params = params[:_MAX_PARAMS_CHARS] + "..."
+    slow_logger.warning(
+        f"Slow query {elapsed * 1000:.1f} ms in {route}: {statement} params={params}",
+        extra={"route": route, "duration_ms": elapsed * 1000, "statement": statement, "parameters": params},
+    )
+
+
+def instrument(engine):
+    """Time every statement executed on `engine` (a sync Engine or AsyncEngine.sync_engine)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        if elapsed * 1000 >= config.SLOW_QUERY_MS:
+            _log_slow(elapsed, statement, parameters, stats)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if started:
+            started.pop()
+
+    return engine
+
+
+class SQLTimingMiddleware:
+    """Adds Server-Timing (db, app, total) to every response and logs one line per request.
+
+    Headers go out before a streaming body is produced, so for streamed
+    responses the header only covers the work done up to that point; the log
+    line is written at the end and covers the whole request.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total_ms = (time.perf_counter() - started) * 1000
+            logger.info(
+                f"{scope['method']} {stats.route} {status} queries={stats.queries} "
+                f"db_ms={stats.db_seconds * 1000:.1f} total_ms={total_ms:.1f}",
+                extra={
+                    "method": scope["method"],
+                    "route": stats.route,
+                    "status": status,
+                    "queries": stats.queries,
+                    "db_ms": stats.db_seconds * 1000,
+                    "total_ms": total_ms,
+                },
+            )
@@ -1,17 +1,49 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from . import models, database, config
+from .assets import CompressionMiddleware, static_assets
+from .instrumentation import SQLTimingMiddleware
+from .metrics import MetricsMiddleware
 from .routers import notes
+from .routers import metrics
+from .routers import reminders
 from .routers import frontend
+from .reminders import scheduler
+from .tag_index import tag_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.REMINDER_SCHEDULER:
+        await scheduler.start(database.ReadSessionLocal)
+    if config.TAG_INDEX:
+        tag_index.start(database.ReadSessionLocal)
+    yield
+    await scheduler.stop()
+
+
+app = FastAPI(title=config.APP_NAME, lifespan=lifespan)
 
-app = FastAPI(title=config.APP_NAME)
+if config.DB_MODE == "async":
+    from .routers import notes_async
+
+    app.include_router(notes_async.router)
 
 app.include_router(notes.router)
 
 app.include_router(frontend.router)
 
-app.mount("/static", StaticFiles(directory="src/static"), name="static")
+app.include_router(reminders.router)
+
+app.include_router(metrics.router)
+
+app.add_middleware(CompressionMiddleware, minimum_size=config.GZIP_MINIMUM_SIZE, compresslevel=config.GZIP_LEVEL)
+app.add_middleware(SQLTimingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+app.mount("/static", static_assets, name="static")
 
 @app.get("/", tags=["root"])
 def root():
@@ -0,0 +1,242 @@
+"""In-process metrics in the Prometheus text format, served at /metrics.
+
+Counters and histograms are sharded per thread: each thread only ever adds
+to its own dict, so the hot path takes no lock, and a scrape sums the shards.
+Histogram buckets are fixed up front and an observation is one bisect plus
+one increment. Gauges (in-flight requests, pool and threadpool usage) are
+read at scrape time instead of being maintained on every request.
+"""
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, List, Tuple
+import threading
+import time
+
+import anyio.to_thread
+import sniffio
+from sqlalchemy.pool import QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+ROWS_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_shards: List[dict] = []
+
+
+class _Shard(threading.local):
+    def __init__(self):
+        self.values = {}
+        _shards.append(self.values)  # list.append is atomic under the GIL
+
+
+_local = _Shard()
+
+
+def _merged() -> Dict[tuple, object]:
+    """Sum every thread's shard. dict.items() is copied in one C call, so owners can keep writing."""
+    totals = {}
+    for shard in list(_shards):
+        for key, value in list(shard.items()):
+            if isinstance(value, list):
+                current = totals.get(key)
+                totals[key] = value[:] if current is None else [a + b for a, b in zip(current, value)]
+            else:
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        REGISTRY.append(self)
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        values = _local.values
+        key = (self.name, label_values)
+        values[key] = values.get(key, 0) + amount
+
+    def samples(self, merged: dict) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labels, key[1])} {_number(value)}"
+            for key, value in sorted(merged.items(), key=lambda kv: kv[0][1])
+        ]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *label_values) -> None:
+        values = _local.values
+        key = (self.name, label_values)
+        counts = values.get(key)
+        if counts is None:
+            # One slot per bucket, one for +Inf, then the sum.
+            counts = values[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self, merged: dict) -> List[str]:
+        lines = []
+        for (_, label_values), counts in sorted(merged.items(), key=lambda kv: kv[0][1]):
+            cumulative = list(accumulate(counts[:-1]))
+            for bound, count in zip(self.buckets + (float("inf"),), cumulative):
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {cumulative[-1]}")
+        return lines
+
+
+class Gauge:
+    """Value computed when scraped: `collect` returns {label values: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], collect: Callable[[], dict]):
+        self.name, self.help, self.labels, self.collect = name, help, labels, collect
+        REGISTRY.append(self)
+
+    def samples(self, merged: dict) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+            for label_values, value in sorted(self.collect().items())
+        ]
+
+
+REGISTRY: list = []
+
+# Requests being served, by id: their scope gains "route" once routing is done,
+# so in-flight counts per route are read off it at scrape time.
+_in_flight: Dict[int, dict] = {}
+
+# Engines whose pools are reported, by the name used in the pool label.
+_engines: Dict[str, object] = {}
+
+
+def route_label(scope: dict) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", "other")
+
+
+def _in_flight_by_route() -> dict:
+    counts = {}
+    for scope in list(_in_flight.values()):
+        key = (scope["method"], route_label(scope))
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _pool_stat(stat: str) -> Callable[[], dict]:
+    def collect() -> dict:
+        return {(name,): getattr(engine.pool, stat)() for name, engine in _engines.items()}
+    return collect
+
+
+def _threadpool(stat: str) -> Callable[[], dict]:
+    def collect() -> dict:
+        # The limiter belongs to the running event loop; outside one there is nothing to report.
+        try:
+            limiter = anyio.to_thread.current_default_thread_limiter()
+        except sniffio.AsyncLibraryNotFoundError:
+            return {}
+        values = {
+            "busy": limiter.borrowed_tokens,
+            "limit": limiter.total_tokens,
+            "waiting": limiter.statistics().tasks_waiting,
+        }
+        return {(): values[stat]}
+    return collect
+
+
+REQUESTS = Counter("notes_http_requests_total", "HTTP requests served.", ("method", "route", "status"))
+LATENCY = Histogram("notes_http_request_duration_seconds", "Time to serve a request, body included.", ("method", "route"))
+Gauge("notes_http_requests_in_flight", "Requests currently being served.", ("method", "route"), _in_flight_by_route)
+LIST_ROWS = Histogram("notes_list_rows", "Notes returned per list page.", ("listing",), ROWS_BUCKETS)
+POOL_WAIT = Histogram("notes_db_pool_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",), POOL_WAIT_BUCKETS)
+Gauge("notes_db_pool_checked_out", "Connections currently checked out.", ("pool",), _pool_stat("checkedout"))
+Gauge("notes_db_pool_overflow", "Connections open beyond pool_size (negative: unused pool slots).", ("pool",), _pool_stat("overflow"))
+Gauge("notes_db_pool_size", "Configured pool size.", ("pool",), _pool_stat("size"))
+Gauge("notes_threadpool_busy_threads", "Worker threads running sync endpoints and dependencies.", (), _threadpool("busy"))
+Gauge("notes_threadpool_limit_threads", "Worker thread limit.", (), _threadpool("limit"))
+Gauge("notes_threadpool_waiting_tasks", "Tasks queued for a worker thread.", (), _threadpool("waiting"))
+
+
+def render() -> str:
+    merged = _merged()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples({key: value for key, value in merged.items() if key[0] == metric.name}))
+    return "\n".join(lines) + "\n"
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait, for engines passed to register_engine."""
+
+    metrics_name = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started, self.metrics_name)
+
+
+def register_engine(name: str, engine) -> None:
+    _engines[name] = engine
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.metrics_name = name
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = id(scope)
+        _in_flight[request_id] = scope
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            del _in_flight[request_id]
+            route = route_label(scope)
+            REQUESTS.inc(scope["method"], route, str(status))
+            LATENCY.observe(time.perf_counter() - started, scope["method"], route)
@@ -4,12 +4,17 @@ from sqlalchemy import (
     String,
     Boolean,
     DateTime,
+    Float,
     Table,
     ForeignKey,
     Enum as SQLEnum,
     Text,
+    Index,
+    DDL,
+    event,
+    text,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import query_expression, relationship
 from datetime import datetime, UTC
 from enum import Enum
 from .database import Base
@@ -33,6 +38,7 @@ note_tags = Table(
     Base.metadata,
     Column("note_id", Integer, ForeignKey("notes.id"), primary_key=True),
     Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    Index("ix_note_tags_tag_id_note_id", "tag_id", "note_id"),
 )
 
 
@@ -64,10 +70,166 @@ class Note(Base):
     status = Column(SQLEnum(NoteStatus), default=NoteStatus.active, nullable=False)
     priority = Column(SQLEnum(NotePriority), default=NotePriority.medium, nullable=False)
     reminder_date = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(UTC), nullable=False)
-    updated_at = Column(DateTime, default=datetime.now(UTC), nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC), nullable=False)
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),
+        nullable=True,
+    )
+    # Bumped by every UPDATE SQLAlchemy issues against the row; crud.update_note
+    # compares it to the version a client read, so concurrent edits conflict.
+    version = Column(Integer, default=1, server_default=text("1"), onupdate=text("version + 1"), nullable=False)
 
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     category = relationship("Category", back_populates="notes")
 
-    tags = relationship("Tag", secondary=note_tags, back_populates="notes")
\ No newline at end of file
+    tags = relationship("Tag", secondary=note_tags, back_populates="notes")
+
+    __table_args__ = (
+        Index("ix_notes_created_at_id", "created_at", "id"),
+        # Each equality filter in crud.get_notes_filtered is paired with the
+        # listing sort so SQLite can filter and walk the order in one index.
+        Index("ix_notes_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_notes_priority_created_at_id", "priority", "created_at", "id"),
+        Index("ix_notes_category_id_created_at_id", "category_id", "created_at", "id"),
+        Index("ix_notes_is_important_created_at_id", "is_important", "created_at", "id"),
+        Index("ix_notes_reminder_date", "reminder_date"),
+    )
+
+    # Filled in by queries that return search excerpts (see crud.get_notes_filtered).
+    snippet = None
+
+    # First N characters of content, loaded only when a listing asks for it
+    # (crud.notes_page_statement with excerpt=N).
+    excerpt = query_expression()
+
+    @property
+    def tag_ids(self):
+        return [tag.id for tag in self.tags]
+
+
+# Full-text index over title, content and tag names, kept in sync by crud.
+event.listen(
+    Note.__table__,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts "
+        "USING fts5(title, content, tags, tokenize='unicode61 remove_diacritics 2')"
+    ).execute_if(dialect="sqlite"),
+)
+event.listen(
+    Note.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS notes_fts").execute_if(dialect="sqlite"),
+)
+
+
+class TableVersion(Base):
+    """Write counter per resource, bumped by triggers; feeds collection ETags."""
+    __tablename__ = "table_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    changed_at = Column(Float, nullable=True)  # unix seconds
+
+
+# Which table_versions row a write to each table bumps. Tag links change the
+# notes payload, so they count as a notes change.
+VERSIONED_TABLES = {"notes": "notes", "note_tags": "notes", "tags": "tags", "categories": "categories"}
+
+event.listen(
+    TableVersion.__table__,
+    "after_create",
+    DDL(
+        "INSERT OR IGNORE INTO table_versions (name, version) VALUES "
+        + ", ".join(f"('{name}', 0)" for name in sorted(set(VERSIONED_TABLES.values())))
+    ).execute_if(dialect="sqlite"),
+)
+# Hooked on the metadata rather than each table so the triggers are also added
+# when create_all() runs against a database that predates table_versions.
+for _table, _name in VERSIONED_TABLES.items():
+    for _op in ("INSERT", "UPDATE", "DELETE"):
+        event.listen(
+            Base.metadata,
+            "after_create",
+            DDL(
+                f"CREATE TRIGGER IF NOT EXISTS {_table}_{_op.lower()}_version AFTER {_op} ON {_table} "
+                f"BEGIN UPDATE table_versions SET version = version + 1, "
+                f"changed_at = (julianday('now') - 2440587.5) * 86400.0 WHERE name = '{_name}'; END"
+            ).execute_if(dialect="sqlite"),
+        )
+
+
+class NoteStat(Base):
+    """Note counts per (dimension, value), kept current by the triggers below.
+
+    dimension is one of NOTE_STAT_DIMENSIONS; value is the status/priority
+    name, the category or tag id ('none' for uncategorised), '1'/'0' for
+    important, and 'all' for the total.
+    """
+    __tablename__ = "note_stats"
+
+    dimension = Column(String(20), primary_key=True)
+    value = Column(String(50), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
+NOTE_STAT_DIMENSIONS = ("total", "status", "priority", "category", "important", "tag")
+
+
+def _note_stat_rows(row: str, delta: int) -> str:
+    return ", ".join(
+        f"('{dimension}', {value}, {delta})"
+        for dimension, value in (
+            ("total", "'all'"),
+            ("status", f"{row}.status"),
+            ("priority", f"{row}.priority"),
+            ("category", f"coalesce({row}.category_id, 'none')"),
+            ("important", f"{row}.is_important"),
+        )
+    )
+
+
+_NOTE_STAT_UPSERT = (
+    "INSERT INTO note_stats (dimension, value, count) VALUES {rows} "
+    "ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count"
+)
+
+NOTE_STAT_TRIGGERS = {
+    "notes_insert_stats": "AFTER INSERT ON notes BEGIN "
+    + _NOTE_STAT_UPSERT.format(rows=_note_stat_rows("NEW", 1)) + "; END",
+    "notes_delete_stats": "AFTER DELETE ON notes BEGIN "
+    + _NOTE_STAT_UPSERT.format(rows=_note_stat_rows("OLD", -1)) + "; END",
+    "notes_update_stats": "AFTER UPDATE OF status, priority, category_id, is_important ON notes BEGIN "
+    + _NOTE_STAT_UPSERT.format(rows=_note_stat_rows("OLD", -1) + ", " + _note_stat_rows("NEW", 1)) + "; END",
+    "note_tags_insert_stats": "AFTER INSERT ON note_tags BEGIN "
+    + _NOTE_STAT_UPSERT.format(rows="('tag', NEW.tag_id, 1)") + "; END",
+    "note_tags_delete_stats": "AFTER DELETE ON note_tags BEGIN "
+    + _NOTE_STAT_UPSERT.format(rows="('tag', OLD.tag_id, -1)") + "; END",
+}
+
+# Recomputes every counter from the notes themselves (see crud.rebuild_note_stats).
+NOTE_STATS_FROM_NOTES = (
+    "SELECT 'total', 'all', count(*) FROM notes "
+    "UNION ALL SELECT 'status', status, count(*) FROM notes GROUP BY status "
+    "UNION ALL SELECT 'priority', priority, count(*) FROM notes GROUP BY priority "
+    "UNION ALL SELECT 'category', coalesce(category_id, 'none'), count(*) FROM notes GROUP BY category_id "
+    "UNION ALL SELECT 'important', is_important, count(*) FROM notes GROUP BY is_important "
+    "UNION ALL SELECT 'tag', tag_id, count(*) FROM note_tags GROUP BY tag_id"
+)
+
+for _name, _body in NOTE_STAT_TRIGGERS.items():
+    event.listen(
+        Base.metadata,
+        "after_create",
+        DDL(f"CREATE TRIGGER IF NOT EXISTS {_name} {_body}").execute_if(dialect="sqlite"),
+    )
+
+# Seed the counters when create_all has just created note_stats, including on
+# a database that already holds notes. `tables` lists only the tables that
+# were actually created, so existing databases skip the full scan.
+@event.listens_for(Base.metadata, "after_create")
+def _seed_note_stats(target, connection, tables=(), **kw):
+    if connection.dialect.name == "sqlite" and NoteStat.__table__ in tables:
+        connection.exec_driver_sql(f"INSERT INTO note_stats (dimension, value, count) {NOTE_STATS_FROM_NOTES}")
@@ -0,0 +1,168 @@
+"""In-process reminder scheduler.
+
+Keeps a min-heap of the next config.REMINDER_WINDOW upcoming reminders and
+sleeps until the earliest one, instead of polling the notes table. Writes
+in crud report changed reminders through reschedule()/cancel(), which push
+onto the heap or invalidate entries; entries are checked against `_pending`
+when popped, so a moved or cancelled reminder never fires from a stale heap
+slot. When the window runs dry it is refilled from ix_notes_reminder_date,
+and it is reloaded every config.REMINDER_RESYNC_SECONDS to pick up writes
+made by other processes (e.g. `python -m src.importer`).
+"""
+from datetime import datetime, UTC
+from typing import Callable, Iterable, List, Optional, Tuple
+import asyncio
+import heapq
+import logging
+import threading
+
+from sqlalchemy import select
+
+from . import config, models
+from .schemas import naive_utc
+
+logger = logging.getLogger(__name__)
+
+Due = List[Tuple[int, datetime]]
+
+
+def utcnow() -> datetime:
+    """Naive UTC, the way reminder_date comes back from SQLite."""
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _log_due(due: Due) -> None:
+    for note_id, when in due:
+        logger.info(f"Reminder due for note {note_id} at {when.isoformat()}")
+
+
+class ReminderScheduler:
+    def __init__(self, window: int = config.REMINDER_WINDOW):
+        self.window = window
+        self.handlers: List[Callable[[Due], None]] = [_log_due]
+        self._heap: list = []  # (reminder_date, note_id); may hold stale entries
+        self._pending: dict = {}  # note_id -> reminder_date of its live heap entry
+        # Every reminder in (_fired_until, _horizon] is in _pending; later ones
+        # are still only in the database.
+        self._fired_until: Optional[datetime] = None
+        self._horizon: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._session_factory = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def next_due(self) -> Optional[Tuple[datetime, int]]:
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0] if self._heap else None
+
+    # Called by crud after a commit, from any thread.
+    def reschedule(self, changes: Iterable[Tuple[int, Optional[datetime]]]) -> None:
+        if not self.running:
+            return
+        with self._lock:
+            for note_id, when in changes:
+                when = naive_utc(when)
+                if when is None or when <= self._fired_until or when > self._horizon:
+                    self._pending.pop(note_id, None)
+                else:
+                    self._pending[note_id] = when
+                    heapq.heappush(self._heap, (when, note_id))
+        self._wake()
+
+    def cancel(self, note_ids: Iterable[int]) -> None:
+        if not self.running:
+            return
+        with self._lock:
+            for note_id in note_ids:
+                self._pending.pop(note_id, None)
+
+    def _wake(self) -> None:
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _drop_stale(self) -> None:
+        heap = self._heap
+        while heap and self._pending.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def _load(self, after: datetime) -> None:
+        """Replace the window with the reminders following `after`."""
+        with self._session_factory() as db:
+            rows = db.execute(
+                select(models.Note.reminder_date, models.Note.id)
+                .where(models.Note.reminder_date > after)
+                .order_by(models.Note.reminder_date, models.Note.id)
+                .limit(self.window)
+            ).all()
+        with self._lock:
+            self._fired_until = after
+            self._horizon = rows[-1][0] if len(rows) == self.window else datetime.max
+            self._pending = {note_id: when for when, note_id in rows}
+            self._heap = [(when, note_id) for when, note_id in rows]  # already sorted, so a valid heap
+
+    def _pop_due(self, now: datetime) -> Due:
+        due = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                when, note_id = heapq.heappop(heap)
+                if self._pending.get(note_id) == when:
+                    del self._pending[note_id]
+                    due.append((note_id, when))
+            self._fired_until = now
+        return due
+
+    async def start(self, session_factory) -> None:
+        self._session_factory = session_factory
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self._load, utcnow())
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        resync_at = self._loop.time() + config.REMINDER_RESYNC_SECONDS
+        while True:
+            head = self.next_due()
+            timeout = resync_at - self._loop.time()
+            if head is not None:
+                timeout = min(timeout, (head[0] - utcnow()).total_seconds())
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+            now = utcnow()
+            due = self._pop_due(now)
+            if due:
+                for handler in self.handlers:
+                    try:
+                        handler(due)
+                    except Exception:
+                        logger.exception("Reminder handler failed")
+
+            if self._loop.time() >= resync_at or (not self._pending and self._horizon != datetime.max):
+                try:
+                    await asyncio.to_thread(self._load, now)
+                except Exception:
+                    logger.exception("Reloading reminders failed")
+                resync_at = self._loop.time() + config.REMINDER_RESYNC_SECONDS
+
+
+scheduler = ReminderScheduler()
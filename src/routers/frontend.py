@@ -3,58 +3,45 @@ from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from .. import database, crud, schemas, models
+from urllib.parse import urlencode
+from .. import assets, cache, config, database, crud, metrics, schemas, models
+from ..database import get_db
 from datetime import datetime
 from ..schemas import NoteStatus, NotePriority
 
 router = APIRouter()
 templates = Jinja2Templates(directory="src/templates")
-
-
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+templates.env.globals["asset_url"] = assets.asset_url
 
 
 def ensure_tags_and_get_ids(db: Session, tags_csv: str) -> List[int]:
     if not tags_csv:
         return []
     names = [t.strip() for t in tags_csv.split(",") if t.strip()]
-    ids = []
-    for name in names:
-        existing = crud.get_tag_by_name(db, name)
-        if existing:
-            ids.append(existing.id)
-        else:
-            new = crud.create_tag(db, schemas.TagCreate(name=name))
-            ids.append(new.id)
-    return ids
+    return crud.ensure_tags(db, names)
 
 
 def ensure_category_and_get_id(db: Session, category_name: Optional[str]) -> Optional[int]:
-    if not category_name:
-        return None
-    existing = crud.get_category_by_name(db, category_name)
-    if existing:
-        return existing.id
-    new = crud.create_category(db, schemas.CategoryCreate(name=category_name))
-    return new.id
+    return crud.ensure_category(db, category_name)
 
 
-@router.get("/notes", include_in_schema=False)
-def notes_list(request: Request, db: Session = Depends(get_db),
-               status: Optional[str] = None,
-               important: Optional[str] = None,
-               search: Optional[str] = None):
+_categories_cache = cache.VersionedCache()
+
+
+def cached_categories(db: Session) -> List[schemas.Category]:
+    version = crud.get_table_versions(db, ["categories"]).get("categories")
+    return _categories_cache.get(
+        "categories", version, lambda: [schemas.Category.model_validate(c) for c in crud.get_categories(db)]
+    )
+
+
+def notes_page(request: Request, db: Session, cursor: Optional[str], status: Optional[str],
+               important: Optional[str], search: Optional[str], category_id: Optional[str]) -> dict:
+    """One page of cards plus the query string for the next one (None on the last page)."""
     important_bool = None
     if important is not None and important.lower() in ('true', '1', 'on', 'yes', 't'):
         important_bool = True
 
-    print(f"DEBUG: important_str={important}, important_bool={important_bool}")
-
     status_enum = None
     if status and status.strip():
         try:
@@ -62,16 +49,55 @@ def notes_list(request: Request, db: Session = Depends(get_db),
         except ValueError:
             status_enum = None
 
-    notes = crud.get_notes_filtered(db, status=status_enum, important=important_bool, search=search)
-    categories = crud.get_categories(db)
-    return templates.TemplateResponse("index.html", {"request": request, "notes": notes, "categories": categories})
+    category = int(category_id) if category_id and category_id.strip().isdigit() else None
+
+    notes = crud.get_notes_filtered(
+        db,
+        limit=config.HTML_PAGE_SIZE + 1,
+        cursor=cursor,
+        status=status_enum,
+        important=important_bool,
+        search=search,
+        category_id=category,
+        excerpt=180,
+    )
+    next_query = None
+    if len(notes) > config.HTML_PAGE_SIZE:
+        notes = notes[:config.HTML_PAGE_SIZE]
+        params = dict(request.query_params)
+        params["cursor"] = crud.encode_cursor(notes[-1].created_at, notes[-1].id)
+        next_query = urlencode(params)
+    metrics.LIST_ROWS.observe(len(notes), "html")
+    return {"request": request, "notes": notes, "next_query": next_query, "category_id": category}
+
+
+@router.get("/notes", include_in_schema=False)
+def notes_list(request: Request, db: Session = Depends(get_db),
+               cursor: Optional[str] = None,
+               status: Optional[str] = None,
+               important: Optional[str] = None,
+               search: Optional[str] = None,
+               category_id: Optional[str] = None):
+    context = notes_page(request, db, cursor, status, important, search, category_id)
+    context["categories"] = cached_categories(db)
+    return templates.TemplateResponse("index.html", context)
+
+
+@router.get("/notes/fragment", include_in_schema=False)
+def notes_fragment(request: Request, db: Session = Depends(get_db),
+                   cursor: Optional[str] = None,
+                   status: Optional[str] = None,
+                   important: Optional[str] = None,
+                   search: Optional[str] = None,
+                   category_id: Optional[str] = None):
+    """Just the cards of one page, for infinite scroll on the list."""
+    context = notes_page(request, db, cursor, status, important, search, category_id)
+    return templates.TemplateResponse("_note_cards.html", context)
 
 
 @router.get("/notes/create", include_in_schema=False)
-def note_create_form(request: Request, db: Session = Depends(get_db)):
-    categories = crud.get_categories(db)
-    tags = crud.get_tags(db)
-    return templates.TemplateResponse("note_create.html", {"request": request, "categories": categories, "tags": tags})
+def note_create_form(request: Request):
+    return templates.TemplateResponse("note_create.html", {"request": request})
 
 
 @router.post("/notes/create", include_in_schema=False)
@@ -124,10 +150,8 @@ def note_edit_form(request: Request, note_id: int, db: Session = Depends(get_db)
     note = crud.get_note(db, note_id)
     if not note:
         return RedirectResponse(url="/notes")
-    categories = crud.get_categories(db)
-    tags = crud.get_tags(db)
     tag_names = ", ".join([t.name for t in note.tags])
-    return templates.TemplateResponse("note_edit.html", {"request": request, "note": note, "categories": categories, "tags": tags, "tag_names": tag_names})
+    return templates.TemplateResponse("note_edit.html", {"request": request, "note": note, "tag_names": tag_names})
 
 
 @router.post("/notes/{note_id}/edit", include_in_schema=False)
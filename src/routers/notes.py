@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Annotated, Optional, List, Literal
 from datetime import datetime
 
-from .. import schemas, crud, models, database
+from .. import schemas, crud, models, database, config, conditional, export, importer, metrics
 from ..database import get_db
 
 router = APIRouter(prefix="/api", tags=["notes"])
@@ -13,61 +14,233 @@ router = APIRouter(prefix="/api", tags=["notes"])
 def create_category(category: schemas.CategoryCreate, db: Session = Depends(get_db)):
     existing = crud.get_category_by_name(db, category.name)
     if existing:
+        db.commit()  # end the lookup's writer transaction before the response is serialised
         return existing
     return crud.create_category(db, category)
 
 
-@router.get("/categories/", response_model=List[schemas.Category])
-def list_categories(db: Session = Depends(get_db)):
-    return crud.get_categories(db)
+@router.get("/categories/", response_model=schemas.PaginatedCategories, response_class=ORJSONResponse)
+def list_categories(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+):
+    versions = crud.get_table_versions(db, conditional.CATEGORIES_VERSIONS)
+    not_modified = conditional.conditional_get(
+        request, response, *conditional.collection_validators(versions, request.url.query)
+    )
+    if not_modified:
+        return not_modified
+    page = crud.get_names_page(db, "categories", versions, limit=limit, cursor=cursor)
+    return ORJSONResponse(page, headers=response.headers)
 
 
 @router.post("/tags/", response_model=schemas.Tag)
 def create_tag(tag: schemas.TagCreate, db: Session = Depends(get_db)):
     existing = crud.get_tag_by_name(db, tag.name)
     if existing:
+        db.commit()  # end the lookup's writer transaction before the response is serialised
         return existing
     return crud.create_tag(db, tag)
 
 
-@router.get("/tags/", response_model=List[schemas.Tag])
-def list_tags(db: Session = Depends(get_db)):
-    return crud.get_tags(db)
+@router.get("/tags/", response_model=schemas.PaginatedTags, response_class=ORJSONResponse)
+def list_tags(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+):
+    versions = crud.get_table_versions(db, conditional.TAGS_VERSIONS)
+    not_modified = conditional.conditional_get(
+        request, response, *conditional.collection_validators(versions, request.url.query)
+    )
+    if not_modified:
+        return not_modified
+    page = crud.get_names_page(db, "tags", versions, limit=limit, cursor=cursor)
+    return ORJSONResponse(page, headers=response.headers)
 
 
 @router.post("/notes/", response_model=schemas.Note)
 def create_note(note: schemas.NoteCreate, db: Session = Depends(get_db)):
     return crud.create_note(db, note)
 
-@router.get("/notes/", response_model=schemas.PaginatedNotes) # <--- ИЗМЕНЕНИЕ
-def read_notes(
+
+@router.post("/notes/bulk", response_model=schemas.BulkResult)
+def create_notes_bulk(
+    notes: Annotated[List[schemas.NoteCreate], Body(max_length=config.BULK_MAX_ITEMS)],
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0, description="Offset"),
-    limit: int = Query(100, ge=1, le=1000, description="Limit"),
+):
+    return crud.create_notes_bulk(db, notes)
+
+
+@router.put("/notes/bulk", response_model=schemas.BulkResult)
+def update_notes_bulk(
+    notes: Annotated[List[schemas.NoteBulkUpdate], Body(max_length=config.BULK_MAX_ITEMS)],
+    db: Session = Depends(get_db),
+):
+    return crud.update_notes_bulk(db, notes)
+
+
+@router.delete("/notes/bulk", response_model=schemas.BulkResult)
+def delete_notes_bulk(
+    ids: Annotated[List[int], Body(max_length=config.BULK_MAX_ITEMS)],
+    db: Session = Depends(get_db),
+):
+    return crud.delete_notes_bulk(db, ids)
+
+
+@router.post("/notes/delete-by-filter", response_model=schemas.FilterOperationResult)
+def delete_notes_by_filter(body: schemas.DeleteByFilter, db: Session = Depends(get_db)):
+    return crud.delete_notes_by_filter(db, dry_run=body.dry_run, **body.model_dump(exclude={"dry_run"}))
+
+
+@router.post("/notes/status-by-filter", response_model=schemas.FilterOperationResult)
+def set_status_by_filter(body: schemas.StatusByFilter, db: Session = Depends(get_db)):
+    return crud.set_status_by_filter(
+        db, body.new_status, dry_run=body.dry_run, **body.model_dump(exclude={"dry_run", "new_status"})
+    )
+
+
+@router.post("/notes/import", response_model=schemas.ImportResult)
+async def import_notes(
+    request: Request,
+    batch_size: int = Query(config.IMPORT_BATCH_SIZE, ge=1, le=config.BULK_MAX_ITEMS),
+    session_factory=Depends(database.get_writer_sessionmaker),
+):
+    """Import an NDJSON body (one note per line, as written by /notes/export).
+
+    No request-wide session: each batch takes the writer on its own, so other
+    writes go through while the rest of the body is still arriving.
+    """
+    return await importer.import_stream(
+        request.stream(), session_factory, batch_size=batch_size, writer_slot=database.writer_slots
+    )
+
+
+@router.get("/notes/export")
+def export_notes(
+    db: Session = Depends(get_db),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    compress: bool = Query(False, description="gzip the exported file"),
     category_id: Optional[int] = Query(None),
     tag_id: Optional[int] = Query(None),
+    tags_all: Optional[List[int]] = Query(None, description="Notes carrying every one of these tags"),
+    tags_any: Optional[List[int]] = Query(None, description="Notes carrying at least one of these tags"),
+    tags_none: Optional[List[int]] = Query(None, description="Notes carrying none of these tags"),
     status: Optional[models.NoteStatus] = Query(None),
     priority: Optional[models.NotePriority] = Query(None),
     important: Optional[bool] = Query(None),
     before: Optional[datetime] = Query(None),
     search: Optional[str] = Query(None),
 ):
-
-    notes = crud.get_notes_filtered(
+    batches = crud.iter_notes_export(
         db,
+        batch_size=config.EXPORT_BATCH_SIZE,
         category_id=category_id,
         tag_id=tag_id,
+        tags_all=tags_all,
+        tags_any=tags_any,
+        tags_none=tags_none,
         status=status,
         important=important,
         before=before,
         search=search,
         priority=priority,
     )
+    chunks = export.SERIALIZERS[format](batches)
+    filename = f"notes.{format}"
+    media_type = export.MEDIA_TYPES[format]
+    if compress:
+        chunks = export.gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def page_response(notes, count, skip, limit, cursor, search, sort, headers=None) -> ORJSONResponse:
+    """Encode a lean get_notes_page result fetched with limit + 1 rows.
+
+    The dicts already have the schemas.PaginatedNotes shape, so they go straight
+    to orjson instead of being re-validated through the response model.
+    """
+    next_cursor = None
+    if len(notes) > limit:
+        notes = notes[:limit]
+        if not (search and sort == "relevance"):
+            next_cursor = crud.encode_cursor(notes[-1]["created_at"], notes[-1]["id"])
+    metrics.LIST_ROWS.observe(len(notes), "api")
+
+    return ORJSONResponse(
+        {
+            "items": notes,
+            "total": count,
+            "skip": 0 if cursor else skip,
+            "limit": limit,
+            "next_cursor": next_cursor,
+        },
+        headers=headers,
+    )
+
+
+@router.get("/notes/", response_model=schemas.PaginatedNotes, response_class=ORJSONResponse) # <--- ИЗМЕНЕНИЕ
+def read_notes(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    skip: int = Query(0, ge=0, description="Offset"),
+    limit: int = Query(100, ge=1, le=1000, description="Limit"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    category_id: Optional[int] = Query(None),
+    tag_id: Optional[int] = Query(None),
+    tags_all: Optional[List[int]] = Query(None, description="Notes carrying every one of these tags"),
+    tags_any: Optional[List[int]] = Query(None, description="Notes carrying at least one of these tags"),
+    tags_none: Optional[List[int]] = Query(None, description="Notes carrying none of these tags"),
+    status: Optional[models.NoteStatus] = Query(None),
+    priority: Optional[models.NotePriority] = Query(None),
+    important: Optional[bool] = Query(None),
+    before: Optional[datetime] = Query(None),
+    search: Optional[str] = Query(None),
+    sort: Literal["created", "relevance"] = Query("created", description="relevance applies to search results"),
+    total: Literal["exact", "estimate", "none"] = Query(
+        "exact", description="estimate stops counting at a cap; none skips counting"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated note fields to return; id and created_at are always included"
+    ),
+    excerpt: Optional[int] = Query(
+        None, ge=1, le=5000, description="Add the first N characters of content as excerpt, instead of content"
+    ),
+):
+    versions = crud.get_table_versions(db, conditional.NOTES_VERSIONS)
+    not_modified = conditional.conditional_get(
+        request, response, *conditional.collection_validators(versions, request.url.query)
+    )
+    if not_modified:
+        return not_modified
 
-    total = crud.count_notes_filtered(
+    notes, count = crud.get_notes_page(
         db,
+        skip=skip,
+        limit=limit + 1,
+        cursor=cursor,
+        sort=sort,
+        total=total,
+        lean=True,
+        fields=crud.parse_note_fields(fields),
+        excerpt=excerpt,
         category_id=category_id,
         tag_id=tag_id,
+        tags_all=tags_all,
+        tags_any=tags_any,
+        tags_none=tags_none,
         status=status,
         important=important,
         before=before,
@@ -75,26 +248,52 @@ def read_notes(
         priority=priority,
     )
 
-    return {
-        "items": notes,
-        "total": total,
-        "skip": skip,
-        "limit": limit
-    }
+    return page_response(
+        notes, count, skip=skip, limit=limit, cursor=cursor, search=search, sort=sort, headers=response.headers
+    )
+
+@router.get("/notes/stats", response_model=schemas.NoteStats)
+def read_note_stats(request: Request, response: Response, db: Session = Depends(get_db)):
+    versions = crud.get_table_versions(db, conditional.NOTES_VERSIONS)
+    not_modified = conditional.conditional_get(request, response, *conditional.collection_validators(versions, "stats"))
+    if not_modified:
+        return not_modified
+    return crud.get_note_stats(db)
 
 @router.get("/notes/{note_id}", response_model=schemas.Note)
-def read_note(note_id: int, db: Session = Depends(get_db)):
-    db_note = crud.get_note(db, note_id)
-    if not db_note:
+def read_note(note_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    revision = crud.get_note_revision(db, note_id)
+    if revision is None:
         raise HTTPException(status_code=404, detail="Note not found")
-    return db_note
+    not_modified = conditional.conditional_get(
+        request, response, *conditional.note_validators(note_id, revision.modified)
+    )
+    if not_modified:
+        return not_modified
+    return crud.get_note(db, note_id)
 
 
 @router.put("/notes/{note_id}", response_model=schemas.Note)
-def put_note(note_id: int, note: schemas.NoteUpdate, db: Session = Depends(get_db)):
-    updated = crud.update_note(db, note_id, note)
+def put_note(
+    note_id: int,
+    note: schemas.NoteUpdate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    expected_version = None
+    if "if-match" in request.headers:
+        revision = crud.get_note_revision(db, note_id)
+        if revision is None:
+            raise HTTPException(status_code=404, detail="Note not found")
+        conditional.check_if_match(request, conditional.note_validators(note_id, revision.modified)[0])
+        # Write only if the note is still the one If-Match was checked against.
+        expected_version = revision.version
+
+    updated = crud.update_note(db, note_id, note, expected_version)
     if not updated:
         raise HTTPException(status_code=404, detail="Note not found")
+    response.headers.update(conditional.validator_headers(*conditional.note_validators(note_id, updated.updated_at)))
     return updated
 
 
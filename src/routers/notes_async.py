@@ -0,0 +1,179 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List, Literal
+from datetime import datetime
+
+from .. import schemas, crud, crud_async, models, conditional
+from ..database_async import get_async_db
+from .notes import page_response
+
+# Mounted ahead of routers.notes when config.DB_MODE == "async"; any route not
+# defined here (bulk endpoints etc.) falls through to the sync router.
+router = APIRouter(prefix="/api", tags=["notes"])
+
+
+@router.post("/categories/", response_model=schemas.Category)
+async def create_category(category: schemas.CategoryCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await crud_async.get_category_by_name(db, category.name)
+    if existing:
+        await db.commit()  # end the lookup's writer transaction before the response is serialised
+        return existing
+    return await crud_async.create_category(db, category)
+
+
+@router.get("/categories/", response_model=schemas.PaginatedCategories, response_class=ORJSONResponse)
+async def list_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+):
+    versions = await crud_async.get_table_versions(db, conditional.CATEGORIES_VERSIONS)
+    not_modified = conditional.conditional_get(
+        request, response, *conditional.collection_validators(versions, request.url.query)
+    )
+    if not_modified:
+        return not_modified
+    page = await crud_async.get_names_page(db, "categories", versions, limit=limit, cursor=cursor)
+    return ORJSONResponse(page, headers=response.headers)
+
+
+@router.post("/tags/", response_model=schemas.Tag)
+async def create_tag(tag: schemas.TagCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await crud_async.get_tag_by_name(db, tag.name)
+    if existing:
+        await db.commit()  # end the lookup's writer transaction before the response is serialised
+        return existing
+    return await crud_async.create_tag(db, tag)
+
+
+@router.get("/tags/", response_model=schemas.PaginatedTags, response_class=ORJSONResponse)
+async def list_tags(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+):
+    versions = await crud_async.get_table_versions(db, conditional.TAGS_VERSIONS)
+    not_modified = conditional.conditional_get(
+        request, response, *conditional.collection_validators(versions, request.url.query)
+    )
+    if not_modified:
+        return not_modified
+    page = await crud_async.get_names_page(db, "tags", versions, limit=limit, cursor=cursor)
+    return ORJSONResponse(page, headers=response.headers)
+
+
+@router.post("/notes/", response_model=schemas.Note)
+async def create_note(note: schemas.NoteCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.create_note(db, note)
+
+
+@router.get("/notes/", response_model=schemas.PaginatedNotes, response_class=ORJSONResponse)
+async def read_notes(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    skip: int = Query(0, ge=0, description="Offset"),
+    limit: int = Query(100, ge=1, le=1000, description="Limit"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    category_id: Optional[int] = Query(None),
+    tag_id: Optional[int] = Query(None),
+    tags_all: Optional[List[int]] = Query(None, description="Notes carrying every one of these tags"),
+    tags_any: Optional[List[int]] = Query(None, description="Notes carrying at least one of these tags"),
+    tags_none: Optional[List[int]] = Query(None, description="Notes carrying none of these tags"),
+    status: Optional[models.NoteStatus] = Query(None),
+    priority: Optional[models.NotePriority] = Query(None),
+    important: Optional[bool] = Query(None),
+    before: Optional[datetime] = Query(None),
+    search: Optional[str] = Query(None),
+    sort: Literal["created", "relevance"] = Query("created", description="relevance applies to search results"),
+    total: Literal["exact", "estimate", "none"] = Query(
+        "exact", description="estimate stops counting at a cap; none skips counting"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated note fields to return; id and created_at are always included"
+    ),
+    excerpt: Optional[int] = Query(
+        None, ge=1, le=5000, description="Add the first N characters of content as excerpt, instead of content"
+    ),
+):
+    versions = await crud_async.get_table_versions(db, conditional.NOTES_VERSIONS)
+    not_modified = conditional.conditional_get(
+        request, response, *conditional.collection_validators(versions, request.url.query)
+    )
+    if not_modified:
+        return not_modified
+
+    notes, count = await crud_async.get_notes_page(
+        db,
+        skip=skip,
+        limit=limit + 1,
+        cursor=cursor,
+        sort=sort,
+        total=total,
+        lean=True,
+        fields=crud.parse_note_fields(fields),
+        excerpt=excerpt,
+        category_id=category_id,
+        tag_id=tag_id,
+        tags_all=tags_all,
+        tags_any=tags_any,
+        tags_none=tags_none,
+        status=status,
+        important=important,
+        before=before,
+        search=search,
+        priority=priority,
+    )
+    return page_response(
+        notes, count, skip=skip, limit=limit, cursor=cursor, search=search, sort=sort, headers=response.headers
+    )
+
+
+@router.get("/notes/{note_id:int}", response_model=schemas.Note)
+async def read_note(note_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    revision = await crud_async.get_note_revision(db, note_id)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Note not found")
+    not_modified = conditional.conditional_get(
+        request, response, *conditional.note_validators(note_id, revision.modified)
+    )
+    if not_modified:
+        return not_modified
+    return await crud_async.get_note(db, note_id)
+
+
+@router.put("/notes/{note_id:int}", response_model=schemas.Note)
+async def put_note(
+    note_id: int,
+    note: schemas.NoteUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
+    expected_version = None
+    if "if-match" in request.headers:
+        revision = await crud_async.get_note_revision(db, note_id)
+        if revision is None:
+            raise HTTPException(status_code=404, detail="Note not found")
+        conditional.check_if_match(request, conditional.note_validators(note_id, revision.modified)[0])
+        # Write only if the note is still the one If-Match was checked against.
+        expected_version = revision.version
+
+    updated = await crud_async.update_note(db, note_id, note, expected_version)
+    if not updated:
+        raise HTTPException(status_code=404, detail="Note not found")
+    response.headers.update(conditional.validator_headers(*conditional.note_validators(note_id, updated.updated_at)))
+    return updated
+
+
+@router.delete("/notes/{note_id:int}")
+async def remove_note(note_id: int, db: AsyncSession = Depends(get_async_db)):
+    deleted = await crud_async.delete_note(db, note_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Note not found")
+    return {"message": "Note deleted successfully"}
@@ -0,0 +1,40 @@
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from .. import config, crud, schemas
+from ..database import get_db
+from ..reminders import naive_utc, utcnow
+
+router = APIRouter(prefix="/api/reminders", tags=["reminders"])
+
+
+@router.get("/due", response_model=schemas.DueReminders)
+def read_due_reminders(
+    db: Session = Depends(get_db),
+    until: Optional[datetime] = Query(None, description="Defaults to now; pass a future time for upcoming reminders"),
+    since: Optional[datetime] = Query(None, description="Skip reminders before this time"),
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    include_done: bool = Query(False, description="Also list reminders of done notes"),
+):
+    return crud.get_reminders(
+        db,
+        naive_utc(until) or utcnow(),
+        since=naive_utc(since),
+        limit=limit,
+        cursor=cursor,
+        include_done=include_done,
+    )
+
+
+@router.get("/agenda", response_model=schemas.Agenda)
+def read_agenda(
+    db: Session = Depends(get_db),
+    start: Optional[date] = Query(None, description="First day (UTC); defaults to today"),
+    days: int = Query(7, ge=1, le=config.AGENDA_MAX_DAYS),
+    per_day: int = Query(config.AGENDA_PER_DAY, ge=0, le=100, description="Reminders listed per day; counts cover all"),
+):
+    return crud.get_agenda(db, start or utcnow().date(), days, per_day)
@@ -1,8 +1,19 @@
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 from typing import List, Optional
-from datetime import datetime, UTC
+from datetime import date, datetime, UTC
 from enum import Enum
 
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert an aware datetime to naive UTC, the form timestamps are stored in.
+
+    Naive values are taken to be UTC already.
+    """
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value
+
+
 class NoteStatus(str, Enum):
     draft = "draft"
     active = "active"
@@ -29,6 +40,17 @@ class Tag(TagBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TagWithCount(Tag):
+    note_count: int
+
+
+class PaginatedTags(BaseModel):
+    items: List[TagWithCount]
+    total: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
 class CategoryBase(BaseModel):
     name: str = Field(..., json_schema_extra={'example': "учёба"})
 
@@ -42,6 +64,17 @@ class Category(CategoryBase):
     id: int
 
 
+class CategoryWithCount(Category):
+    note_count: int
+
+
+class PaginatedCategories(BaseModel):
+    items: List[CategoryWithCount]
+    total: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
 class NoteBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
     content: Optional[str] = Field(None, max_length=5000)
@@ -60,11 +93,9 @@ class NoteBase(BaseModel):
 
     @field_validator('reminder_date')
     def reminder_in_future(cls, v):
-        if v:
-            if v.tzinfo is None:
-                v = v.replace(tzinfo=UTC)
-            if v < datetime.now(UTC):
-                raise ValueError("reminder must be in the future")
+        v = naive_utc(v)
+        if v and v < datetime.now(UTC).replace(tzinfo=None):
+            raise ValueError("reminder must be in the future")
         return v
 
     @field_validator('tag_ids')
@@ -106,22 +137,179 @@ class NoteUpdate(BaseModel):
     reminder_date: Optional[datetime] = None
     category_id: Optional[int] = None
     tag_ids: Optional[List[int]] = None
+    version: Optional[int] = Field(
+        None, description="The note's version as last read; the update is refused with 409 if it has changed since"
+    )
 
+    @field_validator('reminder_date')
+    def reminder_utc(cls, v):
+        return naive_utc(v)
+
+
+class Note(BaseModel):
+    """A note as returned by the API.
 
-class Note(NoteBase):
+    Same fields as NoteBase but none of its input validators: stored data is
+    trusted on the way out (a reminder may well have passed since it was set).
+    """
+    title: str
+    content: Optional[str] = None
+    is_important: bool = False
+    status: NoteStatus = NoteStatus.active
+    priority: NotePriority = NotePriority.medium
+    reminder_date: Optional[datetime] = None
+    category_id: Optional[int] = None
+    tag_ids: List[int] = []
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int
     category: Optional[Category] = None
     tags: List[Tag] = []
+    snippet: Optional[str] = Field(None, description="Highlighted search excerpt")
 
     model_config = ConfigDict(from_attributes=True)
 
 
 class PaginatedNotes(BaseModel):
     items: List[Note]
-    total: int
+    total: Optional[int] = None
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class NoteBulkUpdate(NoteUpdate):
+    id: int
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    ok: bool
+    error: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class NoteFilters(BaseModel):
+    """The GET /api/notes/ filters, as the body of the by-filter operations."""
+    category_id: Optional[int] = None
+    tag_id: Optional[int] = None
+    tags_all: Optional[List[int]] = None
+    tags_any: Optional[List[int]] = None
+    tags_none: Optional[List[int]] = None
+    status: Optional[NoteStatus] = None
+    priority: Optional[NotePriority] = None
+    important: Optional[bool] = None
+    before: Optional[datetime] = None
+    search: Optional[str] = None
+
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+class DeleteByFilter(NoteFilters):
+    dry_run: bool = Field(False, description="Only count the notes that would be deleted")
+
+
+class StatusByFilter(NoteFilters):
+    new_status: NoteStatus
+    dry_run: bool = Field(False, description="Only count the notes that would change")
+
+
+class FilterOperationResult(BaseModel):
+    affected: int = Field(..., description="Notes deleted or changed; with dry_run, how many would be")
+    dry_run: bool
+
+
+class NoteImport(BaseModel):
+    """One NDJSON import line, in the shape GET /api/notes/export writes.
+
+    Unlike NoteCreate it takes tag and category names, keeps original
+    timestamps and accepts reminders in the past.
+    """
+    title: str = Field(..., min_length=1, max_length=200)
+    content: Optional[str] = Field(None, max_length=5000)
+    is_important: bool = False
+    status: NoteStatus = NoteStatus.active
+    priority: NotePriority = NotePriority.medium
+    reminder_date: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    category: Optional[str] = Field(None, max_length=100)
+    tags: List[str] = Field(default_factory=list)
+
+    @field_validator('title', 'content')
+    def not_empty_string(cls, v):
+        if v is not None and not v.strip():
+            raise ValueError('Field cannot be empty or whitespace')
+        return v.strip() if v else v
+
+    @field_validator('reminder_date', 'created_at', 'updated_at')
+    def stored_as_utc(cls, v):
+        return naive_utc(v)
+
+    @field_validator('category')
+    def strip_category(cls, v):
+        return v.strip() or None if v else None
+
+    @field_validator('tags')
+    def clean_tags(cls, v):
+        names = list(dict.fromkeys(name.strip() for name in v if name.strip()))
+        if any(len(name) > 50 for name in names):
+            raise ValueError('Tag names must be at most 50 characters')
+        return names
+
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: List[ImportLineError] = Field(default_factory=list, description="First failures, by line number")
+
+
+class Reminder(BaseModel):
+    note_id: int
+    title: str
+    reminder_date: datetime
+    status: NoteStatus
+    is_important: bool
+
+
+class DueReminders(BaseModel):
+    items: List[Reminder]
+    next_cursor: Optional[str] = None
+
+
+class AgendaDay(BaseModel):
+    date: date
+    count: int = Field(..., description="All reminders on this day; `reminders` lists at most per_day of them")
+    reminders: List[Reminder] = Field(default_factory=list)
+
+
+class Agenda(BaseModel):
+    start: date
+    days: List[AgendaDay]
+
+
+class StatBucket(BaseModel):
+    id: Optional[int] = Field(None, description="Category or tag id; null for notes without a category")
+    name: Optional[str] = None
+    count: int
+
+
+class NoteStats(BaseModel):
+    total: int
+    by_status: dict[NoteStatus, int]
+    by_priority: dict[NotePriority, int]
+    important: int
+    by_category: List[StatBucket]
+    by_tag: List[StatBucket]
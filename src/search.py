@@ -0,0 +1,61 @@
+import re
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, column, delete, func, literal_column, table, text
+from sqlalchemy.orm import Session
+
+notes_fts = table("notes_fts", column("rowid"), column("title"), column("content"), column("tags"))
+
+# bm25 column weights for (title, content, tags): title hits rank highest.
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_INDEX_NOTES = text(
+    """
+    INSERT INTO notes_fts (rowid, title, content, tags)
+    SELECT n.id,
+           n.title,
+           coalesce(n.content, ''),
+           coalesce((SELECT group_concat(t.name, ' ')
+                     FROM note_tags nt JOIN tags t ON t.id = nt.tag_id
+                     WHERE nt.note_id = n.id), '')
+    FROM notes n
+    WHERE n.id IN :ids
+    """
+).bindparams(bindparam("ids", expanding=True))
+
+
+def match_query(search: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    tokens = _TOKEN_RE.findall(search)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def match(query: str):
+    return literal_column("notes_fts").op("MATCH")(query)
+
+
+def rank():
+    return func.bm25(literal_column("notes_fts"), *BM25_WEIGHTS)
+
+
+def snippet(tokens: int = 12):
+    return func.snippet(literal_column("notes_fts"), -1, "<mark>", "</mark>", "…", tokens)
+
+
+def index_notes(db: Session, note_ids: Iterable[int]) -> None:
+    ids = list(note_ids)
+    if not ids:
+        return
+    unindex_notes(db, ids)
+    db.execute(_INDEX_NOTES, {"ids": ids})
+
+
+def unindex_notes(db: Session, note_ids: Iterable[int]) -> None:
+    ids = list(note_ids)
+    if not ids:
+        return
+    db.execute(delete(notes_fts).where(notes_fts.c.rowid.in_(ids)))
@@ -0,0 +1,27 @@
+// Infinite scroll for the notes list: when the "load more" link comes into
+// view, fetch the next page of cards and put them in its place. Without JS
+// (or if a fetch fails) the link still opens the next page normally.
+(function () {
+  function watch(link) {
+    if (!link || !("IntersectionObserver" in window)) return;
+    var observer = new IntersectionObserver(function (entries) {
+      if (!entries[0].isIntersecting) return;
+      observer.disconnect();
+      fetch(link.dataset.fragment)
+        .then(function (response) {
+          if (!response.ok) throw new Error(response.status);
+          return response.text();
+        })
+        .then(function (html) {
+          var grid = link.parentNode;
+          link.insertAdjacentHTML("afterend", html);
+          link.remove();
+          watch(grid.querySelector(".load-more"));
+        })
+        .catch(function () {});
+    }, { rootMargin: "600px" });
+    observer.observe(link);
+  }
+
+  watch(document.querySelector(".load-more"));
+})();
@@ -0,0 +1,38 @@
+"""Check or rebuild the note_stats counters behind GET /api/notes/stats.
+
+    python -m src.stats check     # exit 1 and list the counters that drifted
+    python -m src.stats rebuild   # recompute every counter from the notes
+
+The counters are maintained by triggers in the same transaction as the
+write, so they only drift if notes were changed with the triggers absent
+(e.g. a restore from a dump taken without them).
+"""
+import argparse
+import sys
+
+from . import crud
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            crud.rebuild_note_stats(db)
+            db.commit()
+            print("note_stats rebuilt")
+            return
+        drift = crud.note_stats_drift(db)
+
+    for dimension, value, stored, actual in drift:
+        print(f"{dimension}={value}: stored {stored}, actual {actual}", file=sys.stderr)
+    print(f"{len(drift)} counters out of date" if drift else "note_stats consistent")
+    sys.exit(1 if drift else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""In-memory tag -> note id bitmap index for the tags_all/tags_any/tags_none filters.
+
+Each tag's notes are a compressed roaring bitmap (pyroaring.BitMap), so
+AND/OR/AND NOT over any number of tags run container by container in C and
+memory follows the number of tagged notes, not the largest note id. The
+index is built from note_tags in the background at startup and stamped with
+the "notes" table_versions counter it reflects; a lookup first compares that
+stamp with the database, and on a mismatch (a write from another process, or
+one made while the index was cold) it answers None so the caller filters in
+SQL, and rebuilds. BitMap holds 32-bit values, so note ids must stay below
+2**32.
+
+Writes in this process keep it current: crud calls begin() before a write
+transaction's first statement and record() with the note_tags rows it adds
+and removes; on commit the versions read before and after the write chain
+the change onto the index, so concurrent commits land in version order.
+"""
+from itertools import groupby
+from typing import Iterable, Optional, Tuple
+import logging
+import threading
+
+from pyroaring import BitMap, FrozenBitMap
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+Links = Iterable[Tuple[int, int]]  # (note_id, tag_id)
+
+_EMPTY = FrozenBitMap()
+
+
+def to_bitmap(note_ids: Iterable[int]) -> BitMap:
+    return BitMap(note_ids)
+
+
+def bitmap_ids(bitmap: BitMap) -> list:
+    """Note ids in ascending order."""
+    return bitmap.to_array().tolist()
+
+
+def _notes_version(db: Session) -> Optional[int]:
+    tv = models.TableVersion
+    return db.scalar(select(tv.version).where(tv.name == "notes"))
+
+
+class TagIndex:
+    def __init__(self):
+        self._bitmaps: dict = {}
+        self.version: Optional[int] = None  # None while cold
+        self._pending: dict = {}  # version before a commit -> (version after, added, removed)
+        self._lock = threading.Lock()
+        self._session_factory = None
+        self._building = False
+
+    @property
+    def warm(self) -> bool:
+        return self.version is not None
+
+    def start(self, session_factory) -> None:
+        self._session_factory = session_factory
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Rebuild in a background thread, unless one is already running."""
+        with self._lock:
+            if self._session_factory is None or self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._rebuild, name="tag-index", daemon=True).start()
+
+    def _rebuild(self) -> None:
+        try:
+            self.build()
+        except Exception:
+            logger.exception("Building the tag index failed")
+        finally:
+            self._building = False
+
+    def build(self) -> None:
+        """Load every note_tags row, in one read transaction so the version matches."""
+        nt = models.note_tags
+        with self._session_factory() as db:
+            version = _notes_version(db)
+            rows = db.execute(select(nt.c.tag_id, nt.c.note_id).order_by(nt.c.tag_id, nt.c.note_id))
+            bitmaps = {
+                tag_id: to_bitmap(note_id for _, note_id in links)
+                for tag_id, links in groupby(rows, key=lambda row: row[0])
+            }
+        with self._lock:
+            self._bitmaps = bitmaps
+            self.version = version
+            self._apply_pending()
+        logger.info(f"Tag index built: {len(bitmaps)} tags at notes version {version}")
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version = None
+            self._pending.clear()
+
+    # Write side, called by crud.
+    def begin(self, db: Session) -> None:
+        """Note the version a write transaction starts from; call before its first write."""
+        if (self.warm or self._building) and "tag_index_before" not in db.info:
+            db.info["tag_index_before"] = _notes_version(db)
+
+    def record(self, db: Session, added: Links = (), removed: Links = ()) -> None:
+        if "tag_index_before" in db.info:
+            changes = db.info.setdefault("tag_index_changes", ([], []))
+            changes[0].extend(added)
+            changes[1].extend(removed)
+
+    def _apply_pending(self) -> None:
+        while self.version in self._pending:
+            after, added, removed = self._pending.pop(self.version)
+            bitmaps = self._bitmaps
+            for note_id, tag_id in removed:
+                if tag_id in bitmaps:
+                    bitmaps[tag_id].discard(note_id)
+            for note_id, tag_id in added:
+                bitmaps.setdefault(tag_id, BitMap()).add(note_id)
+            self.version = after
+        # Anything older can no longer be chained on.
+        for before in [v for v in self._pending if self.version is not None and v < self.version]:
+            del self._pending[before]
+
+    def _committed(self, before: int, after: int, added: list, removed: list) -> None:
+        with self._lock:
+            self._pending[before] = (after, added, removed)
+            self._apply_pending()
+
+    # Read side.
+    def lookup(
+        self,
+        db: Session,
+        tags_all: Optional[list] = None,
+        tags_any: Optional[list] = None,
+        tags_none: Optional[list] = None,
+    ) -> Optional[BitMap]:
+        """Bitmap of the notes matching the tag sets, or None to filter in SQL instead.
+
+        None when the index is cold or out of step with `db`, and when there is
+        no tags_all/tags_any term to start from (tags_none alone matches most
+        notes). Only a database ahead of the index triggers a rebuild; an older
+        read snapshot does not.
+        """
+        if not (tags_all or tags_any) or not self.warm:
+            return None
+        current = _notes_version(db)
+        # Under the lock: commits update the bitmaps in place.
+        with self._lock:
+            if current == self.version:
+                return self._combine(tags_all or (), tags_any or (), tags_none or ())
+            # A reader whose snapshot predates the index: the index is fine,
+            # this request just has to ask SQL.
+            behind = current is not None and self.version is not None and current < self.version
+        if not behind:
+            self.rebuild()
+        return None
+
+    def _combine(self, tags_all, tags_any, tags_none) -> BitMap:
+        bitmaps = self._bitmaps
+        # Smallest first, so every intersection step is as cheap as it can be.
+        sets = sorted((bitmaps.get(tag_id, _EMPTY) for tag_id in tags_all), key=len)
+        if tags_any:
+            sets.append(BitMap.union(*(bitmaps.get(tag_id, _EMPTY) for tag_id in tags_any)))
+        result = BitMap(sets[0])
+        for bitmap in sets[1:]:
+            result &= bitmap
+        for tag_id in tags_none:
+            result -= bitmaps.get(tag_id, _EMPTY)
+        return result
+
+tag_index = TagIndex()
+
+
+@event.listens_for(Session, "before_commit")
+def _read_version_after(session: Session) -> None:
+    if "tag_index_before" in session.info:
+        session.flush()  # before_commit runs ahead of commit's own flush
+        session.info["tag_index_after"] = _notes_version(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session: Session) -> None:
+    before = session.info.pop("tag_index_before", None)
+    after = session.info.pop("tag_index_after", None)
+    added, removed = session.info.pop("tag_index_changes", ([], []))
+    if before is not None and after is not None and after != before:
+        tag_index._committed(before, after, added, removed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session) -> None:
+    for key in ("tag_index_before", "tag_index_after", "tag_index_changes"):
+        session.info.pop(key, None)
@@ -1,13 +1,13 @@
+import csv
+import gzip
+import io
+import json
+import re
+from datetime import datetime
+
 import pytest
-from fastapi.testclient import TestClient
 from fastapi import status
-from src.main import app
-
-
-@pytest.fixture
-def client(override_get_db):
-    with TestClient(app=app, base_url="http://test") as client:
-        yield client
+from src import config, crud, schemas
 
 
 def test_create_category(client):
@@ -125,4 +125,507 @@ def test_delete_note(client):
     assert response.json()["message"] == "Note deleted successfully"
 
     response_get = client.get(f"/api/notes/{note_id}")
-    assert response_get.status_code == status.HTTP_404_NOT_FOUND
\ No newline at end of file
+    assert response_get.status_code == status.HTTP_404_NOT_FOUND
+
+def test_get_notes_respects_skip_and_limit(client):
+    for i in range(5):
+        client.post("/api/notes/", json={"title": f"Note {i}"})
+
+    response = client.get("/api/notes/", params={"skip": 1, "limit": 2})
+    assert response.status_code == status.HTTP_200_OK
+    assert [n["title"] for n in response.json()["items"]] == ["Note 3", "Note 2"]
+    assert response.json()["total"] == 5
+
+
+def test_get_notes_cursor_pagination(client):
+    for i in range(5):
+        client.post("/api/notes/", json={"title": f"Note {i}"})
+
+    titles = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/notes/", params=params).json()
+        titles += [n["title"] for n in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert titles == ["Note 4", "Note 3", "Note 2", "Note 1", "Note 0"]
+
+
+def test_get_notes_invalid_cursor(client):
+    response = client.get("/api/notes/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def _seed_tagged_notes(client, count):
+    category_id = client.post("/api/categories/", json={"name": "Work"}).json()["id"]
+    tag_ids = [client.post("/api/tags/", json={"name": f"tag{i}"}).json()["id"] for i in range(3)]
+    note_ids = []
+    for i in range(count):
+        response = client.post("/api/notes/", json={
+            "title": f"Note {i}",
+            "category_id": category_id,
+            "tag_ids": tag_ids,
+        })
+        note_ids.append(response.json()["id"])
+    return note_ids
+
+
+@pytest.mark.parametrize("url", ["/api/notes/?limit={limit}", "/notes?limit={limit}"])
+def test_list_query_count_independent_of_page_size(client, count_queries, url):
+    _seed_tagged_notes(client, 6)
+    client.get(url.format(limit=1))  # warm the HTML list's category cache
+
+    counts = []
+    for limit in (2, 6):
+        count_queries.clear()
+        response = client.get(url.format(limit=limit))
+        assert response.status_code == status.HTTP_200_OK
+        counts.append(len(count_queries))
+
+    assert counts[0] == counts[1]
+    assert counts[0] <= 3
+
+
+@pytest.mark.parametrize("url", ["/api/notes/{id}", "/notes/{id}", "/notes/{id}/edit"])
+def test_single_note_query_count(client, count_queries, url):
+    note_id = _seed_tagged_notes(client, 1)[0]
+
+    count_queries.clear()
+    response = client.get(url.format(id=note_id))
+    assert response.status_code == status.HTTP_200_OK
+    assert len(count_queries) <= 4
+
+
+def test_update_note_query_count(client, count_queries):
+    note_id = _seed_tagged_notes(client, 1)[0]
+
+    count_queries.clear()
+    response = client.put(f"/api/notes/{note_id}", json={"title": "Changed"})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["tags"]) == 3
+    assert len(count_queries) <= 7
+
+
+def test_search_notes_full_text(client):
+    tag_id = client.post("/api/tags/", json={"name": "groceries"}).json()["id"]
+    client.post("/api/notes/", json={"title": "Shopping", "content": "buy milk and bread", "tag_ids": [tag_id]})
+    client.post("/api/notes/", json={"title": "Milk delivery", "content": "call the farm"})
+    client.post("/api/notes/", json={"title": "Unrelated", "content": "nothing here"})
+
+    response = client.get("/api/notes/", params={"search": "milk"})
+    assert response.status_code == status.HTTP_200_OK
+    items = response.json()["items"]
+    assert {n["title"] for n in items} == {"Shopping", "Milk delivery"}
+    assert all("<mark>" in n["snippet"] for n in items)
+
+    response = client.get("/api/notes/", params={"search": "grocer"})
+    assert [n["title"] for n in response.json()["items"]] == ["Shopping"]
+
+
+def test_search_notes_relevance_sort(client):
+    client.post("/api/notes/", json={"title": "Other", "content": "mentions report once"})
+    client.post("/api/notes/", json={"title": "Quarterly report", "content": "the report draft"})
+
+    response = client.get("/api/notes/", params={"search": "report", "sort": "relevance"})
+    assert [n["title"] for n in response.json()["items"]] == ["Quarterly report", "Other"]
+
+
+def test_search_index_follows_updates_and_deletes(client):
+    note_id = client.post("/api/notes/", json={"title": "Alpha"}).json()["id"]
+
+    client.put(f"/api/notes/{note_id}", json={"title": "Beta"})
+    assert client.get("/api/notes/", params={"search": "alpha"}).json()["items"] == []
+    assert len(client.get("/api/notes/", params={"search": "beta"}).json()["items"]) == 1
+
+    client.delete(f"/api/notes/{note_id}")
+    assert client.get("/api/notes/", params={"search": "beta"}).json()["items"] == []
+
+
+def test_get_notes_total_matches_items_for_every_filter(client):
+    tag_id = client.post("/api/tags/", json={"name": "home"}).json()["id"]
+    client.post("/api/notes/", json={"title": "Water plants", "is_important": True, "tag_ids": [tag_id]})
+    client.post("/api/notes/", json={"title": "Pay rent", "reminder_date": "2099-01-01T00:00:00"})
+    client.post("/api/notes/", json={"title": "Read book", "content": "plants and trees", "status": "done"})
+
+    for params in (
+        {"important": True},
+        {"important": False},
+        {"before": "2100-01-01T00:00:00"},
+        {"search": "plants"},
+        {"tag_id": tag_id},
+        {"status": "done"},
+    ):
+        page = client.get("/api/notes/", params=params).json()
+        assert page["total"] == len(page["items"]), params
+
+
+def test_get_notes_total_modes(client):
+    for i in range(3):
+        client.post("/api/notes/", json={"title": f"Note {i}"})
+
+    assert client.get("/api/notes/", params={"limit": 1}).json()["total"] == 3
+    assert client.get("/api/notes/", params={"limit": 1, "total": "estimate"}).json()["total"] == 3
+    assert client.get("/api/notes/", params={"limit": 1, "total": "none"}).json()["total"] is None
+    assert client.get("/api/notes/", params={"skip": 5}).json()["total"] == 3
+
+
+def test_get_notes_single_round_trip(client, count_queries):
+    for i in range(3):
+        client.post("/api/notes/", json={"title": f"Note {i}"})
+
+    count_queries.clear()
+    client.get("/api/notes/")
+    # Page, total and aggregated tags in one statement (besides the ETag version lookup).
+    payload_queries = [s for s in count_queries if "table_versions" not in s]
+    assert len(payload_queries) == 1
+    assert not any(s.lstrip().upper().startswith("SELECT COUNT") for s in count_queries)
+
+
+def test_bulk_create_notes(client, count_queries):
+    tag_id = client.post("/api/tags/", json={"name": "sync"}).json()["id"]
+    payload = [{"title": f"Synced {i}", "tag_ids": [tag_id]} for i in range(20)]
+    payload.append({"title": "Broken", "tag_ids": [99999]})
+
+    count_queries.clear()
+    response = client.post("/api/notes/bulk", json=payload)
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["succeeded"] == 20
+    assert body["failed"] == 1
+    assert body["results"][-1]["ok"] is False
+    assert len(count_queries) < 10
+
+    for index in (0, 19):
+        note_id = body["results"][index]["id"]
+        assert client.get(f"/api/notes/{note_id}").json()["title"] == f"Synced {index}"
+
+    page = client.get("/api/notes/", params={"tag_id": tag_id}).json()
+    assert page["total"] == 20
+    assert client.get("/api/notes/", params={"search": "synced"}).json()["total"] == 20
+
+
+def test_bulk_update_notes(client):
+    ids = [client.post("/api/notes/", json={"title": f"Note {i}"}).json()["id"] for i in range(2)]
+
+    response = client.put("/api/notes/bulk", json=[
+        {"id": ids[0], "status": "done"},
+        {"id": ids[1], "title": "Renamed"},
+        {"id": 99999, "title": "Missing"},
+    ])
+    assert response.status_code == status.HTTP_200_OK
+    assert [r["ok"] for r in response.json()["results"]] == [True, True, False]
+    assert client.get(f"/api/notes/{ids[0]}").json()["status"] == "done"
+    assert client.get(f"/api/notes/{ids[1]}").json()["title"] == "Renamed"
+
+
+def test_bulk_update_reports_unknown_category(client):
+    category_id = client.post("/api/categories/", json={"name": "Work"}).json()["id"]
+    ids = [client.post("/api/notes/", json={"title": f"Note {i}"}).json()["id"] for i in range(2)]
+
+    response = client.put("/api/notes/bulk", json=[
+        {"id": ids[0], "category_id": category_id},
+        {"id": ids[1], "category_id": 99999},
+    ])
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()["results"]
+    assert [r["ok"] for r in results] == [True, False]
+    assert results[1]["error"] == "Category not found"
+    assert client.get(f"/api/notes/{ids[0]}").json()["category_id"] == category_id
+    assert client.get(f"/api/notes/{ids[1]}").json()["category_id"] is None
+
+
+def test_bulk_update_reports_nulls_in_required_fields(client):
+    ids = [client.post("/api/notes/", json={"title": f"Note {i}"}).json()["id"] for i in range(2)]
+
+    response = client.put("/api/notes/bulk", json=[
+        {"id": ids[0], "title": None, "status": None},
+        {"id": ids[1], "title": "Renamed", "content": None, "version": None},
+    ])
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()["results"]
+    assert [r["ok"] for r in results] == [False, True]
+    assert results[0]["error"] == "Fields cannot be null: ['status', 'title']"
+    assert client.get(f"/api/notes/{ids[0]}").json()["title"] == "Note 0"
+    assert client.get(f"/api/notes/{ids[1]}").json()["title"] == "Renamed"
+
+
+def test_bulk_delete_notes(client):
+    tag_id = client.post("/api/tags/", json={"name": "old"}).json()["id"]
+    ids = [client.post("/api/notes/", json={"title": f"Note {i}", "tag_ids": [tag_id]}).json()["id"] for i in range(3)]
+
+    response = client.request("DELETE", "/api/notes/bulk", json=ids[:2] + [99999])
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["succeeded"] == 2
+    assert response.json()["failed"] == 1
+    assert client.get("/api/notes/").json()["total"] == 1
+    assert client.get("/api/notes/", params={"tag_id": tag_id}).json()["total"] == 1
+
+
+def test_html_form_upserts_tags_in_few_statements(client, count_queries):
+    client.post("/api/tags/", json={"name": "existing"})
+    names = ", ".join(["existing"] + [f"tag{i}" for i in range(10)])
+
+    count_queries.clear()
+    response = client.post(
+        "/notes/create",
+        data={"title": "Form note", "content": "body", "category_name": "Inbox", "tags": names},
+        follow_redirects=False,
+    )
+    assert response.status_code == 303
+    upserts = [s for s in count_queries if "INTO tags" in s or "INTO categories" in s]
+    assert len(upserts) == 2
+
+    note = client.get("/api/notes/", params={"search": "Form"}).json()["items"][0]
+    assert note["category"]["name"] == "Inbox"
+    assert sorted(t["name"] for t in note["tags"]) == sorted(["existing"] + [f"tag{i}" for i in range(10)])
+
+
+def test_note_conditional_get(client, count_queries):
+    note_id = client.post("/api/notes/", json={"title": "Cached"}).json()["id"]
+
+    first = client.get(f"/api/notes/{note_id}")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    count_queries.clear()
+    cached = client.get(f"/api/notes/{note_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert len(count_queries) == 1
+
+    since = client.get(f"/api/notes/{note_id}", headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert since.status_code == 304
+
+    client.put(f"/api/notes/{note_id}", json={"title": "Changed"})
+    fresh = client.get(f"/api/notes/{note_id}", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+
+
+@pytest.mark.parametrize("url", ["/api/notes/", "/api/tags/", "/api/categories/"])
+def test_collection_conditional_get(client, url):
+    first = client.get(url)
+    etag = first.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url + "?limit=5", headers={"If-None-Match": etag}).status_code == 200
+
+    client.post("/api/notes/", json={"title": "New", "category_id": None})
+    client.post("/api/tags/", json={"name": "new-tag"})
+    client.post("/api/categories/", json={"name": "New category"})
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_notes_etag_changes_when_tags_relink(client):
+    tag_id = client.post("/api/tags/", json={"name": "link"}).json()["id"]
+    note_id = client.post("/api/notes/", json={"title": "Linked"}).json()["id"]
+    etag = client.get("/api/notes/").headers["etag"]
+
+    client.put("/api/notes/bulk", json=[{"id": note_id, "tag_ids": [tag_id]}])
+    assert client.get("/api/notes/", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_put_if_match(client):
+    note_id = client.post("/api/notes/", json={"title": "Guarded"}).json()["id"]
+    etag = client.get(f"/api/notes/{note_id}").headers["etag"]
+
+    ok = client.put(f"/api/notes/{note_id}", json={"title": "First"}, headers={"If-Match": etag})
+    assert ok.status_code == 200
+    assert ok.headers["etag"] != etag
+
+    stale = client.put(f"/api/notes/{note_id}", json={"title": "Second"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert client.get(f"/api/notes/{note_id}").json()["title"] == "First"
+
+    current = ok.headers["etag"]
+    assert client.put(f"/api/notes/{note_id}", json={"title": "Third"}, headers={"If-Match": current}).status_code == 200
+    assert client.put("/api/notes/999999", json={"title": "x"}, headers={"If-Match": "*"}).status_code == 404
+
+
+def test_export_ndjson_streams_filtered_notes(client):
+    tag_id = client.post("/api/tags/", json={"name": "exported"}).json()["id"]
+    category_id = client.post("/api/categories/", json={"name": "Archive"}).json()["id"]
+    for i in range(5):
+        client.post("/api/notes/", json={
+            "title": f"Note {i}",
+            "category_id": category_id,
+            "tag_ids": [tag_id] if i % 2 == 0 else [],
+        })
+
+    response = client.get("/api/notes/export", params={"tag_id": tag_id})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Note 0", "Note 2", "Note 4"]
+    assert rows[0]["category"] == "Archive"
+    assert rows[0]["tags"] == ["exported"]
+    assert rows[0]["status"] == "active"
+
+
+def test_export_csv_gzip(client):
+    client.post("/api/notes/", json={"title": "Comma, note", "content": "line\nbreak"})
+
+    response = client.get("/api/notes/export", params={"format": "csv", "compress": True})
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith('filename="notes.csv.gz"')
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert len(rows) == 1
+    assert rows[0]["title"] == "Comma, note"
+    assert rows[0]["content"] == "line\nbreak"
+
+
+def test_export_batches_tag_lookups(client, count_queries, monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_BATCH_SIZE", 4)
+    _seed_tagged_notes(client, 10)
+
+    count_queries.clear()
+    lines = client.get("/api/notes/export").text.splitlines()
+    assert len(lines) == 10
+    # One streaming query plus one tag lookup per batch of four.
+    assert len(count_queries) == 1 + 3
+
+
+def test_import_ndjson_reports_bad_lines(client):
+    client.post("/api/tags/", json={"name": "old"})
+    lines = [
+        {"title": "First", "tags": ["old", "new"], "category": "Imported"},
+        {"title": ""},
+        "not json",
+        {"title": "Second", "tags": ["new"], "created_at": "2020-01-02T03:04:05",
+         "reminder_date": "2020-01-03T00:00:00"},
+    ]
+    body = "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines) + "\n\n"
+
+    response = client.post("/api/notes/import", params={"batch_size": 2}, content=body.encode())
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result["imported"] == 2
+    assert result["failed"] == 2
+    assert [e["line"] for e in result["errors"]] == [2, 3]
+
+    notes = {n["title"]: n for n in client.get("/api/notes/").json()["items"]}
+    assert sorted(t["name"] for t in notes["First"]["tags"]) == ["new", "old"]
+    assert notes["First"]["category"]["name"] == "Imported"
+    assert notes["Second"]["created_at"].startswith("2020-01-02T03:04:05")
+    assert client.get("/api/tags/").json()["total"] == 2
+    assert client.get("/api/notes/", params={"search": "second"}).json()["total"] == 1
+
+
+def test_export_import_round_trip(client):
+    _seed_tagged_notes(client, 3)
+    dump = client.get("/api/notes/export").content
+    client.request("DELETE", "/api/notes/bulk", json=[n["id"] for n in client.get("/api/notes/").json()["items"]])
+
+    assert client.post("/api/notes/import", content=dump).json()["imported"] == 3
+    restored = [json.loads(line) for line in client.get("/api/notes/export").text.splitlines()]
+    original = [json.loads(line) for line in dump.decode().splitlines()]
+    strip = lambda row: {k: v for k, v in row.items() if k != "id"}
+    assert [strip(row) for row in restored] == [strip(row) for row in original]
+
+
+@pytest.mark.parametrize("params", [{}, {"search": "Note"}, {"tag_id": 1}])
+def test_lean_list_matches_note_schema(client, session, params):
+    _seed_tagged_notes(client, 3)
+    client.post("/api/notes/", json={"title": "Note plain", "content": "no tags"})
+
+    items = client.get("/api/notes/", params=params).json()["items"]
+    assert items
+    for item in items:
+        expected = schemas.Note.model_validate(crud.get_note(session, item["id"])).model_dump(mode="json")
+        if "search" in params:
+            expected["snippet"] = item["snippet"]
+        assert item == expected
+
+
+def test_list_serves_notes_whose_reminder_passed(client, session):
+    note_id = client.post("/api/notes/", json={"title": "Old reminder"}).json()["id"]
+    crud.get_note(session, note_id).reminder_date = datetime(2020, 1, 1)
+    session.commit()
+
+    assert client.get("/api/notes/").json()["items"][0]["reminder_date"] == "2020-01-01T00:00:00"
+    assert client.get(f"/api/notes/{note_id}").status_code == status.HTTP_200_OK
+
+
+def test_list_fields_projects_columns_in_sql(client, count_queries):
+    _seed_tagged_notes(client, 3)
+
+    count_queries.clear()
+    page = client.get("/api/notes/", params={"fields": "title,tags", "limit": 2}).json()
+    assert [set(item) for item in page["items"]] == [{"id", "created_at", "title", "tags"}] * 2
+    assert len(page["items"][0]["tags"]) == 3
+    listing = [s for s in count_queries if "table_versions" not in s][0]
+    assert "notes.content" not in listing
+    assert "categories" not in listing
+
+    rest = client.get("/api/notes/", params={"fields": "title", "cursor": page["next_cursor"]}).json()
+    assert [item["title"] for item in rest["items"]] == ["Note 0"]
+
+
+def test_list_excerpt_replaces_content(client, count_queries):
+    client.post("/api/notes/", json={"title": "Long", "content": "abcdefghij" * 100})
+
+    count_queries.clear()
+    item = client.get("/api/notes/", params={"excerpt": 5}).json()["items"][0]
+    assert item["excerpt"] == "abcde"
+    assert "content" not in item
+    assert "substr(notes.content" in [s for s in count_queries if "table_versions" not in s][0]
+
+    both = client.get("/api/notes/", params={"excerpt": 3, "fields": "content"}).json()["items"][0]
+    assert set(both) == {"id", "created_at", "content", "excerpt"}
+    assert both["excerpt"] == "abc"
+
+
+def test_list_unknown_fields_rejected(client):
+    response = client.get("/api/notes/", params={"fields": "title,password"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "password" in response.json()["detail"]
+
+
+def test_html_list_loads_excerpt_not_content(client, count_queries):
+    client.post("/api/notes/", json={"title": "Card", "content": "x" * 300})
+
+    count_queries.clear()
+    response = client.get("/notes")
+    assert "x" * 180 in response.text
+    assert "x" * 181 not in response.text
+    listing = next(s for s in count_queries if "FROM notes" in s)
+    assert "substr(notes.content" in listing
+    assert "notes.content AS" not in listing
+
+
+def test_html_list_pages_with_fragments(client, monkeypatch):
+    monkeypatch.setattr(config, "HTML_PAGE_SIZE", 2)
+    for i in range(5):
+        client.post("/api/notes/", json={"title": f"Card {i}", "content": "body"})
+
+    first = client.get("/notes", params={"search": "card"}).text
+    assert "Card 4" in first and "Card 3" in first and "Card 2" not in first
+    fragment_url = re.search(r'data-fragment="([^"]+)"', first).group(1).replace("&amp;", "&")
+    assert "search=card" in fragment_url
+
+    seen = []
+    while fragment_url:
+        fragment = client.get(fragment_url).text
+        assert "<html" not in fragment
+        seen += re.findall(r"Card \d", fragment)
+        match = re.search(r'data-fragment="([^"]+)"', fragment)
+        fragment_url = match.group(1).replace("&amp;", "&") if match else None
+    assert seen == ["Card 2", "Card 1", "Card 0"]
+
+
+def test_html_list_caches_categories(client, count_queries):
+    client.post("/api/categories/", json={"name": "Cached"})
+    assert "Cached" in client.get("/notes").text
+
+    count_queries.clear()
+    client.get("/notes")
+    assert not any("FROM categories" in s for s in count_queries)
+
+    client.post("/api/categories/", json={"name": "Fresh"})
+    assert "Fresh" in client.get("/notes").text
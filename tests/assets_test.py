@@ -0,0 +1,52 @@
+import gzip
+import re
+from pathlib import Path
+
+from src import config
+from src.assets import IMMUTABLE, build_asset
+from src.main import app
+
+
+def test_pages_link_fingerprinted_assets(client):
+    html = client.get("/notes").text
+    css_url = re.search(r'href="(/static/css/style\.[0-9a-f]{12}\.css)"', html).group(1)
+    assert re.search(r'src="/static/js/notes\.[0-9a-f]{12}\.js"', html)
+
+    response = client.get(css_url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == Path(config.STATIC_DIR, "css/style.css").read_bytes()
+
+    cached = client.get(css_url, headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+
+def test_unhashed_static_paths_still_served(client):
+    response = client.get("/static/css/style.css")
+    assert response.status_code == 200
+    assert "immutable" not in response.headers.get("cache-control", "")
+
+
+def test_fingerprint_follows_content():
+    first = build_asset("app.js", b"console.log(1);" * 100)
+    second = build_asset("app.js", b"console.log(2);" * 100)
+    assert first.url_path != second.url_path
+    assert gzip.decompress(first.bodies["gzip"]) == first.bodies["identity"]
+    assert "gzip" not in build_asset("tiny.txt", b"x").bodies
+
+
+def test_large_json_is_compressed_small_is_not(client):
+    assert "content-encoding" not in client.get("/api/tags/").headers
+
+    client.post("/api/notes/bulk", json=[{"title": f"Note {i}", "content": "lorem ipsum " * 20} for i in range(50)])
+    response = client.get("/api/notes/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["items"]) == 50
+
+
+def test_gzipped_export_is_not_compressed_twice(client):
+    client.post("/api/notes/bulk", json=[{"title": f"Note {i}", "content": "lorem ipsum " * 20} for i in range(50)])
+    response = client.get("/api/notes/export", params={"compress": True}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert len(gzip.decompress(response.content).splitlines()) == 50
@@ -0,0 +1,36 @@
+from collections import Counter
+
+from benchmarks import dataset, suite
+from src import crud, models
+
+
+def test_dataset_is_deterministic_and_zipf_skewed():
+    spec = dataset.Spec(notes=2000, tags=50, seed=7)
+    first = list(dataset.note_rows(spec))
+    assert first == list(dataset.note_rows(spec))
+    assert first != list(dataset.note_rows(dataset.Spec(notes=2000, tags=50, seed=8)))
+
+    uses = Counter(tag for _, tags in first for tag in tags)
+    assert uses[1] > uses[5] > uses[50]
+    created = [row["created_at"] for row, _ in first]
+    assert created == sorted(created)
+
+
+def test_generate_populates_search_index(db):
+    dataset.generate(db, dataset.Spec(notes=300, tags=20, categories=3, seed=1), batch_size=128)
+
+    assert db.query(models.Note).count() == 300
+    notes, total = crud.get_notes_page(db, limit=10, search="budget")
+    assert total > 0
+    assert all("budget" in (n.title + " " + n.content).lower() for n in notes)
+
+
+def test_compare_flags_only_meaningful_slowdowns():
+    def run(**p50):
+        return {"results": [{"size": 1000, "scenario": name, "p50_ms": ms} for name, ms in p50.items()]}
+
+    baseline = run(a=10.0, b=10.0, c=0.2, d=5.0)
+    current = run(a=10.5, b=14.0, c=0.4, e=50.0)
+    regressions = suite.compare(baseline, current, "p50_ms", threshold=0.25, min_delta_ms=0.5)
+
+    assert [r["scenario"] for r in regressions] == ["b"]
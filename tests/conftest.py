@@ -1,21 +1,33 @@
+import os
+from contextlib import contextmanager, nullcontext
+
+# The app's reminder scheduler and tag index read through the real database; tests start their own.
+os.environ.setdefault("NOTES_REMINDER_SCHEDULER", "0")
+os.environ.setdefault("NOTES_TAG_INDEX", "0")
+
 import pytest
-from sqlalchemy import create_engine
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from src.database import get_db, Base
+from src import crud
+from src.database import get_db, get_writer_sessionmaker, Base, apply_sqlite_profile
+from src.instrumentation import instrument
 from src.main import app
+from src.routers import frontend
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 
 
 @pytest.fixture(scope="session")
 def engine():
-    test_engine = create_engine(
+    test_engine = apply_sqlite_profile(create_engine(
         SQLALCHEMY_DATABASE_URL,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
-    )
+    ))
+    instrument(test_engine)
     Base.metadata.create_all(bind=test_engine)
     yield test_engine
 
@@ -42,13 +54,23 @@ def override_get_db(session):
         yield session
 
     app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_writer_sessionmaker] = lambda: lambda: nullcontext(session)
+    # Each test rolls back, so table_versions repeat across tests; cached pages must not.
+    crud.listing_cache.clear()
+    frontend._categories_cache.clear()
     yield
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def client(override_get_db):
+    with TestClient(app=app, base_url="http://test") as client:
+        yield client
+
+
 @pytest.fixture(scope="function")
 def db():
-    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    engine = apply_sqlite_profile(create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}))
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
     Base.metadata.create_all(bind=engine)
@@ -58,4 +80,29 @@ def db():
     yield db_session
 
     db_session.close()
-    Base.metadata.drop_all(bind=engine)
\ No newline at end of file
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="function")
+def count_queries(engine):
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@pytest.fixture(scope="function")
+def max_queries(count_queries):
+    """Fail the block if it runs more than `limit` statements: `with max_queries(2): client.get(...)`."""
+
+    @contextmanager
+    def _max_queries(limit):
+        start = len(count_queries)
+        yield
+        executed = count_queries[start:]
+        assert len(executed) <= limit, f"{len(executed)} queries, expected at most {limit}:\n" + "\n".join(executed)
+
+    return _max_queries
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+pytest.importorskip("aiosqlite")
+
+from src import crud_async, schemas
+from src.database import Base
+from src.database_async import get_async_db
+from src.routers import notes, notes_async
+
+
+@pytest.fixture
+def async_sessionmaker_():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+
+    async def _create_all():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(_create_all())
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def test_create_and_get_note(async_sessionmaker_):
+    async def scenario():
+        async with async_sessionmaker_() as db:
+            category = await crud_async.create_category(db, schemas.CategoryCreate(name="Work"))
+            tag = await crud_async.create_tag(db, schemas.TagCreate(name="Important"))
+            note = await crud_async.create_note(db, schemas.NoteCreate(
+                title="Test Note", category_id=category.id, tag_ids=[tag.id]
+            ))
+        async with async_sessionmaker_() as db:
+            return await crud_async.get_note(db, note.id)
+
+    note = asyncio.run(scenario())
+    assert note.title == "Test Note"
+    assert note.category.name == "Work"
+    assert [t.name for t in note.tags] == ["Important"]
+
+
+def test_update_and_delete_note(async_sessionmaker_):
+    async def scenario():
+        async with async_sessionmaker_() as db:
+            tag = await crud_async.create_tag(db, schemas.TagCreate(name="Urgent"))
+            note = await crud_async.create_note(db, schemas.NoteCreate(title="Old"))
+            updated = await crud_async.update_note(db, note.id, schemas.NoteUpdate(title="New", tag_ids=[tag.id]))
+            found, _ = await crud_async.get_notes_page(db, search="new")
+            deleted = await crud_async.delete_note(db, note.id)
+            missing = await crud_async.get_note(db, note.id)
+            return updated, found, deleted, missing
+
+    updated, found, deleted, missing = asyncio.run(scenario())
+    assert updated.title == "New"
+    assert [t.name for t in updated.tags] == ["Urgent"]
+    assert [n.id for n in found] == [updated.id]
+    assert deleted.id == updated.id
+    assert missing is None
+
+
+def test_get_notes_page_with_total(async_sessionmaker_):
+    async def scenario():
+        async with async_sessionmaker_() as db:
+            for i in range(3):
+                await crud_async.create_note(db, schemas.NoteCreate(title=f"Note {i}"))
+            return await crud_async.get_notes_page(db, limit=2)
+
+    page, total = asyncio.run(scenario())
+    assert [n.title for n in page] == ["Note 2", "Note 1"]
+    assert total == 3
+
+
+def test_async_router_overrides_sync_routes(async_sessionmaker_, override_get_db):
+    app = FastAPI()
+    app.include_router(notes_async.router)
+    app.include_router(notes.router)
+
+    async def _get_async_db():
+        async with async_sessionmaker_() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = _get_async_db
+
+    with TestClient(app) as client:
+        note_id = client.post("/api/notes/", json={"title": "Async"}).json()["id"]
+        assert client.get(f"/api/notes/{note_id}").json()["title"] == "Async"
+        assert client.get("/api/notes/").json()["total"] == 1
+        client.post("/api/tags/", json={"name": "async-tag"})
+        assert client.get("/api/tags/").json()["items"] == [{"id": 1, "name": "async-tag", "note_count": 0}]
+        etag = client.get(f"/api/notes/{note_id}").headers["etag"]
+        assert client.get(f"/api/notes/{note_id}", headers={"If-None-Match": etag}).status_code == 304
+        stale = client.put(f"/api/notes/{note_id}", json={"title": "x"}, headers={"If-Match": '"stale"'})
+        assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+        # Routes without an async counterpart still reach the sync router.
+        response = client.request("DELETE", "/api/notes/bulk", json=[])
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.parametrize("method, engine_name", [("GET", "async_read_engine"), ("POST", "async_engine")])
+def test_get_async_db_routes_by_method(method, engine_name):
+    from starlette.requests import Request
+    from src import database_async
+
+    async def bind():
+        sessions = database_async.get_async_db(Request({"type": "http", "method": method, "headers": []}))
+        db = await sessions.__anext__()
+        try:
+            return db.bind
+        finally:
+            await sessions.aclose()
+
+    assert asyncio.run(bind()) is getattr(database_async, engine_name)
@@ -67,3 +67,36 @@ def test_delete_note(db):
     note = crud.create_note(db, note_data)
     deleted_note = crud.delete_note(db, note.id)
     assert deleted_note.id == note.id
+
+
+def test_ensure_tags_reuses_existing_and_inserts_missing(db):
+    existing = crud.create_tag(db, schemas.TagCreate(name="work"))
+    ids = crud.ensure_tags(db, ["new", "work", "new", "other"])
+    assert len(ids) == 3
+    assert ids[1] == existing.id
+    assert crud.ensure_tags(db, ["other", "new"]) == [ids[2], ids[0]]
+    assert crud.ensure_category(db, "Home") == crud.ensure_category(db, "Home")
+    assert crud.ensure_category(db, "") is None
+
+
+def test_ensure_tags_uses_callers_transaction(db):
+    crud.ensure_tags(db, ["draft"])
+    crud.ensure_category(db, "Draft")
+    db.rollback()
+    assert crud.get_tag_by_name(db, "draft") is None
+    assert crud.get_category_by_name(db, "Draft") is None
+
+
+def test_created_at_is_per_row(db):
+    first = crud.create_note(db, schemas.NoteCreate(title="First"))
+    second = crud.create_note(db, schemas.NoteCreate(title="Second"))
+    assert second.created_at > first.created_at
+
+
+def test_get_notes_filtered_cursor(db):
+    notes = [crud.create_note(db, schemas.NoteCreate(title=f"Note {i}")) for i in range(3)]
+    page = crud.get_notes_filtered(db, limit=2)
+    assert [n.id for n in page] == [notes[2].id, notes[1].id]
+
+    rest = crud.get_notes_filtered(db, limit=2, cursor=crud.encode_cursor(page[-1].created_at, page[-1].id))
+    assert [n.id for n in rest] == [notes[0].id]
@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from starlette.requests import Request
+
+from src import database
+from src.database import apply_sqlite_profile
+from src.main import app
+from src.metrics import TimedQueuePool
+
+
+def test_sqlite_profile_pragmas(tmp_path):
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    writer = apply_sqlite_profile(create_engine(url), begin_immediate=True)
+    reader = apply_sqlite_profile(create_engine(url), read_only=True)
+
+    with writer.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+        conn.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+
+    # Writer transactions hold the write lock from BEGIN, even before writing.
+    with writer.connect() as conn, conn.begin():
+        conn.exec_driver_sql("SELECT 1")
+        other = apply_sqlite_profile(create_engine(url), pragmas={"busy_timeout": 0})
+        with other.connect() as blocked, pytest.raises(OperationalError):
+            blocked.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+@pytest.mark.parametrize("method, engine_name", [("GET", "read_engine"), ("HEAD", "read_engine"), ("POST", "engine")])
+def test_get_db_routes_by_method(method, engine_name):
+    sessions = database.get_db(Request({"type": "http", "method": method, "headers": []}))
+    db = next(sessions)
+    try:
+        assert db.get_bind() is getattr(database, engine_name)
+    finally:
+        sessions.close()
+
+
+@pytest.fixture
+def writer(tmp_path):
+    """A file database behind the app's writer sessions, with a short pool timeout."""
+    writer = database.apply_sqlite_profile(create_engine(
+        f"sqlite:///{tmp_path / 'writes.db'}",
+        connect_args={"check_same_thread": False},
+        poolclass=TimedQueuePool,
+        pool_size=database.WRITER_CONNECTIONS,
+        max_overflow=0,
+        pool_timeout=3,
+    ), begin_immediate=True)
+    database.Base.metadata.create_all(writer)
+    database.SessionLocal.configure(bind=writer)
+    yield writer
+    database.SessionLocal.configure(bind=database.engine)
+    writer.dispose()
+
+
+def test_concurrent_writes_queue_outside_the_threadpool(writer):
+    """More writers than threadpool workers: they wait for the writer connection without starving it."""
+
+    async def post_all():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.post("/api/tags/", json={"name": "shared"})
+            # Every request but the first only reads, on the writer, before answering.
+            return await asyncio.gather(*(client.post("/api/tags/", json={"name": "shared"}) for _ in range(60)))
+
+    responses = asyncio.run(post_all())
+    assert [r.status_code for r in responses] == [200] * 60
+
+
+def test_writes_go_through_while_an_import_streams(writer):
+    """An import holds the writer only while a batch is written, not while its body arrives."""
+    updated = asyncio.Event()
+
+    async def body():
+        yield b'{"title": "First"}\n'
+        await asyncio.wait_for(updated.wait(), timeout=3)
+        yield b'{"title": "Second"}\n'
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            note = (await client.post("/api/notes/", json={"title": "Before"})).json()
+
+            async def update():
+                try:
+                    return await client.put(f"/api/notes/{note['id']}", json={"title": "During"})
+                finally:
+                    updated.set()
+
+            return await asyncio.gather(
+                client.post("/api/notes/import", params={"batch_size": 1}, content=body()),
+                update(),
+            )
+
+    imported, put = asyncio.run(run())
+    assert put.status_code == 200
+    assert put.json()["title"] == "During"
+    assert imported.status_code == 200
+    assert imported.json()["imported"] == 2
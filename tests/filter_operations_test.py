@@ -0,0 +1,101 @@
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from src import crud, models, schemas
+from src.search import notes_fts
+from src.tag_index import bitmap_ids, tag_index
+
+
+@pytest.fixture
+def commits(db):
+    count = []
+
+    def listener(session):
+        count.append(1)
+
+    event.listen(db, "after_commit", listener)
+    yield count
+    event.remove(db, "after_commit", listener)
+
+
+def _seed(db):
+    red, blue = (crud.create_tag(db, schemas.TagCreate(name=name)).id for name in ("red", "blue"))
+    notes = {}
+    for i in range(5):
+        notes[f"done{i}"] = crud.create_note(db, schemas.NoteCreate(title=f"done{i}", status="done", tag_ids=[red])).id
+    notes["active"] = crud.create_note(db, schemas.NoteCreate(title="active", tag_ids=[red, blue])).id
+    notes["done_blue"] = crud.create_note(db, schemas.NoteCreate(title="done blue", status="done", tag_ids=[blue])).id
+    return red, blue, notes
+
+
+def test_delete_by_filter_in_batches(db, commits):
+    red, blue, notes = _seed(db)
+    commits.clear()
+
+    dry = crud.delete_notes_by_filter(db, dry_run=True, status=models.NoteStatus.done, tags_none=[blue])
+    assert (dry.affected, dry.dry_run) == (5, True)
+    assert commits == []
+
+    result = crud.delete_notes_by_filter(db, batch_size=2, status=models.NoteStatus.done, tags_none=[blue])
+    assert (result.affected, result.dry_run) == (5, False)
+    assert len(commits) == 3
+
+    remaining = set(db.scalars(select(models.Note.id)))
+    assert remaining == {notes["active"], notes["done_blue"]}
+    assert set(db.scalars(select(models.note_tags.c.note_id))) == remaining
+    assert db.scalar(select(func.count()).select_from(notes_fts)) == 2
+    assert crud.note_stats_drift(db) == []
+
+
+def test_status_by_filter_skips_notes_already_there(db, commits):
+    red, blue, notes = _seed(db)
+    commits.clear()
+
+    dry = crud.set_status_by_filter(db, models.NoteStatus.postponed, dry_run=True, tag_id=red)
+    assert dry.affected == 6
+
+    result = crud.set_status_by_filter(db, models.NoteStatus.done, batch_size=4, tag_id=red)
+    assert result.affected == 1  # only "active"; the five done notes already match
+    assert len(commits) == 1
+
+    crud.set_status_by_filter(db, models.NoteStatus.postponed, batch_size=4, tag_id=red)
+    assert crud.get_note(db, notes["done_blue"]).status == models.NoteStatus.done
+    changed = crud.get_note(db, notes["active"])
+    assert changed.status == models.NoteStatus.postponed
+    assert changed.version == 3
+    assert crud.note_stats_drift(db) == []
+
+
+def test_tag_index_follows_filter_operations(db):
+    red, blue, notes = _seed(db)
+    tag_index._session_factory = sessionmaker(bind=db.get_bind())
+    tag_index.build()
+    try:
+        crud.set_status_by_filter(db, models.NoteStatus.active, batch_size=2, tags_all=[red, blue])
+        crud.delete_notes_by_filter(db, batch_size=2, status=models.NoteStatus.done, tag_id=red)
+        bitmap = tag_index.lookup(db, tags_any=[red, blue])
+        assert bitmap is not None
+        assert bitmap_ids(bitmap) == [notes["active"], notes["done_blue"]]
+    finally:
+        tag_index.invalidate()
+        tag_index._session_factory = None
+        tag_index._bitmaps = {}
+
+
+def test_filter_endpoints(client):
+    tag = client.post("/api/tags/", json={"name": "old"}).json()["id"]
+    for i in range(3):
+        client.post("/api/notes/", json={"title": f"n{i}", "tag_ids": [tag] if i else []})
+
+    assert client.post("/api/notes/delete-by-filter", json={"dry_run": True}).status_code == 400
+    assert client.post("/api/notes/delete-by-filter", json={"tags_all": []}).status_code == 400
+
+    archived = client.post("/api/notes/status-by-filter", json={"tag_id": tag, "new_status": "postponed"})
+    assert archived.json() == {"affected": 2, "dry_run": False}
+
+    body = {"status": "postponed", "dry_run": True}
+    assert client.post("/api/notes/delete-by-filter", json=body).json() == {"affected": 2, "dry_run": True}
+    body["dry_run"] = False
+    assert client.post("/api/notes/delete-by-filter", json=body).json() == {"affected": 2, "dry_run": False}
+    assert [note["title"] for note in client.get("/api/notes/").json()["items"]] == ["n0"]
@@ -0,0 +1,66 @@
+import logging
+import re
+
+import pytest
+
+from src import config
+from src.main import app
+
+
+@pytest.fixture
+def note_id(client):
+    tag = client.post("/api/tags/", json={"name": "work"}).json()["id"]
+    category = client.post("/api/categories/", json={"name": "Home"}).json()["id"]
+    client.post("/api/notes/bulk", json=[
+        {"title": f"Note {i}", "content": "text", "tag_ids": [tag], "category_id": category} for i in range(30)
+    ])
+    return client.get("/api/notes/?limit=1").json()["items"][0]["id"]
+
+
+def test_server_timing_counts_request_queries(client, note_id, count_queries):
+    response = client.get(f"/api/notes/{note_id}")
+
+    timing = response.headers["server-timing"]
+    match = re.match(r'db;dur=([\d.]+);desc="(\d+) queries", app;dur=[\d.-]+, total;dur=([\d.]+)', timing)
+    assert match, timing
+    assert int(match.group(2)) == len(count_queries)
+    assert float(match.group(1)) <= float(match.group(3))
+
+
+def test_request_log_line_has_route_template(client, note_id, caplog):
+    with caplog.at_level(logging.INFO, logger="src.instrumentation"):
+        client.get(f"/api/notes/{note_id}")
+
+    record = next(r for r in caplog.records if r.name == "src.instrumentation")
+    assert record.route == "/api/notes/{note_id}"
+    assert record.status == 200
+    assert record.queries >= 1
+
+
+def test_slow_queries_are_logged_with_parameters_and_route(client, note_id, caplog, monkeypatch):
+    monkeypatch.setattr(config, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="src.instrumentation.slow"):
+        client.get("/api/notes/", params={"status": "done"})
+
+    slow = [r for r in caplog.records if r.name == "src.instrumentation.slow"]
+    assert slow
+    assert all(r.route == "GET /api/notes/" for r in slow)
+    assert any("'done'" in r.parameters for r in slow)
+
+
+@pytest.mark.parametrize("method, path, budget", [
+    ("GET", "/api/notes/", 2),
+    ("GET", "/api/notes/?search=note&sort=relevance", 2),
+    ("GET", "/api/notes/{id}", 3),
+    ("GET", "/api/tags/", 2),
+    ("GET", "/api/categories/", 2),
+    ("PUT", "/api/notes/{id}", 10),
+    ("DELETE", "/api/notes/{id}", 8),
+    ("GET", "/notes", 4),
+    ("GET", "/notes/{id}", 3),
+])
+def test_query_budget(client, note_id, max_queries, method, path, budget):
+    kwargs = {"json": {"title": "Changed", "tag_ids": []}} if method == "PUT" else {}
+    with max_queries(budget):
+        response = client.request(method, path.format(id=note_id), **kwargs)
+    assert response.status_code == 200
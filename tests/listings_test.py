@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+
+from src.cache import VersionedCache
+
+
+def _walk(client, url, limit):
+    names, cursor = [], None
+    while True:
+        page = client.get(url, params={"limit": limit, **({"cursor": cursor} if cursor else {})}).json()
+        names += [item["name"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return names, page["total"]
+
+
+@pytest.mark.parametrize("listing", ["tags", "categories"])
+def test_listing_pages_by_name(client, listing):
+    for name in ["delta", "alpha", "echo", "charlie", "bravo"]:
+        client.post(f"/api/{listing}/", json={"name": name})
+
+    names, total = _walk(client, f"/api/{listing}/", limit=2)
+    assert names == ["alpha", "bravo", "charlie", "delta", "echo"]
+    assert total == 5
+
+
+def test_listing_counts_notes_and_follows_note_writes(client):
+    tag_ids = [client.post("/api/tags/", json={"name": name}).json()["id"] for name in ("a", "b")]
+    category_id = client.post("/api/categories/", json={"name": "Work"}).json()["id"]
+    note_id = client.post("/api/notes/", json={"title": "n", "tag_ids": tag_ids, "category_id": category_id}).json()["id"]
+    client.post("/api/notes/", json={"title": "m", "tag_ids": tag_ids[:1]})
+
+    counts = {item["name"]: item["note_count"] for item in client.get("/api/tags/").json()["items"]}
+    assert counts == {"a": 2, "b": 1}
+    assert client.get("/api/categories/").json()["items"][0]["note_count"] == 1
+
+    client.delete(f"/api/notes/{note_id}")
+    counts = {item["name"]: item["note_count"] for item in client.get("/api/tags/").json()["items"]}
+    assert counts == {"a": 1, "b": 0}
+    assert client.get("/api/categories/").json()["items"][0]["note_count"] == 0
+
+
+def test_listing_is_served_from_cache_until_a_write(client, count_queries):
+    client.post("/api/tags/", json={"name": "cached"})
+    client.get("/api/tags/")
+
+    count_queries.clear()
+    assert client.get("/api/tags/").json()["total"] == 1
+    # Only the table_versions lookup behind the ETag.
+    assert len(count_queries) == 1
+
+    client.post("/api/tags/", json={"name": "fresh"})
+    assert [item["name"] for item in client.get("/api/tags/").json()["items"]] == ["cached", "fresh"]
+
+
+def test_listing_rejects_bad_cursor(client):
+    assert client.get("/api/tags/", params={"cursor": "%%%"}).status_code == 400
+
+
+def test_listing_cache_drops_least_recently_used():
+    cache = VersionedCache(maxsize=2)
+    cache.put("a", 1, "A")
+    cache.put("b", 1, "B")
+    assert cache.lookup("a", 1) == "A"
+    cache.put("c", 1, "C")
+    assert cache.lookup("b", 1) is None
+    assert cache.lookup("a", 1) == "A"
+    assert cache.lookup("a", 2) is None
+
+
+def test_listing_cache_is_thread_safe():
+    class SlowEntries(OrderedDict):
+        def get(self, key, default=None):
+            entry = super().get(key, default)
+            time.sleep(0)  # let another thread evict the key before lookup moves it
+            return entry
+
+    cache = VersionedCache(maxsize=4)
+    cache._entries = SlowEntries()
+
+    def churn(worker):
+        for i in range(2000):
+            key = (worker + i) % 10
+            if cache.lookup(key, 1) is None:
+                cache.put(key, 1, key)
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(churn, range(8)))
+    assert len(cache._entries) <= 4
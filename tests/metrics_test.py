@@ -0,0 +1,73 @@
+import re
+import threading
+
+from src import metrics
+
+
+def _sample(text: str, name: str, **labels) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + "{") or line.startswith(name + " "):
+            found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', line.partition(" ")[0]))
+            if all(found.get(k) == v for k, v in labels.items()):
+                return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_count_requests_by_route_template(client):
+    before = client.get("/metrics").text
+    note_id = client.post("/api/notes/", json={"title": "A", "content": "x"}).json()["id"]
+    client.get(f"/api/notes/{note_id}")
+    client.get(f"/api/notes/{note_id}")
+    client.get("/api/notes/999999")
+    after = client.get("/metrics")
+
+    assert after.headers["content-type"] == metrics.CONTENT_TYPE
+    labels = {"method": "GET", "route": "/api/notes/{note_id}"}
+
+    def delta(name, **extra):
+        return _sample(after.text, name, **labels, **extra) - _sample(before, name, **labels, **extra)
+
+    assert delta("notes_http_requests_total", status="200") == 2
+    assert delta("notes_http_requests_total", status="404") == 1
+    assert delta("notes_http_request_duration_seconds_count") == 3
+    assert delta("notes_http_request_duration_seconds_bucket", le="+Inf") == 3
+    # The scrape itself is the one request in flight.
+    assert _sample(after.text, "notes_http_requests_in_flight", route="/metrics") == 1
+
+
+def test_metrics_report_list_rows_pools_and_threadpool(client):
+    client.post("/api/notes/bulk", json=[{"title": f"N{i}", "content": "x"} for i in range(7)])
+    before = _sample(client.get("/metrics").text, "notes_list_rows_sum", listing="api")
+    client.get("/api/notes/?limit=5")
+    text = client.get("/metrics").text
+
+    assert _sample(text, "notes_list_rows_sum", listing="api") - before == 5
+    assert _sample(text, "notes_db_pool_size", pool="writer") == 1
+    assert "notes_db_pool_checked_out{pool=\"reader\"}" in text
+    assert _sample(text, "notes_threadpool_limit_threads") > 0
+    assert "# TYPE notes_db_pool_wait_seconds histogram" in text
+
+
+def test_counters_from_many_threads_add_up():
+    counter = metrics.Counter("test_sharded_total", "test")
+    histogram = metrics.Histogram("test_sharded_seconds", "test", buckets=(1, 10))
+    try:
+        def work():
+            for i in range(1000):
+                counter.inc("x")
+                histogram.observe(i % 20)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        text = metrics.render()
+        assert _sample(text, "test_sharded_total") == 8000
+        assert _sample(text, "test_sharded_seconds_bucket", le="1") == 8 * 100
+        assert _sample(text, "test_sharded_seconds_bucket", le="10") == 8 * 550
+        assert _sample(text, "test_sharded_seconds_count") == 8000
+    finally:
+        metrics.REGISTRY.remove(counter)
+        metrics.REGISTRY.remove(histogram)
@@ -0,0 +1,127 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import literal_column, select
+
+from src import crud, models, schemas
+
+
+def _tag_rows(db, note_id):
+    nt = models.note_tags
+    return dict(db.execute(select(nt.c.tag_id, literal_column("rowid")).where(nt.c.note_id == note_id)).all())
+
+
+def test_retag_touches_only_changed_rows(db):
+    red, green, blue = (crud.create_tag(db, schemas.TagCreate(name=name)).id for name in ("red", "green", "blue"))
+    note_id = crud.create_note(db, schemas.NoteCreate(title="a", tag_ids=[red, green])).id
+    before = _tag_rows(db, note_id)
+
+    updated = crud.update_note(db, note_id, schemas.NoteUpdate(tag_ids=[green, blue]))
+    assert updated.tag_ids == [green, blue]
+    assert [tag.name for tag in updated.tags] == ["green", "blue"]
+    after = _tag_rows(db, note_id)
+    assert after.keys() == {green, blue}
+    assert after[green] == before[green]
+
+    assert crud.update_note(db, note_id, schemas.NoteUpdate(tag_ids=None)).tags == []
+    assert _tag_rows(db, note_id) == {}
+
+
+def test_update_rejects_unknown_tags(db):
+    red = crud.create_tag(db, schemas.TagCreate(name="red")).id
+    note_id = crud.create_note(db, schemas.NoteCreate(title="a", tag_ids=[red])).id
+    with pytest.raises(HTTPException) as exc:
+        crud.update_note(db, note_id, schemas.NoteUpdate(title="b", tag_ids=[red, 999]))
+    assert exc.value.status_code == 400
+    note = crud.get_note(db, note_id)
+    assert note.title == "a" and [tag.id for tag in note.tags] == [red]
+
+
+def test_update_rejects_unknown_category(db):
+    note_id = crud.create_note(db, schemas.NoteCreate(title="a")).id
+    with pytest.raises(HTTPException) as exc:
+        crud.update_note(db, note_id, schemas.NoteUpdate(title="b", category_id=999))
+    assert exc.value.status_code == 400
+    note = crud.get_note(db, note_id)
+    assert (note.title, note.category_id, note.version) == ("a", None, 1)
+
+
+def test_update_returns_stored_row(db):
+    work = crud.create_category(db, schemas.CategoryCreate(name="Work"))
+    red = crud.create_tag(db, schemas.TagCreate(name="red"))
+    note_id = crud.create_note(db, schemas.NoteCreate(title="a", tag_ids=[red.id])).id
+
+    updated = crud.update_note(db, note_id, schemas.NoteUpdate(category_id=work.id, status="done"))
+    assert updated.category.name == "Work"
+    assert updated.status == schemas.NoteStatus.done
+    assert [tag.name for tag in updated.tags] == ["red"]
+    assert updated.version == 2
+    assert crud.update_note(db, 999, schemas.NoteUpdate(title="x")) is None
+
+
+def test_version_compare_and_swap(db):
+    note_id = crud.create_note(db, schemas.NoteCreate(title="a")).id
+    assert crud.update_note(db, note_id, schemas.NoteUpdate(title="b", version=1)).version == 2
+
+    with pytest.raises(HTTPException) as exc:
+        crud.update_note(db, note_id, schemas.NoteUpdate(title="lost", version=1))
+    assert exc.value.status_code == 409
+    assert crud.get_note(db, note_id).title == "b"
+
+    # Without a version the write goes through, and other write paths bump it too.
+    assert crud.update_note(db, note_id, schemas.NoteUpdate(title="c")).version == 3
+    crud.update_notes_bulk(db, [schemas.NoteBulkUpdate(id=note_id, is_important=True)])
+    assert crud.get_note_revision(db, note_id).version == 4
+
+
+def test_bulk_update_checks_versions(db):
+    first, second = (crud.create_note(db, schemas.NoteCreate(title=t)).id for t in ("a", "b"))
+    result = crud.update_notes_bulk(db, [
+        schemas.NoteBulkUpdate(id=first, title="a2", version=1),
+        schemas.NoteBulkUpdate(id=second, title="b2", version=7),
+    ])
+    assert [r.ok for r in result.results] == [True, False]
+    assert result.results[1].error == "Note has been modified"
+    assert crud.get_note(db, second).title == "b"
+
+
+def test_put_version_conflict(client):
+    note = client.post("/api/notes/", json={"title": "a"}).json()
+    assert note["version"] == 1
+    assert client.get("/api/notes/").json()["items"][0]["version"] == 1
+
+    ok = client.put(f"/api/notes/{note['id']}", json={"title": "b", "version": 1})
+    assert ok.status_code == 200
+    assert ok.json()["version"] == 2
+    stale = client.put(f"/api/notes/{note['id']}", json={"title": "c", "version": 1})
+    assert stale.status_code == 409
+    assert client.get(f"/api/notes/{note['id']}").json()["title"] == "b"
+
+
+def test_put_if_match_and_body_version_must_agree(client):
+    note_id = client.post("/api/notes/", json={"title": "a"}).json()["id"]
+    etag = client.get(f"/api/notes/{note_id}").headers["etag"]
+    assert client.put(f"/api/notes/{note_id}", json={"title": "b"}).status_code == 200  # now version 2
+
+    fresh = client.get(f"/api/notes/{note_id}").headers["etag"]
+    conflicting = client.put(f"/api/notes/{note_id}", json={"title": "c", "version": 1}, headers={"If-Match": fresh})
+    assert conflicting.status_code == 400
+    assert client.put(f"/api/notes/{note_id}", json={"title": "c"}, headers={"If-Match": etag}).status_code == 412
+    ok = client.put(f"/api/notes/{note_id}", json={"title": "c", "version": 2}, headers={"If-Match": fresh})
+    assert ok.status_code == 200
+    assert client.get(f"/api/notes/{note_id}").json()["title"] == "c"
+
+
+def test_put_unknown_category(client):
+    note_id = client.post("/api/notes/", json={"title": "a"}).json()["id"]
+    assert client.put(f"/api/notes/{note_id}", json={"category_id": 999}).status_code == 400
+
+
+def test_put_statement_budget(client, max_queries):
+    tag = client.post("/api/tags/", json={"name": "red"}).json()["id"]
+    note_id = client.post("/api/notes/", json={"title": "a"}).json()["id"]
+    # One UPDATE ... RETURNING, no reload of the note before or after.
+    with max_queries(1):
+        assert client.put(f"/api/notes/{note_id}", json={"is_important": True}).status_code == 200
+    # Plus the tag check, the note_tags delta and the search index refresh.
+    with max_queries(6):
+        assert client.put(f"/api/notes/{note_id}", json={"tag_ids": [tag]}).json()["tag_ids"] == [tag]
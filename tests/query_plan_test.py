@@ -0,0 +1,110 @@
+import itertools
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from src import crud, models
+
+FILTERS = {
+    "category_id": 1,
+    "tag_id": 1,
+    "status": models.NoteStatus.active,
+    "priority": models.NotePriority.high,
+    "important": True,
+    "before": datetime(2030, 1, 1),
+    "search": "milk",
+}
+
+COMBINATIONS = [
+    combo
+    for size in range(len(FILTERS) + 1)
+    for combo in itertools.combinations(FILTERS, size)
+    if size <= 2 or combo == tuple(FILTERS)
+]
+
+REAL_TABLES = ("notes", "note_tags", "tags", "categories")
+
+
+def _query_plan(db, fetch=crud.get_notes_filtered, **kwargs):
+    engine = db.get_bind()
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        fetch(db, **kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+
+    statement, parameters = statements[0]
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[3] for row in rows]
+
+
+def _scanned_tables(plan):
+    scanned = []
+    for step in plan:
+        if not step.startswith("SCAN "):
+            continue
+        table = step.split()[1]
+        if table.rstrip("_0123456789") in REAL_TABLES:
+            scanned.append(step)
+    return scanned
+
+
+@pytest.mark.parametrize("combo", COMBINATIONS, ids=lambda c: "+".join(c) or "unfiltered")
+def test_list_query_never_full_scans(db, combo):
+    plan = _query_plan(db, **{name: FILTERS[name] for name in combo})
+
+    if combo:
+        assert _scanned_tables(plan) == [], plan
+    else:
+        assert plan[0] == "SCAN notes USING INDEX ix_notes_created_at_id", plan
+
+
+@pytest.mark.parametrize("combo", [c for c in COMBINATIONS if c], ids="+".join)
+def test_fused_count_never_full_scans(db, combo):
+    plan = _query_plan(db, fetch=crud.get_notes_page, total="exact", **{name: FILTERS[name] for name in combo})
+    assert _scanned_tables(plan) == [], plan
+
+
+@pytest.mark.parametrize("combo", [(), ("status",), ("category_id",)], ids=lambda c: "+".join(c) or "unfiltered")
+def test_keyset_page_seeks_instead_of_scanning(db, combo):
+    cursor = crud.encode_cursor(datetime(2026, 1, 1), 10)
+    plan = _query_plan(db, cursor=cursor, **{name: FILTERS[name] for name in combo})
+
+    assert _scanned_tables(plan) == [], plan
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan
+
+
+def test_tag_filter_uses_reverse_association_index(db):
+    plan = _query_plan(db, tag_id=1)
+    assert any("ix_note_tags_tag_id_note_id" in step for step in plan), plan
+
+
+def test_due_reminders_walk_the_reminder_index(db):
+    plan = _query_plan(db, fetch=crud.get_reminders, until=datetime(2030, 1, 1), since=datetime(2029, 1, 1))
+
+    assert _scanned_tables(plan) == [], plan
+    assert any("ix_notes_reminder_date" in step for step in plan), plan
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan
+
+
+def test_agenda_counts_days_from_the_covering_index(db):
+    plan = _query_plan(db, fetch=crud.get_agenda, start=datetime(2030, 1, 1).date(), days=31, per_day=5)
+
+    assert _scanned_tables(plan) == [], plan
+    assert any("COVERING INDEX ix_notes_reminder_date" in step for step in plan), plan
+
+
+@pytest.mark.parametrize("listing", ["tags", "categories"])
+def test_name_listing_seeks_the_name_index(db, listing):
+    plan = _query_plan(db, fetch=crud.get_names_page, listing=listing, versions={}, cursor=crud.encode_name_cursor("m"))
+
+    # Only the scalar-subquery total reads the whole (narrow) id index.
+    assert all("COVERING INDEX ix_" in step for step in _scanned_tables(plan)), plan
+    assert any("sqlite_autoindex_note_stats_1 (dimension=? AND value=?)" in step for step in plan), plan
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan
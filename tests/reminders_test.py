@@ -0,0 +1,140 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from src import crud, models, schemas
+from src.database import Base, apply_sqlite_profile
+from src.reminders import ReminderScheduler, utcnow
+
+
+def _add(db, *reminders, status=models.NoteStatus.active):
+    """Insert notes directly: the API refuses reminders in the past."""
+    ids = []
+    for i, when in enumerate(reminders):
+        note = models.Note(title=f"R{i} {when}", reminder_date=when, status=status)
+        db.add(note)
+        db.flush()
+        ids.append(note.id)
+    return ids
+
+
+def test_due_lists_past_reminders_oldest_first_without_done(client, session):
+    now = utcnow()
+    late, later = _add(session, now - timedelta(days=2), now - timedelta(hours=1))
+    _add(session, now + timedelta(days=1))
+    _add(session, now - timedelta(hours=3), status=models.NoteStatus.done)
+    _add(session, None)
+
+    items = client.get("/api/reminders/due").json()["items"]
+    assert [r["note_id"] for r in items] == [late, later]
+
+    with_done = client.get("/api/reminders/due", params={"include_done": True}).json()["items"]
+    assert len(with_done) == 3
+
+
+def test_due_pages_with_cursor_and_accepts_a_range(client, session):
+    base = datetime(2031, 5, 1, 9)
+    ids = _add(session, *(base + timedelta(minutes=i) for i in range(5)))
+
+    params = {"since": "2031-05-01T00:00:00", "until": "2031-05-02T00:00:00", "limit": 2}
+    seen, cursor = [], None
+    while True:
+        page = client.get("/api/reminders/due", params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        seen += [r["note_id"] for r in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ids
+
+
+def test_agenda_buckets_by_day_with_counts_and_per_day_cap(client, session):
+    day = datetime(2031, 6, 10)
+    _add(session, *(day + timedelta(hours=h) for h in (9, 10, 11, 12)))
+    _add(session, day + timedelta(days=2, hours=8))
+    _add(session, day + timedelta(days=9))
+
+    agenda = client.get("/api/reminders/agenda", params={"start": "2031-06-10", "days": 3, "per_day": 2}).json()
+
+    assert [d["date"] for d in agenda["days"]] == ["2031-06-10", "2031-06-11", "2031-06-12"]
+    assert [d["count"] for d in agenda["days"]] == [4, 0, 1]
+    assert [len(d["reminders"]) for d in agenda["days"]] == [2, 0, 1]
+    assert agenda["days"][0]["reminders"][0]["reminder_date"].startswith("2031-06-10T09:00")
+
+
+def test_agenda_range_is_bounded(client):
+    assert client.get("/api/reminders/agenda", params={"days": 1000}).status_code == 422
+
+
+def test_scheduler_fires_in_order_and_follows_writes(tmp_path):
+    engine = apply_sqlite_profile(create_engine(f"sqlite:///{tmp_path / 'r.db'}", connect_args={"check_same_thread": False}))
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    now = utcnow()
+    with Session() as db:
+        rows = [{"title": f"n{i}", "reminder_date": now + timedelta(seconds=s)} for i, s in enumerate((0.3, 0.5, 0.7, 3600))]
+        db.execute(insert(models.Note), rows)
+        db.commit()
+
+    fired = []
+
+    async def scenario():
+        scheduler = ReminderScheduler(window=2)
+        scheduler.handlers = [fired.extend]
+        await scheduler.start(Session)
+        try:
+            assert len(scheduler._pending) == 2  # only the window is held in memory
+            scheduler.cancel([1])
+            scheduler.reschedule([(5, now + timedelta(seconds=0.1))])  # a note created after start
+            await asyncio.sleep(1.0)
+        finally:
+            await scheduler.stop()
+
+    asyncio.run(scenario())
+    # 1 cancelled; 3 was beyond the first window and loaded on refill; 4 is an hour away.
+    assert [note_id for note_id, _ in fired] == [5, 2, 3]
+
+
+def test_crud_writes_reach_the_running_scheduler(db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(crud.scheduler, "reschedule", lambda changes: calls.append(("reschedule", list(changes))))
+    monkeypatch.setattr(crud.scheduler, "cancel", lambda ids: calls.append(("cancel", list(ids))))
+    when = datetime(2040, 1, 1)
+
+    note = crud.create_note(db, schemas.NoteCreate(title="A", reminder_date=when))
+    crud.update_note(db, note.id, schemas.NoteUpdate(title="B"))
+    crud.update_note(db, note.id, schemas.NoteUpdate(reminder_date=None))
+    crud.delete_note(db, note.id)
+
+    assert [name for name, _ in calls] == ["reschedule", "reschedule", "cancel"]
+    assert calls[1][1] == [(note.id, None)]
+
+
+def test_offset_reminders_are_stored_in_utc(client, db, monkeypatch):
+    note = client.post("/api/notes/", json={"title": "call", "reminder_date": "2030-01-01T10:00:00+03:00"}).json()
+    assert note["reminder_date"].startswith("2030-01-01T07:00:00")
+
+    def due(until):
+        return [r["note_id"] for r in client.get("/api/reminders/due", params={"until": until}).json()["items"]]
+
+    assert due("2030-01-01T06:59:00Z") == []
+    assert due("2030-01-01T07:00:00Z") == [note["id"]]
+    updated = client.put(f"/api/notes/{note['id']}", json={"reminder_date": "2030-01-01T12:00:00+03:00"}).json()
+    assert updated["reminder_date"].startswith("2030-01-01T09:00:00")
+
+    # What the scheduler is told matches what it later loads from the database.
+    calls = []
+    monkeypatch.setattr(crud.scheduler, "reschedule", lambda changes: calls.extend(changes))
+    created = crud.create_note(db, schemas.NoteCreate(title="A", reminder_date="2030-01-01T10:00:00+03:00"))
+    result = crud.update_notes_bulk(db, [schemas.NoteBulkUpdate(id=created.id, reminder_date="2030-01-02T10:00:00-02:00")])
+    assert result.succeeded == 1
+    assert calls == [(created.id, datetime(2030, 1, 1, 7)), (created.id, datetime(2030, 1, 2, 12))]
+    assert crud.get_note(db, created.id).reminder_date == datetime(2030, 1, 2, 12)
+
+
+def test_import_stores_offset_reminders_in_utc(client):
+    line = '{"title": "imported", "reminder_date": "2020-01-01T10:00:00+03:00"}'
+    assert client.post("/api/notes/import", content=line.encode()).json()["imported"] == 1
+    items = client.get("/api/reminders/due", params={"until": "2020-01-01T07:00:00Z"}).json()["items"]
+    assert [r["title"] for r in items] == ["imported"]
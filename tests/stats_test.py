@@ -0,0 +1,91 @@
+from sqlalchemy import insert, text
+
+from src import crud, models, schemas
+
+
+def _seed(db):
+    work = crud.create_category(db, schemas.CategoryCreate(name="Work"))
+    home = crud.create_category(db, schemas.CategoryCreate(name="Home"))
+    red, blue = (crud.create_tag(db, schemas.TagCreate(name=name)) for name in ("red", "blue"))
+    return work, home, red, blue
+
+
+def _as_dict(stats: schemas.NoteStats) -> dict:
+    data = stats.model_dump(mode="json")
+    data["by_category"] = {b["name"]: b["count"] for b in data["by_category"]}
+    data["by_tag"] = {b["name"]: b["count"] for b in data["by_tag"]}
+    return data
+
+
+def test_counters_follow_every_kind_of_write(db):
+    work, home, red, blue = _seed(db)
+    first = crud.create_note(db, schemas.NoteCreate(
+        title="a", category_id=work.id, tag_ids=[red.id, blue.id], is_important=True, priority="high",
+    ))
+    second = crud.create_note(db, schemas.NoteCreate(title="b", tag_ids=[red.id]))
+    crud.create_notes_bulk(db, [
+        schemas.NoteCreate(title="c", category_id=home.id, status="done"),
+        schemas.NoteCreate(title="d", category_id=home.id, tag_ids=[blue.id]),
+    ])
+
+    crud.update_note(db, first.id, schemas.NoteUpdate(status="done", category_id=home.id, tag_ids=[blue.id]))
+    crud.update_notes_bulk(db, [schemas.NoteBulkUpdate(id=second.id, is_important=True, priority="low")])
+    crud.delete_note(db, second.id)
+
+    stats = _as_dict(crud.get_note_stats(db))
+    assert stats["total"] == 3
+    assert stats["by_status"] == {"draft": 0, "active": 1, "done": 2, "postponed": 0}
+    assert stats["by_priority"] == {"low": 0, "medium": 2, "high": 1}
+    assert stats["important"] == 1
+    assert stats["by_category"] == {"Home": 3}
+    assert stats["by_tag"] == {"blue": 2}
+    assert crud.note_stats_drift(db) == []
+
+
+def test_rebuild_repairs_drift(db):
+    work, _, red, _ = _seed(db)
+    crud.create_note(db, schemas.NoteCreate(title="a", category_id=work.id, tag_ids=[red.id]))
+    expected = _as_dict(crud.get_note_stats(db))
+
+    # Rows written with the triggers out of the way, as after restoring a dump.
+    db.execute(text("DELETE FROM note_stats WHERE dimension = 'tag'"))
+    db.execute(text("UPDATE note_stats SET count = count + 5 WHERE dimension = 'total'"))
+    assert {(d, v) for d, v, _, _ in crud.note_stats_drift(db)} == {("total", "all"), ("tag", str(red.id))}
+
+    crud.rebuild_note_stats(db)
+    db.commit()
+    assert crud.note_stats_drift(db) == []
+    assert _as_dict(crud.get_note_stats(db)) == expected
+
+
+def test_core_inserts_are_counted(db):
+    _, _, red, _ = _seed(db)
+    db.execute(insert(models.Note), [{"title": f"n{i}", "status": models.NoteStatus.active} for i in range(3)])
+    db.execute(insert(models.note_tags), [{"note_id": 1, "tag_id": red.id}])
+    stats = crud.get_note_stats(db)
+    assert stats.total == 3
+    assert stats.by_status[schemas.NoteStatus.active] == 3
+    assert [(b.id, b.name, b.count) for b in stats.by_category] == [(None, None, 3)]
+    assert [(b.name, b.count) for b in stats.by_tag] == [("red", 1)]
+
+
+def test_stats_endpoint_and_etag(client):
+    client.post("/api/notes/", json={"title": "a", "priority": "high"})
+    response = client.get("/api/notes/stats")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 1
+    assert body["by_priority"]["high"] == 1
+
+    etag = response.headers["etag"]
+    assert client.get("/api/notes/stats", headers={"If-None-Match": etag}).status_code == 304
+    client.post("/api/notes/", json={"title": "b"})
+    refreshed = client.get("/api/notes/stats", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.json()["total"] == 2
+
+
+def test_stats_query_does_not_touch_notes(session, count_queries):
+    crud.get_note_stats(session)
+    assert len(count_queries) == 1
+    assert " notes" not in count_queries[0]
@@ -0,0 +1,170 @@
+import pytest
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from src import crud, models, schemas
+from src.database import Base, apply_sqlite_profile
+from src.tag_index import bitmap_ids, tag_index, to_bitmap
+
+
+@pytest.fixture
+def tags(db):
+    return [crud.create_tag(db, schemas.TagCreate(name=name)).id for name in ("red", "green", "blue")]
+
+
+@pytest.fixture
+def notes(db, tags):
+    red, green, blue = tags
+    tag_sets = [[red], [red, green], [red, green, blue], [green], [blue], []]
+    return [
+        crud.create_note(db, schemas.NoteCreate(title=f"n{i}", tag_ids=tag_ids)).id
+        for i, tag_ids in enumerate(tag_sets)
+    ]
+
+
+@pytest.fixture
+def index(db):
+    """The shared tag_index, built synchronously over the test database."""
+    tag_index._session_factory = sessionmaker(bind=db.get_bind())
+    tag_index.build()
+    yield tag_index
+    tag_index.invalidate()
+    tag_index._session_factory = None
+    tag_index._bitmaps = {}
+
+
+def _ids(db, **filters):
+    notes, count = crud.get_notes_page(db, limit=100, **filters)
+    assert count == len(notes)
+    return sorted(note.id for note in notes)
+
+
+def _cases(tags):
+    red, green, blue = tags
+    return [
+        dict(tags_all=[red, green]),
+        dict(tags_any=[green, blue]),
+        dict(tags_all=[red], tags_none=[blue]),
+        dict(tags_any=[red, blue], tags_none=[green]),
+        dict(tags_all=[red, green], tags_any=[blue]),
+    ]
+
+
+def _assert_index_matches_sql(db, index, tags):
+    for filters in _cases(tags):
+        bitmap = index.lookup(db, **filters)
+        assert bitmap is not None, filters
+        assert bitmap_ids(bitmap) == _ids(db, **filters), filters
+
+
+def test_bitmap_round_trip():
+    ids = [0, 1, 7, 8, 63, 64, 1000, 123457]
+    assert bitmap_ids(to_bitmap(ids)) == ids
+    assert bitmap_ids(to_bitmap([])) == []
+
+
+def test_sql_filters(db, tags, notes):
+    red, green, blue = tags
+    n0, n1, n2, n3, n4, n5 = notes
+    assert _ids(db, tags_all=[red, green]) == [n1, n2]
+    assert _ids(db, tags_any=[green, blue]) == [n1, n2, n3, n4]
+    assert _ids(db, tags_all=[red], tags_none=[blue]) == [n0, n1]
+    assert _ids(db, tags_none=[red, green]) == [n4, n5]
+    assert _ids(db, tags_all=[red, green], tags_any=[blue]) == [n2]
+    assert crud.count_notes_filtered(db, tags_any=[red], tags_none=[green]) == 1
+
+
+def test_index_matches_sql(db, tags, notes, index):
+    _assert_index_matches_sql(db, index, tags)
+    filters = dict(tags_all=[tags[0]], tags_none=[tags[2]])
+    exported = [note["id"] for batch in crud.iter_notes_export(db, **filters) for note in batch]
+    assert exported == _ids(db, **filters)
+    # tags_none alone matches most notes: always SQL.
+    assert index.lookup(db, tags_none=[tags[0]]) is None
+
+
+def test_resolve_uses_index_for_intersections_only(db, tags, notes, index):
+    red, green, blue = tags
+    resolved = crud.resolve_tag_filters(db, {"tags_all": [red, green], "status": None})
+    assert resolved == {"status": None, "note_ids": [notes[1], notes[2]]}
+    assert crud.resolve_tag_filters(db, {"tags_any": [red, blue]}) == {"tags_any": [red, blue]}
+    assert crud.resolve_tag_filters(db, {"tags_all": [red]}) == {"tags_all": [red]}
+
+
+def test_writes_keep_index_current(db, tags, notes, index):
+    red, green, blue = tags
+    n0, n1, n2, n3, n4, n5 = notes
+
+    created = crud.create_note(db, schemas.NoteCreate(title="new", tag_ids=[red, blue])).id
+    crud.update_note(db, n1, schemas.NoteUpdate(tag_ids=[blue]))
+    crud.delete_note(db, n2)
+    crud.create_notes_bulk(db, [schemas.NoteCreate(title="bulk", tag_ids=[green, blue])])
+    crud.update_notes_bulk(db, [schemas.NoteBulkUpdate(id=n5, tag_ids=[red, green])])
+    crud.delete_notes_bulk(db, [n3])
+
+    assert index.warm
+    version = index.version
+    _assert_index_matches_sql(db, index, tags)
+    assert index.version == version
+
+
+def test_rolled_back_writes_are_not_applied(db, tags, notes, index):
+    red, green, _ = tags
+    before = bitmap_ids(index.lookup(db, tags_all=[red, green]))
+    tag_index.begin(db)
+    db.execute(insert(models.note_tags), [{"note_id": notes[0], "tag_id": green}])
+    tag_index.record(db, added=[(notes[0], green)])
+    db.rollback()
+    assert bitmap_ids(index.lookup(db, tags_all=[red, green])) == before
+
+
+def test_stale_index_falls_back_to_sql(db, tags, notes, index):
+    red, green, _ = tags
+    # A write the index never sees, as from another process.
+    db.execute(insert(models.note_tags), [{"note_id": notes[0], "tag_id": green}])
+    db.commit()
+
+    index._session_factory = None  # keep the fallback from rebuilding in the background
+    assert index.lookup(db, tags_all=[red, green]) is None
+    assert _ids(db, tags_all=[red, green]) == [notes[0], notes[1], notes[2]]
+
+
+def test_list_endpoint_tag_filters(client):
+    red = client.post("/api/tags/", json={"name": "red"}).json()["id"]
+    green = client.post("/api/tags/", json={"name": "green"}).json()["id"]
+    client.post("/api/notes/", json={"title": "a", "tag_ids": [red]})
+    both = client.post("/api/notes/", json={"title": "b", "tag_ids": [red, green]}).json()["id"]
+
+    body = client.get("/api/notes/", params={"tags_all": [red, green]}).json()
+    assert [note["id"] for note in body["items"]] == [both]
+    body = client.get("/api/notes/", params={"tags_any": [red], "tags_none": [green]}).json()
+    assert body["total"] == 1 and body["items"][0]["title"] == "a"
+
+
+def test_older_read_snapshot_does_not_rebuild(tmp_path, monkeypatch):
+    engine = apply_sqlite_profile(create_engine(f"sqlite:///{tmp_path / 'index.db'}"))
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        red, green = (crud.create_tag(db, schemas.TagCreate(name=name)).id for name in ("red", "green"))
+        note_id = crud.create_note(db, schemas.NoteCreate(title="a", tag_ids=[red])).id
+
+    tag_index._session_factory = Session
+    tag_index.build()
+    rebuilds = []
+    monkeypatch.setattr(tag_index, "rebuild", lambda: rebuilds.append(1))
+    try:
+        with Session() as reader, Session() as writer:
+            # pysqlite only opens transactions for writes; hold a read snapshot by hand.
+            reader.connection().exec_driver_sql("BEGIN")
+            reader.execute(text("SELECT 1 FROM notes")).all()
+            crud.update_note(writer, note_id, schemas.NoteUpdate(tag_ids=[red, green]))
+
+            assert tag_index.lookup(reader, tags_all=[red, green]) is None
+            assert rebuilds == []
+            assert bitmap_ids(tag_index.lookup(writer, tags_all=[red, green])) == [note_id]
+    finally:
+        tag_index.invalidate()
+        tag_index._session_factory = None
+        tag_index._bitmaps = {}
+        engine.dispose()